@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+import os
+import sys
+import copy
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+from billy.conf import settings, base_arg_parser
+from billy.scrape import ScrapeError
+from billy.utils import configure_logging
+from billy.bin.scrape import scrape_arg_parser, scrape_module
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time full scraper runs (parsing and saving) against a '
+        'cassette recorded with scrape.py --record, without the network.',
+        parents=[base_arg_parser, scrape_arg_parser],
+    )
+
+    parser.add_argument('module', type=str, help='scraper module (eg. nc)')
+    parser.add_argument('cassette', type=str,
+                        help='cassette recorded with scrape.py --record')
+    parser.add_argument('--repeat', type=int, dest='repeat', default=3,
+                        help='number of timed runs (default: 3)')
+
+    args = parser.parse_args()
+
+    if args.record:
+        parser.error("--record can't be used when benchmarking")
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+    args.replay = args.cassette
+
+    # scraped data goes somewhere disposable unless asked otherwise
+    scratch_dir = None
+    if not args.BILLY_DATA_DIR:
+        scratch_dir = args.BILLY_DATA_DIR = tempfile.mkdtemp()
+
+    settings.update(args)
+
+    # set up search path
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__),
+                                    '../../openstates'))
+
+    configure_logging(args.verbose, args.module)
+    logger = logging.getLogger('billy')
+
+    timings = []
+    try:
+        for run in xrange(args.repeat):
+            # scrape_module fills in args as it goes, start fresh each time
+            run_args = copy.deepcopy(args)
+            start = time.time()
+            scrape_module(run_args)
+            timings.append(time.time() - start)
+            logger.warning('run %d: %.2fs' % (run + 1, timings[-1]))
+        summary = run_args.profile.summary()
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir)
+
+    timings.sort()
+    print '%s: %d runs, min %.2fs, median %.2fs, max %.2fs' % (
+        args.module, len(timings), timings[0], timings[len(timings) // 2],
+        timings[-1])
+    print
+    print 'last run:'
+    print summary
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except ScrapeError as e:
+        print 'Error:', e
+        sys.exit(1)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+import os
+import sys
+import argparse
+
+from billy.conf import settings, base_arg_parser
+from billy.scrape.registry import ScraperIndex
+
+_module_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                           '../../openstates'))
+
+
+def _all_modules():
+    modules = []
+    for name in sorted(os.listdir(_module_dir)):
+        if os.path.exists(os.path.join(_module_dir, name, '__init__.py')):
+            modules.append(name)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build the index of scraper modules and metadata that '
+        'lets scripts find scrapers without importing every state.',
+        parents=[base_arg_parser],
+    )
+
+    parser.add_argument('modules', type=str, nargs='*',
+                        help='scraper modules to (re)index (default: all)')
+    parser.add_argument('--index', type=str, dest='BILLY_SCRAPER_INDEX',
+                        help='index file (default: BILLY_SCRAPER_INDEX)')
+    parser.add_argument('--list', action='store_true', dest='list',
+                        default=False,
+                        help="list the indexed modules and their scrapers "
+                        "instead of building")
+
+    args = parser.parse_args()
+
+    settings.update(args)
+
+    # set up search path
+    sys.path.insert(0, _module_dir)
+
+    index = ScraperIndex(settings.BILLY_SCRAPER_INDEX)
+
+    if args.list:
+        for name, entry in sorted(index.modules.iteritems()):
+            print '%-4s %-24s %s' % (name, entry['metadata']['name'],
+                                     ' '.join(sorted(entry['scrapers'])))
+        return
+
+    if not args.modules:
+        # full rebuild, drop modules that no longer exist
+        index.modules = {}
+        args.modules = _all_modules()
+
+    for name in args.modules:
+        try:
+            entry = index.add(name)
+        except Exception as e:
+            print '%s: failed (%s)' % (name, e)
+            continue
+        print '%s: %s' % (name, ' '.join(sorted(entry['scrapers'])))
+
+    index.save()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import sys
 import argparse
 
 from billy.conf import base_arg_parser, settings
@@ -9,6 +10,7 @@ from billy.importers.legislators import import_legislators
 from billy.importers.committees import import_committees
 from billy.importers.events import import_events
 from billy.utils import configure_logging
+from billy.jobs import MongoJobQueue
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
@@ -31,6 +33,9 @@ if __name__ == '__main__':
                         help='scrape event data')
     parser.add_argument('--alldata', action='store_true', dest='alldata',
                         default=False, help="import all available data")
+    parser.add_argument('--enqueue', action='store_true', dest='enqueue',
+                        default=False, help="add this import to the job "
+                        "queue for job_worker.py instead of running it")
 
     args = parser.parse_args()
 
@@ -42,6 +47,16 @@ if __name__ == '__main__':
 
     settings.update(args)
 
+    if args.enqueue:
+        job_argv = [arg for arg in sys.argv[1:] if arg != '--enqueue']
+        queue = MongoJobQueue()
+        # import what the state's queued scrapes write, once they're done
+        job_id = queue.enqueue('import', job_argv, state=args.abbreviation,
+                               after=queue.unfinished('scrape',
+                                                      args.abbreviation))
+        print 'queued job %s' % job_id
+        sys.exit(0)
+
     data_dir = settings.BILLY_DATA_DIR
 
     # configure logger
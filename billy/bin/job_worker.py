@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+import os
+import argparse
+
+from billy.conf import settings, base_arg_parser
+from billy.utils import configure_logging
+from billy.jobs import MongoJobQueue, Worker
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run scrape and import jobs queued with --enqueue.',
+        parents=[base_arg_parser],
+    )
+
+    parser.add_argument('--once', action='store_true', dest='once',
+                        default=False,
+                        help='exit when there are no more queued jobs')
+    parser.add_argument('--poll', type=int, dest='poll', default=30,
+                        help='seconds to wait before checking an empty '
+                        'queue again (default: 30)')
+    parser.add_argument('--log_dir', type=str, dest='log_dir',
+                        help='directory to write job logs to '
+                        '(default: BILLY_DATA_DIR/logs)')
+
+    args = parser.parse_args()
+
+    settings.update(args)
+
+    configure_logging(args.verbose)
+
+    log_dir = args.log_dir or os.path.join(settings.BILLY_DATA_DIR, 'logs')
+    try:
+        os.makedirs(log_dir)
+    except OSError as e:
+        if e.errno != 17:
+            raise e
+
+    Worker(MongoJobQueue(), log_dir).run(once=args.once,
+                                          poll_seconds=args.poll)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+import re
+import argparse
+
+from billy.conf import settings, base_arg_parser
+from billy.scrape.cache import CompressedCache
+
+
+def parse_size(size):
+    """ turn '512M', '20G', '100000' etc. into a number of bytes """
+    match = re.match(r'^(\d+(?:\.\d+)?)\s*([KMGT]?)B?$', size.upper())
+    if not match:
+        raise argparse.ArgumentTypeError('invalid size: %s' % size)
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** ' KMGT'.index(unit or ' '))
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return '%.1f %s' % (size, unit)
+        size /= 1024.0
+    return '%.1f TB' % size
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Inspect or shrink the compressed scrape cache.',
+        parents=[base_arg_parser],
+    )
+
+    parser.add_argument('command', choices=('stats', 'prune'),
+                        help='stats: show cache size, prune: evict least '
+                        'recently used entries down to --max_size')
+    parser.add_argument('--max_size', type=parse_size,
+                        help='size to prune to, eg. 50G (default: '
+                        'BILLY_CACHE_MAX_SIZE)')
+
+    args = parser.parse_args()
+
+    settings.update(args)
+
+    cache = CompressedCache(settings.BILLY_CACHE_DIR)
+
+    if args.command == 'prune':
+        max_size = args.max_size or settings.BILLY_CACHE_MAX_SIZE
+        if not max_size:
+            parser.error('prune requires --max_size or BILLY_CACHE_MAX_SIZE')
+        evicted = cache.prune(max_size)
+        print 'evicted %s entries' % evicted
+
+    stats = cache.stats()
+    print 'cache:      %s' % settings.BILLY_CACHE_DIR
+    print 'entries:    %s' % stats['entries']
+    print 'objects:    %s' % stats['objects']
+    print 'size:       %s' % format_size(stats['size'])
+    print 'raw size:   %s' % format_size(stats['raw_size'])
+    if stats['size']:
+        print 'ratio:      %.1fx' % (float(stats['raw_size']) / stats['size'])
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,25 @@
 #!/usr/bin/env python
-import glob
 import logging
 import os
 import sys
 import argparse
 import json
+import threading
+from time import time as now
+from multiprocessing.pool import ThreadPool
 
 from billy.conf import settings, base_arg_parser
 from billy.scrape import ScrapeError, JSONDateEncoder, get_scraper
 from billy.utils import configure_logging
 from billy.scrape.validator import DatetimeValidator
+from billy.scrape.ratelimit import HostRateLimiter, AdaptiveRateLimiter
+from billy.scrape.output import OUTPUT_FORMATS, clear_scraped_files
+from billy.scrape.journal import RunJournal
+from billy.scrape.retry import CircuitBreaker
+from billy.scrape.profile import ScrapeProfile
+from billy.scrape.cassette import Cassette
+from billy.scrape.runcache import RunCache
+from billy.scrape.registry import get_metadata
 
 
 def _clear_scraped_data(output_dir, scraper_type):
@@ -21,15 +31,68 @@ def _clear_scraped_data(output_dir, scraper_type):
         if e.errno != 17:
             raise e
         else:
-            for f in glob.glob(path + '/*.json'):
-                os.remove(f)
+            clear_scraped_files(path)
+
+
+def _open_journal(output_dir, scraper_type, resume):
+    """
+        get the RunJournal for scraper_type, when resuming the files saved
+        by units that never finished are removed
+    """
+    journal_path = os.path.join(output_dir, '%s.journal' % scraper_type)
+
+    if not resume:
+        _clear_scraped_data(output_dir, scraper_type)
+        return RunJournal(journal_path)
+
+    path = os.path.join(output_dir, scraper_type)
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != 17:
+            raise e
+
+    journal = RunJournal(journal_path, resume=True)
+    for filename in journal.incomplete_files():
+        for f in (filename, filename + '.part'):
+            if os.path.exists(os.path.join(path, f)):
+                os.remove(os.path.join(path, f))
+    return journal
+
+
+def _scrape_unit(scraper, journal, unit):
+    chamber, time = unit
+    scraper.journal_unit = unit
+    scraper.scrape(chamber, time)
+    # finish segments so none span units
+    scraper.close_output()
+    skipped = scraper.skipped_urls.pop(unit, None)
+    if skipped:
+        # left incomplete so that --resume scrapes it again
+        logging.getLogger('billy').warning(
+            '%s %s: skipped %d requests to hosts that were down' % (
+                chamber, time, len(skipped)))
+    else:
+        journal.complete(unit)
 
 
 def _run_scraper(scraper_type, options, metadata):
     """
         scraper_type: bills, legislators, committees, votes
     """
-    _clear_scraped_data(options.output_dir, scraper_type)
+    journal = _open_journal(options.output_dir, scraper_type, options.resume)
+    try:
+        _run_journaled_scraper(scraper_type, options, metadata, journal)
+        skipped = journal.skipped_urls()
+        if skipped:
+            logging.getLogger('billy').warning(
+                '%s: %d URLs skipped because their host was down, rerun '
+                'with --resume to retry them' % (scraper_type, len(skipped)))
+    finally:
+        journal.close()
+
+
+def _run_journaled_scraper(scraper_type, options, metadata, journal):
     mod_path = options.module
 
     try:
@@ -49,10 +112,26 @@ def _run_scraper(scraper_type, options, metadata):
             'strict_validation': options.strict,
             'retry_attempts': settings.SCRAPELIB_RETRY_ATTEMPTS,
             'retry_wait_seconds': settings.SCRAPELIB_RETRY_WAIT_SECONDS,
+            'journal': journal,
+            'profile': options.profile,
+            'cassette': options.cassette,
+            'circuit_breaker': options.circuit_breaker,
+            'run_cache': options.run_cache,
         }
+    if scraper_type == 'bills':
+        opts['deadline'] = options.bill_deadline
+        opts['db_hints'] = options.prioritize
     if options.fastmode:
         opts['requests_per_minute'] = 0
         opts['use_cache_first'] = True
+    if options.revalidate:
+        opts['revalidate_cache'] = True
+    if options.skip_unchanged:
+        opts['skip_unchanged'] = True
+    if options.rate_limiter:
+        opts['rate_limiter'] = options.rate_limiter
+    elif options.workers > 1:
+        opts['rate_limiter'] = HostRateLimiter(opts['requests_per_minute'])
     scraper = ScraperClass(metadata, **opts)
 
     # times: the list to iterate over for second scrape param
@@ -89,67 +168,164 @@ def _run_scraper(scraper_type, options, metadata):
             scraper.validate_term(time)
 
     # run scraper against year/session/term
+    units = []
     for time in times:
         for chamber in options.chambers:
-            scraper.scrape(chamber, time)
+            units.append((chamber, time))
         if scraper_type == 'events' and len(options.chambers) == 2:
-            scraper.scrape('other', time)
+            units.append(('other', time))
 
+    if options.resume:
+        remaining = [unit for unit in units if not journal.is_complete(unit)]
+        if len(remaining) < len(units):
+            logging.getLogger('billy').info(
+                'resuming %s, skipping %d of %d finished units' % (
+                    scraper_type, len(units) - len(remaining), len(units)))
+        units = remaining
 
-def main():
+    if options.workers > 1 and len(units) > 1:
+        _run_concurrently(ScraperClass, metadata, opts, units,
+                          options.workers)
+    else:
+        try:
+            for unit in units:
+                _scrape_unit(scraper, journal, unit)
+        finally:
+            scraper.close_output()
 
-    parser = argparse.ArgumentParser(
-        description='Scrape legislative data, saving data to disk as JSON.',
-        parents=[base_arg_parser],
-    )
 
-    parser.add_argument('module', type=str, help='scraper module (eg. nc)')
-    parser.add_argument('-s', '--session', action='append', dest='sessions',
-                        help='session(s) to scrape')
-    parser.add_argument('-t', '--term', action='append', dest='terms',
-                        help='term(s) to scrape')
-    parser.add_argument('--upper', action='store_true', dest='upper',
-                        default=False, help='scrape upper chamber')
-    parser.add_argument('--lower', action='store_true', dest='lower',
-                        default=False, help='scrape lower chamber')
-    parser.add_argument('--bills', action='store_true', dest='bills',
-                        default=False, help="scrape bill data")
-    parser.add_argument('--legislators', action='store_true',
-                        dest='legislators', default=False,
-                        help="scrape legislator data")
-    parser.add_argument('--committees', action='store_true', dest='committees',
-                        default=False, help="scrape committee data")
-    parser.add_argument('--votes', action='store_true', dest='votes',
-                        default=False, help="scrape vote data")
-    parser.add_argument('--events', action='store_true', dest='events',
-                        default=False, help='scrape event data')
-    parser.add_argument('--alldata', action='store_true', dest='alldata',
-                        default=False,
-                        help="scrape all available types of data")
-    parser.add_argument('--strict', action='store_true', dest='strict',
-                        default=False, help="fail immediately when"
-                        "encountering validation warning")
-    parser.add_argument('-n', '--no_cache', action='store_true',
-                        dest='no_cache', help="don't use web page cache")
-    parser.add_argument('--fastmode', help="scrape in fast mode",
-                        action="store_true", default=False)
-    parser.add_argument('-r', '--rpm', action='store', type=int, dest='rpm',
-                        default=60)
-    parser.add_argument('--timeout', action='store', type=int, dest='timeout',
-                        default=10)
+def _run_concurrently(ScraperClass, metadata, opts, units, workers):
+    """
+        scrape (chamber, session/term) units from a pool of threads
 
-    args = parser.parse_args()
+        each thread gets its own scraper instance, requests are throttled
+        by the HostRateLimiter in opts which all of them share
+    """
+    local = threading.local()
+    scrapers = []
 
-    settings.update(args)
+    def scrape_unit(unit):
+        if not hasattr(local, 'scraper'):
+            local.scraper = ScraperClass(metadata, **opts)
+            scrapers.append(local.scraper)
+        _scrape_unit(local.scraper, opts['journal'], unit)
 
-    # set up search path
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__),
-                                    '../../openstates'))
+    pool = ThreadPool(min(workers, len(units)))
+    try:
+        pool.map(scrape_unit, units, chunksize=1)
+    finally:
+        pool.terminate()
+        for scraper in scrapers:
+            scraper.close_output()
 
-    # get metadata
-    metadata = __import__(args.module, fromlist=['metadata']).metadata
 
-    configure_logging(args.verbose, args.module)
+# options shared by scrape.py and scrape_states.py
+scrape_arg_parser = argparse.ArgumentParser(add_help=False)
+
+scrape_arg_parser.add_argument('-s', '--session', action='append',
+                               dest='sessions', help='session(s) to scrape')
+scrape_arg_parser.add_argument('-t', '--term', action='append', dest='terms',
+                               help='term(s) to scrape')
+scrape_arg_parser.add_argument('--upper', action='store_true', dest='upper',
+                               default=False, help='scrape upper chamber')
+scrape_arg_parser.add_argument('--lower', action='store_true', dest='lower',
+                               default=False, help='scrape lower chamber')
+scrape_arg_parser.add_argument('--bills', action='store_true', dest='bills',
+                               default=False, help="scrape bill data")
+scrape_arg_parser.add_argument('--legislators', action='store_true',
+                               dest='legislators', default=False,
+                               help="scrape legislator data")
+scrape_arg_parser.add_argument('--committees', action='store_true',
+                               dest='committees', default=False,
+                               help="scrape committee data")
+scrape_arg_parser.add_argument('--votes', action='store_true', dest='votes',
+                               default=False, help="scrape vote data")
+scrape_arg_parser.add_argument('--events', action='store_true', dest='events',
+                               default=False, help='scrape event data')
+scrape_arg_parser.add_argument('--alldata', action='store_true',
+                               dest='alldata', default=False,
+                               help="scrape all available types of data")
+scrape_arg_parser.add_argument('--strict', action='store_true', dest='strict',
+                               default=False, help="fail immediately when"
+                               "encountering validation warning")
+scrape_arg_parser.add_argument('-n', '--no_cache', action='store_true',
+                               dest='no_cache',
+                               help="don't use web page cache")
+scrape_arg_parser.add_argument('--fastmode', help="scrape in fast mode",
+                               action="store_true", default=False)
+scrape_arg_parser.add_argument('--revalidate', action='store_true',
+                               dest='revalidate', default=False,
+                               help="revalidate every cached page with a "
+                               "conditional request")
+scrape_arg_parser.add_argument('--skip_unchanged', action='store_true',
+                               dest='skip_unchanged', default=False,
+                               help="skip FTP files that haven't changed "
+                               "since the last run (where supported)")
+scrape_arg_parser.add_argument('--output_format', choices=OUTPUT_FORMATS,
+                               dest='BILLY_OUTPUT_FORMAT',
+                               help="save one .json file per object or "
+                               "batch objects into .jsonl(.gz) segments")
+scrape_arg_parser.add_argument('--validate', dest='BILLY_VALIDATION',
+                               help="validation of scraped objects: full, "
+                               "sample:N (every Nth object), deferred "
+                               "(in the background) or off")
+scrape_arg_parser.add_argument('--resume', action='store_true',
+                               dest='resume', default=False,
+                               help="continue an interrupted run, skipping "
+                               "chamber/session combinations that finished")
+scrape_arg_parser.add_argument('--record', dest='record', metavar='CASSETTE',
+                               help="save every request and response of "
+                               "the run to CASSETTE")
+scrape_arg_parser.add_argument('--replay', dest='replay', metavar='CASSETTE',
+                               help="serve requests from CASSETTE instead of "
+                               "the network")
+scrape_arg_parser.add_argument('-r', '--rpm', action='store', type=int,
+                               dest='rpm', default=60)
+scrape_arg_parser.add_argument('--adaptive', action='store_true',
+                               dest='adaptive', default=False,
+                               help="adjust each host's request rate to how "
+                               "quickly and reliably it responds, starting "
+                               "at --rpm")
+scrape_arg_parser.add_argument('--max_rpm', action='store', type=int,
+                               dest='max_rpm',
+                               help="ceiling for --adaptive (default: "
+                               "BILLY_ADAPTIVE_RPM_CEILINGS for the state "
+                               "or BILLY_ADAPTIVE_MAX_RPM)")
+scrape_arg_parser.add_argument('--prioritize', action='store_true',
+                               dest='prioritize', default=False,
+                               help="scrape new and recently changed bills "
+                               "first, using the database to tell which "
+                               "bills changed recently")
+scrape_arg_parser.add_argument('--time_budget', action='store', type=int,
+                               dest='time_budget',
+                               help="stop scraping bills after this many "
+                               "seconds, most active bills first")
+scrape_arg_parser.add_argument('--run_cache', action='store_true',
+                               dest='BILLY_RUN_CACHE', default=None,
+                               help="share the pages fetched (by URL) "
+                               "between the run's scrapers so each is only "
+                               "downloaded once")
+scrape_arg_parser.add_argument('--no_run_cache', action='store_false',
+                               dest='BILLY_RUN_CACHE', default=None,
+                               help="don't share pages between the run's "
+                               "scrapers, fetch them every time they're "
+                               "requested")
+scrape_arg_parser.add_argument('--timeout', action='store', type=int,
+                               dest='timeout', default=10)
+scrape_arg_parser.add_argument('--workers', action='store', type=int,
+                               dest='workers', default=1,
+                               help="number of chamber/session combinations "
+                               "to scrape concurrently")
+
+
+def scrape_module(args):
+    """
+        run the requested scrapers for the module named by args.module
+
+        sys.path and settings should already be configured
+    """
+    # get metadata
+    metadata = get_metadata(args.module)
 
     # make output dir
     args.output_dir = os.path.join(settings.BILLY_DATA_DIR,
@@ -203,16 +379,105 @@ def main():
         args.votes = True
         args.committees = True
 
-    if args.legislators:
-        _run_scraper('legislators', args, metadata)
-    if args.committees:
-        _run_scraper('committees', args, metadata)
-    if args.votes:
-        _run_scraper('votes', args, metadata)
-    if args.events:
-        _run_scraper('events', args, metadata)
-    if args.bills:
-        _run_scraper('bills', args, metadata)
+    if args.record and args.replay:
+        raise ScrapeError("--record and --replay can't be used together")
+    args.cassette = None
+    if args.record:
+        args.cassette = Cassette(args.record, 'record')
+    elif args.replay:
+        if not os.path.exists(args.replay):
+            raise ScrapeError("no cassette at %s" % args.replay)
+        args.cassette = Cassette(args.replay, 'replay')
+
+    # an adaptive limiter lives for the whole run so rates learned by one
+    # scraper carry over to the next
+    args.rate_limiter = None
+    if args.adaptive:
+        max_rpm = args.max_rpm or settings.BILLY_ADAPTIVE_RPM_CEILINGS.get(
+            metadata['abbreviation'], settings.BILLY_ADAPTIVE_MAX_RPM)
+        args.rate_limiter = AdaptiveRateLimiter(args.rpm, max_rpm=max_rpm)
+
+    # likewise once a host is down it's down for every scraper
+    args.circuit_breaker = CircuitBreaker(
+        settings.BILLY_CIRCUIT_BREAKER_THRESHOLD,
+        settings.BILLY_CIRCUIT_BREAKER_RESET_SECONDS)
+
+    # pages fetched by one scraper are reused by the others
+    args.run_cache = None
+    if settings.BILLY_RUN_CACHE:
+        args.run_cache = RunCache(
+            os.path.join(args.output_dir, 'run_cache.sqlite'),
+            settings.BILLY_RUN_CACHE_MEMORY)
+
+    # one profile for the whole run, written even if a scraper fails
+    args.profile = ScrapeProfile()
+    try:
+        if args.legislators:
+            _run_scraper('legislators', args, metadata)
+        if args.committees:
+            _run_scraper('committees', args, metadata)
+        if args.votes:
+            _run_scraper('votes', args, metadata)
+        if args.events:
+            _run_scraper('events', args, metadata)
+        if args.bills:
+            args.bill_deadline = None
+            if args.time_budget:
+                args.bill_deadline = now() + args.time_budget
+            _run_scraper('bills', args, metadata)
+    finally:
+        args.profile.write(args.output_dir)
+        if args.run_cache:
+            args.run_cache.close()
+        if args.rate_limiter:
+            for host, rpm in sorted(args.rate_limiter.rates().iteritems()):
+                logging.getLogger('billy').info(
+                    'adaptive rate for %s ended at %d rpm' % (host, rpm))
+
+
+def _enqueue_job(queue, args, argv):
+    """
+        queue a scrape job with this command line (and all of its
+        sessions) instead of scraping, returns its id
+
+        a state's scrape clears and journals its output directory, so its
+        sessions are scraped by one job rather than one job each
+    """
+    job_argv = [arg for arg in argv if arg != '--enqueue']
+    return queue.enqueue('scrape', job_argv, state=args.module)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Scrape legislative data, saving data to disk as JSON.',
+        parents=[base_arg_parser, scrape_arg_parser],
+    )
+
+    parser.add_argument('module', type=str, help='scraper module (eg. nc)')
+    parser.add_argument('--enqueue', action='store_true', dest='enqueue',
+                        default=False,
+                        help="add this scrape to the job queue for "
+                        "job_worker.py instead of scraping")
+
+    args = parser.parse_args()
+
+    settings.update(args)
+
+    if args.enqueue:
+        # only queueing needs pymongo
+        from billy.jobs import MongoJobQueue
+        job_id = _enqueue_job(MongoJobQueue(), args, sys.argv[1:])
+        print 'queued job %s' % job_id
+        return
+
+    # set up search path
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__),
+                                    '../../openstates'))
+
+    configure_logging(args.verbose, args.module)
+
+    scrape_module(args)
 
 
 if __name__ == '__main__':
@@ -5,6 +5,7 @@ import argparse
 
 from billy.conf import settings, base_arg_parser
 from billy.scrape import ScrapeError, get_scraper
+from billy.scrape.registry import get_metadata
 from billy.importers.bills import import_bills
 from billy.utils import configure_logging
 from billy.bin.scrape import _clear_scraped_data
@@ -28,7 +29,11 @@ def _run_scraper(options, metadata):
     scraper = ScraperClass(metadata, **opts)
 
     print options.session, options.bill_id
-    scraper.scrape_bill(options.chamber, options.session, options.bill_id)
+    try:
+        scraper.scrape_bill(options.chamber, options.session,
+                            options.bill_id)
+    finally:
+        scraper.close_output()
 
 
 def main():
@@ -65,7 +70,7 @@ def main():
                                     '../../openstates'))
 
     # get metadata
-    metadata = __import__(args.module, fromlist=['metadata']).metadata
+    metadata = get_metadata(args.module)
     abbr = metadata['abbreviation']
 
     # configure logger
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+import os
+import sys
+import time
+import logging
+import argparse
+import traceback
+import multiprocessing
+
+from billy.conf import settings, base_arg_parser
+from billy.utils import configure_logging
+from billy.bin.scrape import scrape_arg_parser, scrape_module
+
+_module_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                           '../../openstates'))
+
+
+def _all_modules():
+    """ every scraper module (directory with an __init__.py) on disk """
+    modules = []
+    for name in sorted(os.listdir(_module_dir)):
+        if os.path.exists(os.path.join(_module_dir, name, '__init__.py')):
+            modules.append(name)
+    return modules
+
+
+def _scrape_one(args):
+    """
+        run a single module's scrape inside a pool worker
+
+        all logging and stdout/stderr for the module go to
+        <log_dir>/<module>.log, returns a dict describing the outcome
+    """
+    start = time.time()
+    log_path = os.path.join(args.log_dir, '%s.log' % args.module)
+
+    # each worker is a fresh process, drop handlers inherited from the parent
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    configure_logging(args.verbose, args.module, filename=log_path)
+
+    # capture print statements from the scrapers as well
+    log_file = open(log_path, 'a', 0)
+    sys.stdout = sys.stderr = log_file
+
+    result = {'module': args.module, 'log': log_path, 'error': None}
+    try:
+        scrape_module(args)
+        result['status'] = 'ok'
+    except Exception as e:
+        logging.getLogger('billy').error(traceback.format_exc())
+        result['status'] = 'failed'
+        result['error'] = str(e).splitlines()[0] if str(e) else repr(e)
+    finally:
+        sys.stdout = sys.__stdout__
+        sys.stderr = sys.__stderr__
+        log_file.close()
+
+    result['elapsed'] = time.time() - start
+    return result
+
+
+def _format_elapsed(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '%d:%02d:%02d' % (hours, minutes, seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Scrape several states in parallel, one process each.',
+        parents=[base_arg_parser, scrape_arg_parser],
+    )
+
+    parser.add_argument('modules', type=str, nargs='*',
+                        help='scraper modules (eg. nc ny tx)')
+    parser.add_argument('--all', action='store_true', dest='all_modules',
+                        default=False, help='scrape every available module')
+    parser.add_argument('-j', '--processes', type=int, dest='processes',
+                        default=4,
+                        help='number of states to scrape at once')
+    parser.add_argument('--log_dir', dest='log_dir',
+                        help='directory for per-state logs '
+                        '(default: BILLY_DATA_DIR/logs)')
+
+    args = parser.parse_args()
+
+    # a cassette is a single file, the states' processes would clobber it
+    if args.record or args.replay:
+        parser.error("--record and --replay can't be used with several "
+                     "states, use scrape.py")
+
+    settings.update(args)
+
+    if args.all_modules:
+        modules = _all_modules()
+    else:
+        modules = args.modules
+    if not modules:
+        parser.error('must specify at least one module or --all')
+
+    # set up search path (inherited by the workers)
+    sys.path.insert(0, _module_dir)
+
+    if not args.log_dir:
+        args.log_dir = os.path.join(settings.BILLY_DATA_DIR, 'logs')
+    try:
+        os.makedirs(args.log_dir)
+    except OSError as e:
+        if e.errno != 17:
+            raise e
+
+    configure_logging(args.verbose)
+    logger = logging.getLogger('billy')
+
+    jobs = []
+    for module in modules:
+        job_args = argparse.Namespace(**vars(args))
+        job_args.module = module
+        jobs.append(job_args)
+
+    # a fresh process per state keeps scraper registries and module-level
+    # caches from leaking between states
+    pool = multiprocessing.Pool(processes=min(args.processes, len(jobs)),
+                                maxtasksperchild=1)
+    start = time.time()
+    results = []
+    try:
+        for result in pool.imap_unordered(_scrape_one, jobs):
+            results.append(result)
+            logger.warning('%s %s in %s (%d/%d)' % (
+                result['module'], result['status'],
+                _format_elapsed(result['elapsed']), len(results), len(jobs)))
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    total = time.time() - start
+
+    # summary, slowest first
+    print '%-8s %-7s %9s  %s' % ('module', 'status', 'elapsed', 'log')
+    for result in sorted(results, key=lambda r: r['elapsed'], reverse=True):
+        print '%-8s %-7s %9s  %s' % (result['module'], result['status'],
+                                     _format_elapsed(result['elapsed']),
+                                     result['log'])
+        if result['error']:
+            print '    %s' % result['error']
+
+    failed = [r['module'] for r in results if r['status'] != 'ok']
+    print '%d modules in %s, %d failed%s' % (
+        len(results), _format_elapsed(total), len(failed),
+        (': ' + ' '.join(sorted(failed))) if failed else '')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,6 +13,27 @@ BILLY_DATA_DIR = os.path.abspath(os.path.join(os.path.abspath(
 BILLY_CACHE_DIR = os.path.abspath(os.path.join(os.path.abspath(
             os.path.dirname(__file__)), '../../cache'))
 
+# 'files' for httplib2's one file per URL cache, 'compressed' for
+# billy.scrape.cache.CompressedCache
+BILLY_CACHE_BACKEND = 'files'
+
+# size cap (in bytes) for the compressed cache, 0 for no limit
+BILLY_CACHE_MAX_SIZE = 0
+
+# 'json' for one file per scraped object, 'jsonl' or 'jsonl.gz' for
+# segments of BILLY_OUTPUT_SEGMENT_SIZE objects, one per line
+BILLY_OUTPUT_FORMAT = 'json'
+BILLY_OUTPUT_SEGMENT_SIZE = 1000
+
+# how scrapers validate saved objects: 'full', 'sample:N' (every Nth
+# object), 'deferred' (in a background thread) or 'off'
+BILLY_VALIDATION = 'full'
+
+# index of scraper modules and metadata built by build_scraper_index.py,
+# lets scripts find scrapers without importing every state
+BILLY_SCRAPER_INDEX = os.path.abspath(os.path.join(os.path.abspath(
+            os.path.dirname(__file__)), '../../openstates/scraper_index.json'))
+
 BILLY_ERROR_DIR = os.path.abspath(os.path.join(os.path.abspath(
             os.path.dirname(__file__)), '../../errors'))
 
@@ -68,6 +89,35 @@ BILLY_LEVEL_FIELDS = {
     'state': ('state', 'country'),
 }
 
+# share the pages fetched during a scrape.py run between its scrapers so
+# each is only downloaded once, up to BILLY_RUN_CACHE_MEMORY bytes are kept
+# in memory and the rest in the state's data directory until the run ends.
+# pages are shared by URL alone, so leave it off for states whose pages
+# depend on cookies or headers (eg. a session set up by a login)
+BILLY_RUN_CACHE = False
+BILLY_RUN_CACHE_MEMORY = 64 * 1024 * 1024
+
+# ceilings for scrape.py --adaptive, in requests per minute per host:
+# BILLY_ADAPTIVE_RPM_CEILINGS maps state abbreviations to their own ceiling
+BILLY_ADAPTIVE_MAX_RPM = 600
+BILLY_ADAPTIVE_RPM_CEILINGS = {}
+
+# job queue (billy.jobs): seconds a worker's lease on a job lasts without a
+# heartbeat, and how many times a job is tried before it's marked failed
+BILLY_JOB_LEASE_SECONDS = 600
+BILLY_JOB_MAX_ATTEMPTS = 3
+
 SCRAPELIB_TIMEOUT = 600
 SCRAPELIB_RETRY_ATTEMPTS = 3
 SCRAPELIB_RETRY_WAIT_SECONDS = 20
+SCRAPELIB_RETRY_MAX_WAIT_SECONDS = 300
+SCRAPELIB_FETCH_WORKERS = 4
+
+# stop requesting from a host after this many requests in a row fail
+# after their retries (0 to never stop), trying it again after
+# BILLY_CIRCUIT_BREAKER_RESET_SECONDS
+BILLY_CIRCUIT_BREAKER_THRESHOLD = 5
+BILLY_CIRCUIT_BREAKER_RESET_SECONDS = 300
+
+# number of PDFs converted at once by billy.scrape.utils.convert_pdf_async
+BILLY_PDF_WORKERS = 4
@@ -1,13 +1,12 @@
 #!/usr/bin/env python
 import os
 import re
-import glob
 from collections import defaultdict
-import json
 
 from billy.utils import keywordize, term_for_session
 from billy import db
 from billy.importers.names import get_legislator_id
+from billy.scrape.output import iter_scraped_objects
 from billy.importers.utils import (insert_with_id, update, prepare_obj,
                                    next_big_id)
 
@@ -44,21 +43,19 @@ def ensure_indexes():
 
 
 def import_votes(data_dir):
-    pattern = os.path.join(data_dir, 'votes', '*.json')
-    paths = glob.glob(pattern)
-
     votes = defaultdict(list)
 
-    for path in paths:
-        with open(path) as f:
-            data = prepare_obj(json.load(f))
+    count = 0
+    for data in iter_scraped_objects(os.path.join(data_dir, 'votes')):
+        data = prepare_obj(data)
+        count += 1
 
         # need to match bill_id already in the database
         bill_id = fix_bill_id(data.pop('bill_id'))
 
         votes[(data['bill_chamber'], data['session'], bill_id)].append(data)
 
-    print 'imported %s vote files' % len(paths)
+    print 'imported %s votes' % count
     return votes
 
 
@@ -144,18 +141,15 @@ def import_bill(data, votes):
 
 def import_bills(abbr, data_dir):
     data_dir = os.path.join(data_dir, abbr)
-    pattern = os.path.join(data_dir, 'bills', '*.json')
 
     votes = import_votes(data_dir)
 
-    paths = glob.glob(pattern)
-    for path in paths:
-        with open(path) as f:
-            data = prepare_obj(json.load(f))
-
-        import_bill(data, votes)
+    count = 0
+    for data in iter_scraped_objects(os.path.join(data_dir, 'bills')):
+        import_bill(prepare_obj(data), votes)
+        count += 1
 
-    print 'imported %s bill files' % len(paths)
+    print 'imported %s bills' % count
 
     for remaining in votes.keys():
         print 'Failed to match vote %s %s %s' % tuple([
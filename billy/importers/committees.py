@@ -1,13 +1,12 @@
 #!/usr/bin/env python
 import os
-import glob
 import datetime
-import json
 
 from billy import db
 from billy.conf import settings
 from billy.importers.names import get_legislator_id
 from billy.importers.utils import prepare_obj, update, insert_with_id
+from billy.scrape.output import scraped_files, iter_scraped_objects
 
 import pymongo
 
@@ -134,30 +133,27 @@ def import_committee(data, current_session, current_term):
 
 def import_committees(abbr, data_dir):
     data_dir = os.path.join(data_dir, abbr)
-    pattern = os.path.join(data_dir, 'committees', '*.json')
+    committee_dir = os.path.join(data_dir, 'committees')
 
     meta = db.metadata.find_one({'_id': abbr})
     current_term = meta['terms'][-1]['name']
     current_session = meta['terms'][-1]['sessions'][-1]
     level = meta['level']
 
-    paths = glob.glob(pattern)
-
     for committee in db.committees.find({'level': level, level: abbr}):
         committee['members'] = []
         db.committees.save(committee, safe=True)
 
     # import committees from legislator roles, no standalone committees scraped
-    if not paths:
+    if not scraped_files(committee_dir):
         import_committees_from_legislators(current_term, level, abbr)
 
-    for path in paths:
-        with open(path) as f:
-            data = prepare_obj(json.load(f))
-
-        import_committee(data, current_session, current_term)
+    count = 0
+    for data in iter_scraped_objects(committee_dir):
+        import_committee(prepare_obj(data), current_session, current_term)
+        count += 1
 
-    print 'imported %s committee files' % len(paths)
+    print 'imported %s committees' % count
 
     link_parents(level, abbr)
 
@@ -1,12 +1,11 @@
 #!/usr/bin/env python
 import os
-import glob
 import logging
 import datetime
-import json
 
 from billy import db
 from billy.importers.utils import prepare_obj, update, next_big_id
+from billy.scrape.output import iter_scraped_objects
 from billy.scrape.events import Event
 
 import pymongo
@@ -33,13 +32,9 @@ def _insert_with_id(event):
 
 def import_events(abbr, data_dir, import_actions=False):
     data_dir = os.path.join(data_dir, abbr)
-    pattern = os.path.join(data_dir, 'events', '*.json')
 
-    for path in glob.iglob(pattern):
-        with open(path) as f:
-            data = prepare_obj(json.load(f))
-
-            import_event(data)
+    for data in iter_scraped_objects(os.path.join(data_dir, 'events')):
+        import_event(prepare_obj(data))
 
     ensure_indexes()
 
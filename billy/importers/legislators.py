@@ -1,11 +1,10 @@
 #!/usr/bin/env python
 import os
-import glob
 import datetime
-import json
 
 from billy import db
 from billy.importers.utils import insert_with_id, update, prepare_obj
+from billy.scrape.output import iter_scraped_objects
 
 import pymongo
 
@@ -26,13 +25,13 @@ def ensure_indexes():
 
 def import_legislators(abbr, data_dir):
     data_dir = os.path.join(data_dir, abbr)
-    pattern = os.path.join(data_dir, 'legislators', '*.json')
-    paths = glob.glob(pattern)
-    for path in paths:
-        with open(path) as f:
-            import_legislator(json.load(f))
 
-    print 'imported %s legislator files' % len(paths)
+    count = 0
+    for data in iter_scraped_objects(os.path.join(data_dir, 'legislators')):
+        import_legislator(data)
+        count += 1
+
+    print 'imported %s legislators' % count
 
     meta = db.metadata.find_one({'_id': abbr})
     current_term = meta['terms'][-1]['name']
@@ -0,0 +1,363 @@
+"""
+Queue of scrape and import jobs shared by worker processes on any number
+of machines.
+
+A job is a script (``scrape`` or ``import``) plus its command line
+arguments.  Workers :meth:`~JobQueue.lease` a job for a number of seconds,
+:meth:`~JobQueue.heartbeat` to extend the lease while it runs and
+:meth:`~JobQueue.complete` or :meth:`~JobQueue.fail` it when done.  If a
+worker dies its lease runs out and the job is handed to another worker,
+up to ``max_attempts`` times.
+
+A job can be queued to run ``after`` other jobs: it isn't leased until
+they are all done, and fails if one of them does.  Imports queued with
+``import_state.py --enqueue`` run after the state's unfinished scrapes.
+Jobs share data through :data:`BILLY_DATA_DIR`, so workers on different
+machines need it on shared storage.
+
+:class:`MongoJobQueue` keeps jobs in the billy database,
+:class:`MemoryJobQueue` in memory for tests and single process use.
+"""
+import os
+import sys
+import copy
+import time
+import socket
+import logging
+import datetime
+import threading
+import subprocess
+
+from bson.objectid import ObjectId
+import pymongo
+
+from billy.conf import settings
+
+# the billy/bin script that runs each kind of job
+JOB_SCRIPTS = {'scrape': 'scrape.py', 'import': 'import_state.py'}
+JOB_KINDS = tuple(sorted(JOB_SCRIPTS))
+
+_bin_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bin')
+
+_log = logging.getLogger('billy')
+
+
+def worker_id():
+    """ a name for this worker process, unique across machines """
+    return '%s:%s:%s' % (socket.gethostname(), os.getpid(),
+                         threading.current_thread().name)
+
+
+def _new_job(kind, args, state, session, after):
+    if kind not in JOB_KINDS:
+        raise ValueError('unknown job kind: %s' % kind)
+    now = datetime.datetime.utcnow()
+    return {'kind': kind, 'args': list(args), 'state': state,
+            'session': session, 'after': list(after or []),
+            'status': 'queued', 'worker': None,
+            'lease_expires': None, 'attempts': 0, 'error': None,
+            'created_at': now, 'updated_at': now}
+
+
+class JobQueue(object):
+    """ interface shared by the job queues """
+
+    def __init__(self, lease_seconds=None, max_attempts=None):
+        self.lease_seconds = lease_seconds or settings.BILLY_JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or settings.BILLY_JOB_MAX_ATTEMPTS
+
+    def enqueue(self, kind, args, state=None, session=None, after=None):
+        """
+        add a job, to be run once the jobs with the ids in after are done,
+        returns its id
+        """
+        raise NotImplementedError
+
+    def lease(self, worker):
+        """
+        take the oldest queued (or abandoned) job for worker, returns the
+        job or None if there is nothing to do
+        """
+        raise NotImplementedError
+
+    def heartbeat(self, job_id, worker):
+        """
+        extend worker's lease on a job, returns False if worker no longer
+        holds it (the lease ran out and the job was taken back)
+        """
+        raise NotImplementedError
+
+    def complete(self, job_id, worker):
+        raise NotImplementedError
+
+    def fail(self, job_id, worker, error):
+        """
+        record that a job failed, it is queued again unless it has used up
+        its attempts
+        """
+        raise NotImplementedError
+
+    def jobs(self, status=None):
+        """ every job (with the given status), oldest first """
+        raise NotImplementedError
+
+    def unfinished(self, kind=None, state=None):
+        """ ids of the queued or running jobs (of kind, for state) """
+        return [job['_id'] for job in self.jobs()
+                if job['status'] in ('queued', 'leased') and
+                kind in (None, job['kind']) and
+                state in (None, job['state'])]
+
+    def _after_status(self, job, statuses):
+        """
+        'ready' if the jobs that job runs after are all done (or gone),
+        'failed' if one of them failed, 'waiting' otherwise
+        """
+        after = [statuses.get(job_id, 'done')
+                 for job_id in job.get('after') or ()]
+        if 'failed' in after:
+            return 'failed'
+        if all(status == 'done' for status in after):
+            return 'ready'
+        return 'waiting'
+
+    def _expires(self):
+        return (datetime.datetime.utcnow() +
+                datetime.timedelta(seconds=self.lease_seconds))
+
+    def _retry_status(self, job):
+        if job['attempts'] >= self.max_attempts:
+            return 'failed'
+        return 'queued'
+
+
+class MemoryJobQueue(JobQueue):
+    """ :class:`JobQueue` kept in this process's memory """
+
+    def __init__(self, lease_seconds=None, max_attempts=None):
+        super(MemoryJobQueue, self).__init__(lease_seconds, max_attempts)
+        self._lock = threading.Lock()
+        self._jobs = []
+
+    def enqueue(self, kind, args, state=None, session=None, after=None):
+        job = _new_job(kind, args, state, session, after)
+        job['_id'] = ObjectId()
+        with self._lock:
+            self._jobs.append(job)
+        return job['_id']
+
+    def _held(self, job_id, worker):
+        for job in self._jobs:
+            if (job['_id'] == job_id and job['status'] == 'leased' and
+                job['worker'] == worker):
+                return job
+
+    def lease(self, worker):
+        now = datetime.datetime.utcnow()
+        with self._lock:
+            for job in self._jobs:
+                if job['status'] == 'leased' and job['lease_expires'] < now:
+                    job['status'] = self._retry_status(job)
+                    job['error'] = 'lease expired'
+            statuses = dict((job['_id'], job['status']) for job in self._jobs)
+            for job in self._jobs:
+                if job['status'] != 'queued':
+                    continue
+                after = self._after_status(job, statuses)
+                if after == 'failed':
+                    job.update(status='failed', updated_at=now,
+                               error='a job it runs after failed')
+                    statuses[job['_id']] = 'failed'
+                elif after == 'ready':
+                    job.update(status='leased', worker=worker,
+                               lease_expires=self._expires(), updated_at=now,
+                               attempts=job['attempts'] + 1)
+                    return copy.deepcopy(job)
+
+    def heartbeat(self, job_id, worker):
+        with self._lock:
+            job = self._held(job_id, worker)
+            if job is None:
+                return False
+            job['lease_expires'] = self._expires()
+            return True
+
+    def complete(self, job_id, worker):
+        with self._lock:
+            job = self._held(job_id, worker)
+            if job:
+                job.update(status='done', lease_expires=None,
+                           updated_at=datetime.datetime.utcnow())
+
+    def fail(self, job_id, worker, error):
+        with self._lock:
+            job = self._held(job_id, worker)
+            if job:
+                job.update(status=self._retry_status(job), error=error,
+                           lease_expires=None,
+                           updated_at=datetime.datetime.utcnow())
+
+    def jobs(self, status=None):
+        with self._lock:
+            return [copy.deepcopy(job) for job in self._jobs
+                    if status is None or job['status'] == status]
+
+
+class MongoJobQueue(JobQueue):
+    """
+    :class:`JobQueue` kept in a Mongo collection (default: ``jobs`` in the
+    billy database), leases are taken atomically with findAndModify so any
+    number of workers can share it
+    """
+
+    def __init__(self, collection=None, lease_seconds=None,
+                 max_attempts=None):
+        super(MongoJobQueue, self).__init__(lease_seconds, max_attempts)
+        if collection is None:
+            from billy import db
+            collection = db.jobs
+        self.collection = collection
+        self.collection.ensure_index([('status', pymongo.ASCENDING),
+                                      ('created_at', pymongo.ASCENDING)])
+
+    def enqueue(self, kind, args, state=None, session=None, after=None):
+        return self.collection.insert(
+            _new_job(kind, args, state, session, after), safe=True)
+
+    def _requeue_expired(self):
+        now = datetime.datetime.utcnow()
+        expired = {'status': 'leased', 'lease_expires': {'$lt': now}}
+        # out of attempts first, so those don't get queued again
+        self.collection.update(
+            dict(expired, attempts={'$gte': self.max_attempts}),
+            {'$set': {'status': 'failed', 'error': 'lease expired',
+                      'updated_at': now}}, multi=True, safe=True)
+        self.collection.update(
+            expired, {'$set': {'status': 'queued', 'error': 'lease expired',
+                               'updated_at': now}}, multi=True, safe=True)
+
+    def lease(self, worker):
+        self._requeue_expired()
+        queued = self.collection.find({'status': 'queued'}).sort(
+            'created_at', pymongo.ASCENDING)
+        for job in queued:
+            statuses = {}
+            if job.get('after'):
+                statuses = dict((j['_id'], j['status']) for j in
+                                self.collection.find(
+                                    {'_id': {'$in': job['after']}},
+                                    fields=['status']))
+            after = self._after_status(job, statuses)
+            now = datetime.datetime.utcnow()
+            if after == 'failed':
+                self.collection.update(
+                    {'_id': job['_id'], 'status': 'queued'},
+                    {'$set': {'status': 'failed', 'updated_at': now,
+                              'error': 'a job it runs after failed'}},
+                    safe=True)
+            elif after == 'ready':
+                # another worker may have taken it since it was found
+                leased = self.collection.find_and_modify(
+                    {'_id': job['_id'], 'status': 'queued'},
+                    {'$set': {'status': 'leased', 'worker': worker,
+                              'lease_expires': self._expires(),
+                              'updated_at': now},
+                     '$inc': {'attempts': 1}}, new=True)
+                if leased:
+                    return leased
+
+    def _update_held(self, job_id, worker, update):
+        result = self.collection.update(
+            {'_id': job_id, 'status': 'leased', 'worker': worker},
+            update, safe=True)
+        return result['n'] == 1
+
+    def heartbeat(self, job_id, worker):
+        return self._update_held(job_id, worker, {'$set': {
+            'lease_expires': self._expires()}})
+
+    def complete(self, job_id, worker):
+        self._update_held(job_id, worker, {'$set': {
+            'status': 'done', 'lease_expires': None,
+            'updated_at': datetime.datetime.utcnow()}})
+
+    def fail(self, job_id, worker, error):
+        job = self.collection.find_one({'_id': job_id})
+        if job:
+            self._update_held(job_id, worker, {'$set': {
+                'status': self._retry_status(job), 'error': error,
+                'lease_expires': None,
+                'updated_at': datetime.datetime.utcnow()}})
+
+    def jobs(self, status=None):
+        spec = {'status': status} if status else {}
+        return list(self.collection.find(spec).sort('created_at',
+                                                    pymongo.ASCENDING))
+
+
+class Worker(object):
+    """
+    Runs jobs from a :class:`JobQueue` one at a time, each as a child
+    process running the job's script, heartbeating while it runs.
+
+    The output of each job goes to ``<log_dir>/job-<id>.log``.  If the
+    lease on a job is lost (the worker was stalled for longer than the
+    lease) the child is killed, the job belongs to someone else now.
+    """
+
+    def __init__(self, queue, log_dir, name=None, heartbeat_seconds=None):
+        self.queue = queue
+        self.log_dir = log_dir
+        self.name = name or worker_id()
+        self.heartbeat_seconds = (heartbeat_seconds or
+                                  queue.lease_seconds / 3.0)
+
+    def command(self, job):
+        return ([sys.executable,
+                 os.path.join(_bin_dir, JOB_SCRIPTS[job['kind']])] +
+                job['args'])
+
+    def run_job(self, job):
+        """ run a leased job to completion, returns True if it succeeded """
+        log_path = os.path.join(self.log_dir, 'job-%s.log' % job['_id'])
+        _log.info('%s running %s job %s: %s' % (
+            self.name, job['kind'], job['_id'], ' '.join(job['args'])))
+
+        with open(log_path, 'a') as log_file:
+            proc = subprocess.Popen(self.command(job), stdout=log_file,
+                                    stderr=subprocess.STDOUT)
+            last_beat = time.time()
+            while proc.poll() is None:
+                time.sleep(min(1, self.heartbeat_seconds))
+                if time.time() - last_beat < self.heartbeat_seconds:
+                    continue
+                last_beat = time.time()
+                if not self.queue.heartbeat(job['_id'], self.name):
+                    _log.warning('lost lease on job %s, stopping it' %
+                                 job['_id'])
+                    proc.kill()
+                    proc.wait()
+                    return False
+
+        if proc.returncode == 0:
+            self.queue.complete(job['_id'], self.name)
+            return True
+
+        self.queue.fail(job['_id'], self.name,
+                        'exited with status %s, see %s' % (proc.returncode,
+                                                           log_path))
+        return False
+
+    def run(self, once=False, poll_seconds=30):
+        """
+        lease and run jobs forever, or until the queue is empty if once is
+        True
+        """
+        while True:
+            job = self.queue.lease(self.name)
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll_seconds)
+                continue
+            self.run_job(job)
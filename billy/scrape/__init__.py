@@ -1,15 +1,31 @@
 import os
+import sys
 import time
 import logging
 import datetime
+import urllib2
+import threading
 import json
-from collections import defaultdict
-
-from billy.scrape.validator import DatetimeValidator
+import Queue
+import socket
+import urlparse
+from collections import defaultdict, deque
+from multiprocessing.pool import ThreadPool
+
+from billy.scrape.validator import compile_schema, validation_mode
+from billy.scrape.ratelimit import HostRateLimiter
+from billy.scrape.retry import HostDownError, CircuitBreaker, backoff_wait
+from billy.scrape.cache import CompressedCache
+from billy.scrape.ftp import FTPPool, FTPState, parse_listing
+from billy.scrape.bulk import get_bulk_source
+from billy.scrape.output import SegmentWriter
+from billy.scrape.profile import ScrapeProfile
+from billy.scrape.registry import get_scraper_index
 
 from billy.conf import settings
 
 import scrapelib
+import httplib2
 
 
 class ScrapeError(Exception):
@@ -54,6 +70,50 @@ class JSONDateEncoder(json.JSONEncoder):
 # maps scraper_type -> scraper
 _scraper_registry = dict()
 
+# maps cache_dir -> CompressedCache, shared by all scrapers in a process
+_compressed_caches = dict()
+
+
+def get_compressed_cache(cache_dir):
+    """ get the process-wide CompressedCache for cache_dir """
+    if cache_dir not in _compressed_caches:
+        _compressed_caches[cache_dir] = CompressedCache(
+            cache_dir, settings.BILLY_CACHE_MAX_SIZE)
+    return _compressed_caches[cache_dir]
+
+
+# modules whose frames are skipped when working out which scraper method
+# made a request
+_internal_modules = set(['billy.scrape', 'scrapelib', 'multiprocessing.pool',
+                         'threading'])
+
+
+class _ParseTimer(object):
+    """
+    times the body of ``with scraper.urlopen(url) as page:`` blocks for the
+    scraper's profile
+    """
+
+    def __enter__(self):
+        self._entered = time.time()
+        return super(_ParseTimer, self).__enter__()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        key = getattr(self, '_profile_key', None)
+        if key:
+            self._scraper.profile.record_parse(key[0], key[1],
+                                               time.time() - self._entered)
+        return super(_ParseTimer, self).__exit__(exc_type, exc_val, exc_tb)
+
+
+class ResultStr(_ParseTimer, scrapelib.ResultStr):
+    pass
+
+
+class ResultUnicode(_ParseTimer, scrapelib.ResultUnicode):
+    pass
+
+
 class ScraperMeta(type):
     """ register derived scrapers in a central registry """
 
@@ -84,7 +144,11 @@ class Scraper(scrapelib.Scraper):
     __metaclass__ = ScraperMeta
 
     def __init__(self, metadata, no_cache=False, output_dir=None,
-                 strict_validation=None, **kwargs):
+                 strict_validation=None, rate_limiter=None,
+                 fetch_workers=None, revalidate_cache=False,
+                 skip_unchanged=False, output_format=None, validation=None,
+                 journal=None, profile=None, cassette=None,
+                 circuit_breaker=None, run_cache=None, **kwargs):
         """
         Create a new Scraper instance.
 
@@ -92,14 +156,75 @@ class Scraper(scrapelib.Scraper):
         :param no_cache: if True, will ignore any cached downloads
         :param output_dir: the data directory to use
         :param strict_validation: exit immediately if validation fails
+        :param rate_limiter: a :class:`~billy.scrape.ratelimit.RateLimiter`,
+            :class:`~billy.scrape.ratelimit.HostRateLimiter` or
+            :class:`~billy.scrape.ratelimit.AdaptiveRateLimiter` to throttle
+            requests with, allows several scrapers to share a single
+            requests_per_minute (default: a HostRateLimiter of this
+            scraper's own)
+        :param fetch_workers: number of threads used by
+            :meth:`urlopen_async` and :meth:`urlopen_many`
+            (default: SCRAPELIB_FETCH_WORKERS)
+        :param revalidate_cache: if True, every cached page is revalidated
+            with a conditional request (If-None-Match/If-Modified-Since)
+            instead of trusting the server's freshness headers, unchanged
+            pages come back as a 304 and are served from the cache
+        :param skip_unchanged: if True, :meth:`ftp_unchanged` reports FTP
+            files whose size and mtime match the last run so the scraper
+            can skip them
+        :param output_format: 'json' to save each object to its own file,
+            'jsonl' or 'jsonl.gz' to append objects to (gzipped) JSON lines
+            segments, call :meth:`close_output` when done
+            (default: BILLY_OUTPUT_FORMAT)
+        :param validation: how saved objects are validated, 'full',
+            'sample:N' to only validate every Nth object, 'deferred' to
+            validate in a background thread or 'off'
+            (default: BILLY_VALIDATION)
+        :param journal: a :class:`~billy.scrape.journal.RunJournal` to
+            record saved files in, under the unit set in
+            :attr:`journal_unit`
+        :param profile: a :class:`~billy.scrape.profile.ScrapeProfile` to
+            record request and parse times in, allows several scrapers to
+            share one (default: a new ScrapeProfile)
+        :param cassette: a :class:`~billy.scrape.cassette.Cassette` to
+            record every request and response in, or to replay them from
+            instead of using the network
+        :param circuit_breaker: a
+            :class:`~billy.scrape.retry.CircuitBreaker` that stops requests
+            to hosts that keep failing, allows several scrapers to share
+            one (default: a CircuitBreaker configured by
+            BILLY_CIRCUIT_BREAKER_THRESHOLD and
+            BILLY_CIRCUIT_BREAKER_RESET_SECONDS)
+        :param run_cache: a :class:`~billy.scrape.runcache.RunCache` that
+            GET requests are answered from, shared by the scrapers of a run
+            so no URL is downloaded twice
         """
 
+        # httplib2.Http objects aren't thread-safe, each thread gets its own
+        self._thread_local = threading.local()
+        self._main_http = None
+
         # configure underlying scrapelib object
         if no_cache:
             kwargs['cache_dir'] = None
         elif 'cache_dir' not in kwargs:
             kwargs['cache_dir'] = settings.BILLY_CACHE_DIR
 
+        if (kwargs['cache_dir'] and 'cache_obj' not in kwargs and
+            settings.BILLY_CACHE_BACKEND == 'compressed'):
+            kwargs['cache_obj'] = get_compressed_cache(kwargs['cache_dir'])
+
+        # replayed runs never touch the network or the cache
+        if cassette is not None and cassette.replaying:
+            kwargs['cache_dir'] = None
+            kwargs['requests_per_minute'] = 0
+            kwargs.pop('cache_obj', None)
+
+        # revalidating and trusting the cache blindly are mutually exclusive
+        self.revalidate_cache = revalidate_cache and bool(kwargs['cache_dir'])
+        if self.revalidate_cache:
+            kwargs['use_cache_first'] = False
+
         if 'error_dir' not in kwargs:
             kwargs['error_dir'] = settings.BILLY_ERROR_DIR
 
@@ -126,6 +251,45 @@ class Scraper(scrapelib.Scraper):
         self.metadata = metadata
         self.output_dir = output_dir
 
+        if rate_limiter is None or (cassette and cassette.replaying):
+            rate_limiter = HostRateLimiter(self.requests_per_minute)
+        self.rate_limiter = rate_limiter
+
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker(
+                settings.BILLY_CIRCUIT_BREAKER_THRESHOLD,
+                settings.BILLY_CIRCUIT_BREAKER_RESET_SECONDS)
+        self.circuit_breaker = circuit_breaker
+        self.retry_max_wait_seconds = settings.SCRAPELIB_RETRY_MAX_WAIT_SECONDS
+        self.run_cache = run_cache
+        # requests refused by the circuit breaker, by journal unit
+        self.skipped_urls = defaultdict(list)
+
+        if fetch_workers is None:
+            fetch_workers = settings.SCRAPELIB_FETCH_WORKERS
+        self.fetch_workers = fetch_workers
+        self._fetch_pool = None
+
+        # FTP sessions and directory listings, see ftp_listing
+        self.ftp_pool = FTPPool(self.timeout)
+        self._ftp_listings = {}
+        self.skip_unchanged = skip_unchanged
+        self._ftp_state = None
+
+        if output_format is None:
+            output_format = settings.BILLY_OUTPUT_FORMAT
+        self.output_format = output_format
+        self._segment_writer = None
+
+        self.journal = journal
+        self.journal_unit = None
+
+        if profile is None:
+            profile = ScrapeProfile()
+        self.profile = profile
+
+        self.cassette = cassette
+
         # make output dir, error dir, and cache dir
         for d in (self.output_dir, kwargs['cache_dir'], kwargs['error_dir']):
             try:
@@ -137,7 +301,12 @@ class Scraper(scrapelib.Scraper):
 
         # validation
         self.strict_validation = strict_validation
-        self.validator = DatetimeValidator()
+        if validation is None:
+            validation = settings.BILLY_VALIDATION
+        self.validation, self._validation_rate = validation_mode(validation)
+        self._saved_count = 0
+        self._validation_queue = None
+        self._validation_error = None
 
         self.follow_robots = False
 
@@ -147,16 +316,440 @@ class Scraper(scrapelib.Scraper):
         self.debug = self.logger.debug
         self.warning = self.logger.warning
 
+    @property
+    def _http(self):
+        http = getattr(self._thread_local, 'http', None)
+        if http is None and self._main_http is not None:
+            # first request from this thread, give it a connection of its own
+            http = self._main_http.__class__(self._cache_obj,
+                                             timeout=self.timeout)
+            http.follow_redirects = self._main_http.follow_redirects
+            self._thread_local.http = http
+        return http
+
+    @_http.setter
+    def _http(self, http):
+        if self._main_http is None:
+            self._main_http = http
+        self._thread_local.http = http
+
+    def _throttle(self):
+        # throttling is done per host in urlopen
+        pass
+
+    def _make_headers(self, url):
+        headers = super(Scraper, self)._make_headers(url)
+        # max-age=0 makes httplib2 treat every cache entry as stale, so it
+        # sends the entry's stored ETag/Last-Modified as validators
+        if self.revalidate_cache and 'Cache-Control' not in headers:
+            headers['Cache-Control'] = 'max-age=0'
+        return headers
+
+    def urlopen(self, url, method='GET', body=None, retry_on_404=False):
+        # scrapelib calls urlopen again for redirects, only the outermost
+        # call goes in the profile
+        if getattr(self._thread_local, 'in_urlopen', False):
+            self.rate_limiter.wait(url)
+            return self._urlopen(url, method, body, retry_on_404)
+
+        host = urlparse.urlparse(url).netloc
+        caller = self._caller()
+
+        if self.run_cache is None or method != 'GET' or body:
+            return self._profiled_urlopen(url, method, body, retry_on_404,
+                                          host, caller)
+
+        fetched = []
+
+        def fetch():
+            fetched.append(True)
+            return self._profiled_urlopen(url, method, body, retry_on_404,
+                                          host, caller)
+
+        resp = self.run_cache.fetch(self, url, fetch)
+        if not fetched:
+            self.profile.record_request(host, caller, bytes=len(resp),
+                                        from_cache=True)
+            resp._profile_key = (host, caller)
+        return resp
+
+    def _profiled_urlopen(self, url, method, body, retry_on_404, host,
+                          caller):
+        if not self.circuit_breaker.allow(url):
+            self._record_skipped(url)
+            raise HostDownError(url)
+
+        start = time.time()
+        self.rate_limiter.wait(url)
+        throttled = time.time() - start
+        self._thread_local.retries = 0
+        self._thread_local.in_urlopen = True
+        try:
+            resp = self._urlopen(url, method, body, retry_on_404)
+        except Exception as e:
+            if isinstance(e, HostDownError):
+                self._record_skipped(url)
+            self.profile.record_request(
+                host, caller, seconds=time.time() - start - throttled,
+                retries=self._thread_local.retries, error=True,
+                throttle_seconds=throttled)
+            raise
+        finally:
+            self._thread_local.in_urlopen = False
+
+        self.profile.record_request(
+            host, caller, bytes=len(resp),
+            seconds=time.time() - start - throttled,
+            from_cache=resp.response.fromcache,
+            retries=self._thread_local.retries, throttle_seconds=throttled)
+        resp._profile_key = (host, caller)
+        return resp
+
+    def _urlopen(self, url, method, body, retry_on_404):
+        if self.cassette is None:
+            return self._fetch(url, method, body, retry_on_404)
+
+        if self.cassette.replaying:
+            return self.cassette.play(self, url, method, body)
+
+        try:
+            resp = self._fetch(url, method, body, retry_on_404)
+        except scrapelib.HTTPError as e:
+            self.cassette.record(url, method, body, e.response, e.body)
+            raise
+        except (urllib2.URLError, socket.error, scrapelib.ScrapeError) as e:
+            self.cassette.record_error(url, method, body, e)
+            raise
+        self.cassette.record(url, method, body, resp.response, resp)
+        return resp
+
+    def _fetch(self, url, method, body, retry_on_404):
+        if url.startswith('ftp://'):
+            return self._ftp_urlopen(url, method)
+        resp = super(Scraper, self).urlopen(url, method, body, retry_on_404)
+        if self.revalidate_cache and resp.response.fromcache:
+            self.debug('%s not modified, using cached copy' % url)
+        return resp
+
+    def _caller(self):
+        """ '<scraper_type>.<method>' of the method making a request """
+        caller = getattr(self._thread_local, 'caller', None)
+        if caller:
+            return caller
+        frame = sys._getframe(1)
+        while (frame is not None and
+               frame.f_globals.get('__name__') in _internal_modules):
+            frame = frame.f_back
+        name = frame.f_code.co_name if frame else 'unknown'
+        return '%s.%s' % (getattr(self, 'scraper_type',
+                                  self.__class__.__name__), name)
+
+    def _do_request(self, url, method, body, headers, use_httplib2,
+                    retry_on_404=False):
+        # scrapelib's retry loop, but counting retries for the profile
+        if not use_httplib2:
+            req = urllib2.Request(url, data=body, headers=headers)
+            if self.accept_cookies:
+                self._cookie_jar.add_cookie_header(req)
+
+        tries = 0
+        exception_raised = None
+        failed = False
+
+        while tries <= self.retry_attempts:
+            exception_raised = None
+            start = time.time()
+
+            if use_httplib2:
+                try:
+                    resp, content = self._http.request(url, method, body=body,
+                                                       headers=headers)
+                    failed = resp.status >= 500 or resp.status == 429
+                    if not resp.fromcache:
+                        self._record_attempt(url, time.time() - start,
+                                             error=failed)
+                    # return on a success/redirect/404
+                    if resp.status < 400 or (resp.status == 404
+                                             and not retry_on_404):
+                        return resp, content
+                except socket.error as e:
+                    failed = True
+                    self._record_attempt(url, time.time() - start,
+                                         error=True)
+                    exception_raised = e
+                except AttributeError as e:
+                    if (str(e) ==
+                        "'NoneType' object has no attribute 'makefile'"):
+                        # when this error occurs, re-establish the connection
+                        self._http = httplib2.Http(self._cache_obj,
+                                                   timeout=self.timeout)
+                        exception_raised = e
+                    else:
+                        raise
+            else:
+                try:
+                    resp = urllib2.urlopen(req, timeout=self.timeout)
+                    self._record_attempt(url, time.time() - start)
+                    if self.accept_cookies:
+                        self._cookie_jar.extract_cookies(resp, req)
+
+                    return resp
+                except urllib2.URLError as e:
+                    code = getattr(e, 'code', None)
+                    failed = code is None or code >= 500 or code == 429
+                    self._record_attempt(url, time.time() - start,
+                                         error=failed)
+                    exception_raised = e
+                    if getattr(e, 'code', None) == 404 and not retry_on_404:
+                        raise e
+
+            # if we're going to retry, sleep first
+            tries += 1
+            if tries <= self.retry_attempts:
+                # unless the host has been given up on
+                if not self.circuit_breaker.allow(url):
+                    raise HostDownError(url)
+                self._thread_local.retries = tries
+                wait = backoff_wait(tries, self.retry_wait_seconds,
+                                    self.retry_max_wait_seconds)
+                self.debug('sleeping for %.1f seconds before retry' % wait)
+                time.sleep(wait)
+
+        # the request failed for good, which counts once against the host
+        if failed:
+            self.circuit_breaker.record(url, error=True)
+        if exception_raised:
+            raise exception_raised
+        else:
+            return resp, content
+
+    def _record_attempt(self, url, seconds, error=False):
+        """
+        tell the rate limiter how an attempt at a request went, and the
+        circuit breaker if it worked (failures are only reported to it
+        once the request has run out of retries)
+        """
+        self.rate_limiter.record(url, seconds, error)
+        if not error:
+            self.circuit_breaker.record(url)
+
+    def _record_skipped(self, url):
+        self.warning('skipped %s, host is down' % url)
+        self.skipped_urls[self.journal_unit].append(url)
+        if self.journal and self.journal_unit:
+            self.journal.skipped(self.journal_unit, url)
+
+    def _wrap_result(self, response, body):
+        # same as scrapelib's, but with results that time their parsing
+        if self.raise_errors and response.code >= 400:
+            raise scrapelib.HTTPError(response, body)
+
+        if isinstance(body, unicode):
+            return ResultUnicode(self, response, body)
+
+        if isinstance(body, str):
+            return ResultStr(self, response, body)
+
+        raise ValueError('expected body string')
+
+    def _ftp_urlopen(self, url, method):
+        # FTP goes through the pooled sessions rather than urllib2, which
+        # would log in again for every file
+        if method != 'GET':
+            raise scrapelib.HTTPMethodUnavailableError(
+                "non-HTTP(S) requests do not support method '%s'" %
+                method, method)
+        tries = 0
+        while True:
+            try:
+                data = self.ftp_pool.retrieve(url)
+                self.circuit_breaker.record(url)
+                break
+            except urllib2.URLError as e:
+                # 550 is FTP's "no such file", not worth retrying
+                if str(e.reason).startswith('ftp error: 550'):
+                    raise
+                tries += 1
+                if tries > self.retry_attempts:
+                    self.circuit_breaker.record(url, error=True)
+                    raise
+                if not self.circuit_breaker.allow(url):
+                    raise HostDownError(url)
+                self._thread_local.retries = tries
+                wait = backoff_wait(tries, self.retry_wait_seconds,
+                                    self.retry_max_wait_seconds)
+                self.debug('sleeping for %.1f seconds before retry' % wait)
+                time.sleep(wait)
+        return self._wrap_result(scrapelib.Response(url, url, protocol='ftp'),
+                                 data)
+
+    def ftp_listing(self, url):
+        """
+        Get the parsed listing of an FTP directory as a list of
+        :class:`~billy.scrape.ftp.FTPEntry` (filename, size, mtime, is_dir).
+
+        Each directory is only listed once per scraper.
+        """
+        if not url.endswith('/'):
+            url += '/'
+        if url not in self._ftp_listings:
+            self._ftp_listings[url] = parse_listing(self.urlopen(url))
+        return self._ftp_listings[url]
+
+    def _ftp_entry(self, url):
+        dirname, filename = url.rsplit('/', 1)
+        for entry in self.ftp_listing(dirname + '/'):
+            if entry.filename == filename:
+                return entry
+
+    @property
+    def ftp_state(self):
+        if self._ftp_state is None:
+            self._ftp_state = FTPState(os.path.join(self.output_dir,
+                                                    'ftp_state.sqlite'))
+        return self._ftp_state
+
+    def ftp_unchanged(self, url):
+        """
+        True if skip_unchanged is on and the FTP file at url has the same
+        size and mtime (per its directory listing) as when
+        :meth:`ftp_mark_seen` was last called for it.
+        """
+        if not self.skip_unchanged:
+            return False
+        entry = self._ftp_entry(url)
+        if entry is None:
+            return False
+        return self.ftp_state.get(url) == (entry.size,
+                                           entry.mtime.isoformat())
+
+    def ftp_mark_seen(self, url):
+        """
+        Record the current size and mtime of the FTP file at url, call once
+        the data from it has been saved.
+        """
+        if not self.skip_unchanged:
+            return
+        entry = self._ftp_entry(url)
+        if entry is not None:
+            self.ftp_state.set(url, entry)
+
+    def bulk_source(self, url, key, name=None, parser=None, types=None):
+        """
+        Get the bulk data file at url as a
+        :class:`~billy.scrape.bulk.BulkSource`, a table of its rows
+        indexed by key (a column name or a function of a row) that is
+        shared by the scrapers of this process.
+
+        The file is only downloaded again if it changed (per its FTP
+        listing or HTTP headers) and only reloaded if its contents did.
+
+        :param name: name of the table, stored in
+            ``<BILLY_CACHE_DIR>/bulk/<state>/<name>.sqlite`` (default: the
+            file's name)
+        :param parser: function turning an open file into an iterable of
+            row dicts (default: a CSV file with a header row)
+        :param types: dict mapping column names to functions that convert
+            their values when rows are read
+        """
+        return get_bulk_source(self, url, key, name, parser, types)
+
+    def urlopen_async(self, url, method='GET', body=None,
+                      retry_on_404=False):
+        """
+        Start fetching url in the background and return immediately.
+
+        Returns an :class:`multiprocessing.pool.AsyncResult`, calling its
+        ``get()`` method returns what :meth:`urlopen` would have (or raises
+        what it would have raised).  Requests are still subject to this
+        scraper's rate limiter.
+        """
+        if self._fetch_pool is None:
+            self._fetch_pool = ThreadPool(self.fetch_workers)
+        return self._fetch_pool.apply_async(
+            self._urlopen_for, (self._caller(), url, method, body,
+                                retry_on_404))
+
+    def _urlopen_for(self, caller, url, method, body, retry_on_404):
+        # urlopen from a fetch pool thread, profiled as caller
+        self._thread_local.caller = caller
+        try:
+            return self.urlopen(url, method, body, retry_on_404)
+        finally:
+            self._thread_local.caller = None
+
+    def urlopen_many(self, urls, method='GET', body=None,
+                     retry_on_404=False):
+        """
+        Fetch several URLs concurrently, yielding the responses in order.
+
+        Keeps up to twice :attr:`fetch_workers` requests in flight ahead
+        of the one being yielded so that a scraper can parse one page while
+        the next few download, e.g.::
+
+            for url, page in zip(urls, self.urlopen_many(urls)):
+                self.parse_detail_page(url, page)
+
+        If a request fails the exception is raised when its position in
+        the sequence is reached.
+        """
+        pending = deque()
+        window = self.fetch_workers * 2
+
+        for url in urls:
+            pending.append(self.urlopen_async(url, method, body,
+                                              retry_on_404))
+            if len(pending) >= window:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+
     def validate_json(self, obj):
         if not hasattr(self, '_schema'):
-            self._schema = self._get_schema()
+            self._schema = compile_schema(self._get_schema())
         try:
-            self.validator.validate(obj, self._schema)
+            self._schema.validate(obj)
         except ValueError as ve:
             self.warning(str(ve))
             if self.strict_validation:
                 raise ve
 
+    def _validate_saved(self, obj):
+        """ validate a just saved object according to self.validation """
+        self._saved_count += 1
+        if self.validation == 'full':
+            self.validate_json(obj)
+        elif self.validation == 'sample':
+            # the first object and every Nth one after it
+            if (self._saved_count - 1) % self._validation_rate == 0:
+                self.validate_json(obj)
+        elif self.validation == 'deferred':
+            if self._validation_queue is None:
+                self._validation_queue = Queue.Queue(1000)
+                thread = threading.Thread(target=self._deferred_validator)
+                thread.daemon = True
+                thread.start()
+            self._raise_deferred_error()
+            self._validation_queue.put(obj)
+
+    def _deferred_validator(self):
+        while True:
+            obj = self._validation_queue.get()
+            try:
+                self.validate_json(obj)
+            except ValueError as ve:
+                if self._validation_error is None:
+                    self._validation_error = ve
+            finally:
+                self._validation_queue.task_done()
+
+    def _raise_deferred_error(self):
+        # with --strict, surface deferred failures in the scraping thread
+        if self._validation_error is not None:
+            error, self._validation_error = self._validation_error, None
+            raise error
+
     def all_sessions(self):
         sessions = []
         for t in self.metadata['terms']:
@@ -202,13 +795,40 @@ class Scraper(scrapelib.Scraper):
         for f in settings.BILLY_LEVEL_FIELDS[self.level]:
             obj[f] = getattr(self, f)
 
-        filename = obj.get_filename()
-        with open(os.path.join(self.output_dir, self.scraper_type, filename),
-                  'w') as f:
-            json.dump(obj, f, cls=JSONDateEncoder)
+        if self.output_format == 'json':
+            filename = obj.get_filename()
+            self._record_saved(filename)
+            with open(os.path.join(self.output_dir, self.scraper_type,
+                                   filename), 'w') as f:
+                json.dump(obj, f, cls=JSONDateEncoder)
+        else:
+            if self._segment_writer is None:
+                self._segment_writer = SegmentWriter(
+                    os.path.join(self.output_dir, self.scraper_type),
+                    self.scraper_type,
+                    compress=self.output_format.endswith('.gz'),
+                    segment_size=settings.BILLY_OUTPUT_SEGMENT_SIZE,
+                    encoder=JSONDateEncoder,
+                    on_segment=self._record_saved)
+            self._segment_writer.write(obj)
 
         # validate after writing, allows for inspection
-        self.validate_json(obj)
+        self._validate_saved(obj)
+
+    def _record_saved(self, filename):
+        if self.journal and self.journal_unit:
+            self.journal.saved(self.journal_unit, filename)
+
+    def close_output(self):
+        """
+        finish any partially written output segment and wait for
+        deferred validation to catch up
+        """
+        if self._segment_writer:
+            self._segment_writer.close()
+        if self._validation_queue:
+            self._validation_queue.join()
+            self._raise_deferred_error()
 
 class SourcedObject(dict):
     """ Base object used for data storage.
@@ -241,6 +861,22 @@ class SourcedObject(dict):
 def get_scraper(mod_path, scraper_type):
     """ import a scraper from the scraper registry """
 
+    # an up to date scraper index says where the class is, only its
+    # module needs importing
+    try:
+        indexed = get_scraper_index().scraper(mod_path, scraper_type)
+    except KeyError:
+        pass
+    else:
+        if indexed is None:
+            raise ScrapeError("no %s scraper found in module %s" %
+                              (scraper_type, mod_path),
+                              ImportError('No module named %s' %
+                                          scraper_type))
+        module_name, class_name = indexed
+        module = __import__(module_name, fromlist=[class_name])
+        return getattr(module, class_name)
+
     # act of importing puts it into the registry
     try:
         mod_path = '%s.%s' % (mod_path, scraper_type)
@@ -1,17 +1,53 @@
-import os
-import json
+import time
+import calendar
+import datetime
 
 from billy.scrape import Scraper, SourcedObject, JSONDateEncoder
+from billy.scrape.validator import load_schema
+
+
+def _timestamp(value):
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return calendar.timegm(value.timetuple())
+
+
+def _priority(candidate):
+    # bills the database hasn't seen, then most recently active, then
+    # those nothing is known about (sorting is stable, so listing order
+    # is kept within each group)
+    if candidate.get('new'):
+        return (0, 0)
+    hints = [_timestamp(candidate[key]) for key in ('last_action',
+                                                    'updated_at')
+             if candidate.get(key)]
+    if hints:
+        return (1, -max(hints))
+    return (2, 0)
 
 
 class BillScraper(Scraper):
 
     scraper_type = 'bills'
 
+    def __init__(self, metadata, deadline=None, db_hints=False, **kwargs):
+        """
+        Create a new BillScraper, takes the arguments of
+        :class:`~billy.scrape.Scraper` as well as:
+
+        :param deadline: time (as returned by :func:`time.time`) after
+            which :meth:`prioritize_bills` stops handing out bills
+        :param db_hints: if True :meth:`prioritize_bills` looks up when
+            each bill last changed in the database
+        """
+        super(BillScraper, self).__init__(metadata, **kwargs)
+        self.deadline = deadline
+        self.db_hints = db_hints
+        # ids of bills left unscraped when the deadline passed
+        self.deferred_bills = []
+
     def _get_schema(self):
-        schema_path = os.path.join(os.path.split(__file__)[0],
-                                   '../schemas/bill.json')
-        schema = json.load(open(schema_path))
+        schema = load_schema('bill')
         schema['properties']['session']['enum'] = self.all_sessions()
         return schema
 
@@ -25,6 +61,58 @@ class BillScraper(Scraper):
         """
         raise NotImplementedError('BillScrapers must define a scrape method')
 
+    def prioritize_bills(self, chamber, session, candidates):
+        """
+        Yield the :class:`BillCandidate` objects in ``candidates`` most
+        actively moving first, for scrapers to scrape in that order::
+
+            candidates = (BillCandidate(bill_id, url=url) for ...)
+            for bill in self.prioritize_bills(chamber, session, candidates):
+                self.scrape_bill(chamber, session, bill['bill_id'],
+                                 bill['url'])
+
+        Bills not yet in the database come first (when :attr:`db_hints` is
+        on), then bills by their most recent ``last_action`` or
+        ``updated_at`` hint, then bills with neither.  Once
+        :attr:`deadline` passes the remaining bills are skipped and listed
+        in :attr:`deferred_bills`.
+        """
+        candidates = list(candidates)
+        if self.db_hints:
+            self._add_db_hints(chamber, session, candidates)
+        candidates.sort(key=_priority)
+
+        for n, candidate in enumerate(candidates):
+            if self.deadline and time.time() > self.deadline:
+                deferred = [c['bill_id'] for c in candidates[n:]]
+                self.warning('out of time, not scraping %d %s %s bills' % (
+                    len(deferred), chamber, session))
+                self.deferred_bills.extend(deferred)
+                return
+            yield candidate
+
+    def _add_db_hints(self, chamber, session, candidates):
+        from billy import db
+
+        spec = {'level': self.level, self.level: getattr(self, self.level),
+                'session': session, 'chamber': chamber}
+        updated = dict((self.bill_key(bill['bill_id']),
+                        bill.get('updated_at')) for bill in
+                       db.bills.find(spec, fields=['bill_id', 'updated_at']))
+        for candidate in candidates:
+            key = self.bill_key(candidate['bill_id'])
+            if key not in updated:
+                candidate['new'] = True
+            elif not candidate.get('updated_at'):
+                candidate['updated_at'] = updated[key]
+
+    def bill_key(self, bill_id):
+        """
+        Key matching a candidate's bill_id to the bill_id the bill is saved
+        with, override if the two are written differently.
+        """
+        return bill_id
+
     def save_bill(self, bill):
         """
         Save a scraped :class:`~billy.scrape.bills.Bill` object.
@@ -37,6 +125,27 @@ class BillScraper(Scraper):
         self.save_object(bill)
 
 
+class BillCandidate(dict):
+    """
+    A bill a scraper knows of, typically from a listing page, but hasn't
+    scraped yet.  See :meth:`BillScraper.prioritize_bills`.
+    """
+
+    def __init__(self, bill_id, last_action=None, updated_at=None,
+                 **kwargs):
+        """
+        :param bill_id: the bill's id
+        :param last_action: date of the bill's latest action if known
+        :param updated_at: when the bill last changed if known
+
+        Any additional keyword arguments are kept for the scraper's use.
+        """
+        super(BillCandidate, self).__init__(**kwargs)
+        self['bill_id'] = bill_id
+        self['last_action'] = last_action
+        self['updated_at'] = updated_at
+
+
 class Bill(SourcedObject):
     """
     Object representing a piece of legislation.
@@ -0,0 +1,270 @@
+"""
+Bulk data files (CSV dumps and the like) as on-disk tables indexed by key.
+
+A :class:`BulkSource` keeps the rows of a bulk file in a SQLite database,
+indexed by a key (usually the bill id) so that a scraper can look up the
+rows for one bill without holding the whole file in memory.  It is only
+downloaded again when the server says it changed, and only reloaded if
+its contents did (or the key or parser it is indexed with changed).
+
+Scrapers normally get sources through
+:meth:`billy.scrape.Scraper.bulk_source`, which shares one per file between
+all the scrapers of a process.
+"""
+import os
+import csv
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import cPickle as pickle
+
+from billy.conf import settings
+
+_sources = {}
+# one lock per source, so a slow download only holds up its own source
+_source_locks = {}
+_source_locks_lock = threading.Lock()
+
+
+def csv_rows(f):
+    """ the default parser: a CSV file with a header row """
+    return csv.DictReader(f)
+
+
+def _fingerprint(func):
+    """ identifies a column name or the code of a function """
+    if func is None or isinstance(func, basestring):
+        return repr(func)
+    code = getattr(func, 'func_code', None)
+    if code is None:
+        return '%s.%s' % (getattr(func, '__module__', None),
+                          getattr(func, '__name__', repr(func)))
+    return hashlib.sha1(repr((code.co_code, code.co_consts,
+                              code.co_names))).hexdigest()
+
+
+def _sha1_file(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), ''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class BulkSource(object):
+    """
+    The rows of a bulk file, stored at ``path`` and indexed by ``key``
+    (a column name or a function of a row).
+
+    ``parser`` turns an open file into an iterable of row dicts (default:
+    :func:`csv_rows`) and ``types`` maps column names to functions
+    converting their (non-empty) values when rows are read, e.g.
+    ``{'act_date': parse_date}``; empty values are read as None.
+    """
+
+    def __init__(self, path, key, parser=None, types=None):
+        self.path = path
+        self.key = key
+        self.parser = parser or csv_rows
+        self.types = types or {}
+        self.fingerprint = '%s %s' % (_fingerprint(key),
+                                      _fingerprint(parser))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.inode != self._inode():
+            db = sqlite3.connect(self.path, timeout=60)
+            db.text_factory = str
+            self._local.db = db
+            self._local.inode = self._inode()
+        return db
+
+    def _inode(self):
+        # a reload replaces the file, connections to the old one are stale
+        try:
+            return os.stat(self.path).st_ino
+        except OSError:
+            return None
+
+    @property
+    def loaded(self):
+        return os.path.exists(self.path)
+
+    def _meta(self, name):
+        if not self.loaded:
+            return None
+        row = self._db.execute('SELECT value FROM meta WHERE name=?',
+                               (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name, value):
+        self._db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                         (name, value))
+        self._db.commit()
+
+    def _key(self, row):
+        if callable(self.key):
+            return self.key(row)
+        return row[self.key]
+
+    def load(self, filename, stamp=None):
+        """
+        (Re)build the table from the bulk file at filename, returns the
+        number of rows
+        """
+        dirname = os.path.dirname(self.path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        fd, tmp_path = tempfile.mkstemp('.sqlite', dir=dirname or None)
+        os.close(fd)
+        count = 0
+        try:
+            db = sqlite3.connect(tmp_path)
+            db.text_factory = str
+            db.execute('CREATE TABLE meta (name TEXT PRIMARY KEY, '
+                       'value TEXT)')
+            db.execute('CREATE TABLE rows (seq INTEGER PRIMARY KEY, '
+                       'key TEXT, data BLOB)')
+            db.execute('CREATE TABLE keys (key TEXT PRIMARY KEY)')
+
+            with open(filename, 'rb') as f:
+                for row in self.parser(f):
+                    count += 1
+                    db.execute('INSERT INTO rows (key, data) VALUES (?, ?)',
+                               (self._key(row), sqlite3.Binary(
+                                   pickle.dumps(sorted(row.items()), 2))))
+            db.execute('CREATE INDEX rows_key ON rows (key, seq)')
+            db.execute('INSERT INTO keys SELECT DISTINCT key FROM rows')
+
+            db.executemany('INSERT INTO meta VALUES (?, ?)',
+                           [('stamp', stamp),
+                            ('sha1', _sha1_file(filename)),
+                            ('fingerprint', self.fingerprint)])
+            db.commit()
+            db.close()
+            os.rename(tmp_path, self.path)
+        except:
+            os.remove(tmp_path)
+            raise
+        return count
+
+    def refresh(self, scraper, url):
+        """
+        Bring the table up to date with the bulk file at url, downloaded
+        with scraper, returns True if it was reloaded.
+
+        The download is skipped if the FTP listing (size and mtime) or the
+        HTTP headers (ETag, Last-Modified and Content-Length) are what they
+        were last time, and the reload if the file is byte for byte the
+        same, unless the table was built with a different key or parser.
+        """
+        current = (self.loaded and
+                   self._meta('fingerprint') == self.fingerprint)
+
+        stamp = self._stamp(scraper, url)
+        if stamp and current and stamp == self._meta('stamp'):
+            scraper.debug('%s unchanged, not downloading' % url)
+            return False
+
+        filename, resp = scraper.urlretrieve(url)
+        try:
+            if current and _sha1_file(filename) == self._meta('sha1'):
+                scraper.debug('%s unchanged, not reloading' % url)
+                self._set_meta('stamp', stamp)
+                return False
+            count = self.load(filename, stamp)
+        finally:
+            os.remove(filename)
+        scraper.log('loaded %d rows from %s' % (count, url))
+        return True
+
+    def _stamp(self, scraper, url):
+        try:
+            if url.startswith('ftp://'):
+                entry = scraper._ftp_entry(url)
+                if entry:
+                    return '%s %s' % (entry.size, entry.mtime.isoformat())
+            else:
+                headers = scraper.urlopen(url, 'HEAD').response.headers
+                if headers.get('etag') or headers.get('last-modified'):
+                    return ' '.join(headers.get(h, '') for h in (
+                        'etag', 'last-modified', 'content-length'))
+        except Exception as e:
+            scraper.debug("couldn't check %s for changes: %s" % (url, e))
+        return None
+
+    def _typed(self, data):
+        row = dict(pickle.loads(str(data)))
+        for column, convert in self.types.iteritems():
+            if column not in row:
+                continue
+            if row[column] in ('', None):
+                row[column] = None
+            else:
+                row[column] = convert(row[column])
+        return row
+
+    def get(self, key):
+        """ rows for key, in file order """
+        return [self._typed(data) for (data,) in self._db.execute(
+            'SELECT data FROM rows WHERE key=? ORDER BY seq', (key,))]
+
+    def first(self, key, default=None):
+        """ the first row for key, or default """
+        rows = self._db.execute('SELECT data FROM rows WHERE key=? '
+                                'ORDER BY seq LIMIT 1', (key,)).fetchone()
+        return self._typed(rows[0]) if rows else default
+
+    def rows(self):
+        """ every row, in file order """
+        for (data,) in self._db.execute('SELECT data FROM rows '
+                                        'ORDER BY seq'):
+            yield self._typed(data)
+
+    def keys(self):
+        return [key for (key,) in self._db.execute('SELECT key FROM keys')]
+
+    def __contains__(self, key):
+        return self._db.execute('SELECT 1 FROM keys WHERE key=?',
+                                (key,)).fetchone() is not None
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM keys').fetchone()[0]
+
+
+def get_bulk_source(scraper, url, key, name=None, parser=None, types=None):
+    """
+    The process-wide :class:`BulkSource` for url, stored in
+    ``<BILLY_CACHE_DIR>/bulk/<state>/<name>.sqlite`` (name defaults to the
+    file's name).  It is refreshed the first time it is asked for.
+
+    Asking for the same file with a different key or parser is an error,
+    give it another name.
+    """
+    if name is None:
+        name = os.path.splitext(url.rstrip('/').rsplit('/', 1)[-1])[0]
+    if settings.BILLY_CACHE_DIR:
+        bulk_dir = os.path.join(settings.BILLY_CACHE_DIR, 'bulk')
+    else:
+        bulk_dir = os.path.join(tempfile.gettempdir(), 'billy_bulk')
+    path = os.path.join(bulk_dir, scraper.state, '%s.sqlite' % name)
+
+    with _source_locks_lock:
+        lock = _source_locks.setdefault(path, threading.Lock())
+    with lock:
+        source = _sources.get(path)
+        wanted = BulkSource(path, key, parser, types)
+        if source is None:
+            wanted.refresh(scraper, url)
+            _sources[path] = source = wanted
+        elif source.fingerprint != wanted.fingerprint:
+            raise ValueError('%s is already indexed by another key or '
+                             'parser, use another name' % url)
+    if (types or {}) != source.types:
+        # the same table, read with these types
+        return wanted
+    return source
@@ -0,0 +1,221 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import tempfile
+import threading
+
+
+class CompressedCache(object):
+    """
+    httplib2 cache (get/set/delete) that stores response bodies
+    zlib-compressed and deduplicated by their SHA-1.
+
+    Layout under ``cache_dir``::
+
+        index.sqlite            key -> (body hash, headers, last access)
+        objects/ab/abcdef...    compressed bodies, one per distinct body
+
+    If ``max_size`` (in bytes of compressed bodies) is given, the least
+    recently used entries are evicted once the cache grows past it.
+
+    Writes take the index's write lock before touching objects: an
+    object is written before the entry referring to it is committed, and
+    only removed while no entry can be added for it.
+    """
+
+    # only record a new access time if the old one is at least this old,
+    # keeps cache hits from turning into database writes
+    atime_resolution = 3600
+
+    # how many sets to allow between checks of the size cap
+    prune_interval = 200
+
+    def __init__(self, cache_dir, max_size=None):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.index_path = os.path.join(cache_dir, 'index.sqlite')
+        self.max_size = max_size
+        self._local = threading.local()
+        self._sets = 0
+
+        try:
+            os.makedirs(self.objects_dir)
+        except OSError as e:
+            if e.errno != 17:
+                raise e
+
+        db = self._db
+        db.execute('CREATE TABLE IF NOT EXISTS entries ('
+                   'key TEXT PRIMARY KEY, hash TEXT NOT NULL, '
+                   'headers BLOB NOT NULL, atime REAL NOT NULL)')
+        db.execute('CREATE INDEX IF NOT EXISTS entries_hash '
+                   'ON entries (hash)')
+        db.execute('CREATE INDEX IF NOT EXISTS entries_atime '
+                   'ON entries (atime)')
+        db.execute('CREATE TABLE IF NOT EXISTS objects ('
+                   'hash TEXT PRIMARY KEY, size INTEGER NOT NULL, '
+                   'raw_size INTEGER NOT NULL)')
+        db.commit()
+
+    @property
+    def _db(self):
+        # sqlite connections can't be shared between threads
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.index_path, timeout=60,
+                                 isolation_level='IMMEDIATE')
+            db.text_factory = str
+            self._local.db = db
+        return db
+
+    def _object_path(self, hash):
+        return os.path.join(self.objects_dir, hash[:2], hash)
+
+    def _write_object(self, hash, data):
+        # called in a write transaction, so the object can't be removed
+        # between checking for it and committing the entry
+        path = self._object_path(hash)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError as e:
+            if e.errno != 17:
+                raise e
+        # write then rename so readers never see a partial object
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.rename(tmp_path, path)
+
+    def _release(self, db, hash):
+        """
+        drop the object row for hash if no entries refer to it, returns
+        the path of the file to remove (before committing) or None
+        """
+        if db.execute('SELECT 1 FROM entries WHERE hash=? LIMIT 1',
+                      (hash,)).fetchone():
+            return None
+        db.execute('DELETE FROM objects WHERE hash=?', (hash,))
+        return self._object_path(hash)
+
+    def _unlink(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get(self, key):
+        db = self._db
+        row = db.execute('SELECT hash, headers, atime FROM entries '
+                         'WHERE key=?', (key,)).fetchone()
+        if not row:
+            return None
+        hash, headers, atime = row
+
+        try:
+            with open(self._object_path(hash), 'rb') as f:
+                body = zlib.decompress(f.read())
+        except (IOError, zlib.error):
+            # object went missing or is corrupt, treat as a miss
+            self.delete(key)
+            return None
+
+        now = time.time()
+        if now - atime > self.atime_resolution:
+            db.execute('UPDATE entries SET atime=? WHERE key=?', (now, key))
+            db.commit()
+
+        return str(headers) + '\r\n\r\n' + body
+
+    def set(self, key, value):
+        # httplib2 stores "status: ...\r\n<headers>\r\n\r\n<body>"
+        headers, _, body = value.partition('\r\n\r\n')
+        hash = hashlib.sha1(body).hexdigest()
+        compressed = zlib.compress(body)
+
+        db = self._db
+        # (starts the write transaction)
+        db.execute('INSERT OR IGNORE INTO objects (hash, size, raw_size) '
+                   'VALUES (?, ?, ?)', (hash, len(compressed), len(body)))
+        old = db.execute('SELECT hash FROM entries WHERE key=?',
+                         (key,)).fetchone()
+        db.execute('INSERT OR REPLACE INTO entries (key, hash, headers, '
+                   'atime) VALUES (?, ?, ?, ?)',
+                   (key, hash, sqlite3.Binary(headers), time.time()))
+        try:
+            self._write_object(hash, compressed)
+            if old and old[0] != hash:
+                self._unlink(filter(None, [self._release(db, old[0])]))
+        except:
+            db.rollback()
+            raise
+        db.commit()
+
+        self._sets += 1
+        if self.max_size and self._sets % self.prune_interval == 0:
+            self.prune(self.max_size)
+
+    def delete(self, key):
+        db = self._db
+        row = db.execute('SELECT hash FROM entries WHERE key=?',
+                         (key,)).fetchone()
+        if not row:
+            return
+        # (unless it was replaced since it was read)
+        if db.execute('DELETE FROM entries WHERE key=? AND hash=?',
+                      (key, row[0])).rowcount:
+            self._unlink(filter(None, [self._release(db, row[0])]))
+        db.commit()
+
+    def stats(self):
+        """
+        returns a dict with the number of entries, distinct objects and
+        the compressed and uncompressed size of the objects in bytes
+        """
+        db = self._db
+        entries = db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        objects, size, raw_size = db.execute(
+            'SELECT COUNT(*), SUM(size), SUM(raw_size) FROM objects'
+        ).fetchone()
+        return {'entries': entries, 'objects': objects,
+                'size': size or 0, 'raw_size': raw_size or 0}
+
+    def prune(self, max_size):
+        """
+        evict least recently used entries until the compressed objects
+        take up no more than max_size bytes, returns the number of
+        entries evicted
+        """
+        db = self._db
+        total = db.execute('SELECT SUM(size) FROM objects').fetchone()[0]
+        total = total or 0
+        if total <= max_size:
+            return 0
+
+        evicted = 0
+        orphans = []
+        while total > max_size:
+            rows = db.execute('SELECT key, hash FROM entries '
+                              'ORDER BY atime LIMIT 500').fetchall()
+            if not rows:
+                break
+            for key, hash in rows:
+                if total <= max_size:
+                    break
+                if not db.execute('DELETE FROM entries WHERE key=? AND '
+                                  'hash=?', (key, hash)).rowcount:
+                    continue
+                evicted += 1
+                size = db.execute('SELECT size FROM objects WHERE hash=?',
+                                  (hash,)).fetchone()
+                path = self._release(db, hash)
+                if path:
+                    orphans.append(path)
+                    total -= size[0] if size else 0
+        self._unlink(orphans)
+        db.commit()
+        return evicted
@@ -0,0 +1,126 @@
+import json
+import zlib
+import sqlite3
+import hashlib
+import urllib2
+import threading
+from collections import defaultdict
+
+import scrapelib
+
+
+class Cassette(object):
+    """
+    Archive of the requests a scrape made and the responses it got, kept
+    in a single SQLite file so a run can be replayed later without
+    touching the network.
+
+    In ``'record'`` mode :meth:`record` and :meth:`record_error` add to the
+    cassette. In ``'replay'`` mode :meth:`play` serves responses back: a
+    request made several times gets the recorded responses in the order
+    they were recorded (the last one repeating), which keeps replays
+    deterministic.
+    """
+
+    def __init__(self, path, mode='replay'):
+        if mode not in ('record', 'replay'):
+            raise ValueError('invalid cassette mode: %s' % mode)
+        self.path = path
+        self.mode = mode
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._plays = defaultdict(int)
+
+        db = self._db
+        if mode == 'record':
+            db.execute('DROP TABLE IF EXISTS interactions')
+        db.execute('CREATE TABLE IF NOT EXISTS interactions ('
+                   'id INTEGER PRIMARY KEY, key TEXT NOT NULL, '
+                   'url TEXT NOT NULL, code INTEGER, headers TEXT, '
+                   'body BLOB, is_unicode INTEGER, error TEXT)')
+        db.execute('CREATE INDEX IF NOT EXISTS interactions_key '
+                   'ON interactions (key, id)')
+        db.commit()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=60)
+            db.text_factory = str
+            self._local.db = db
+        return db
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    def _key(self, url, method, body):
+        return hashlib.sha1('%s %s\n%s' % (method.upper(), url,
+                                           body or '')).hexdigest()
+
+    def _insert(self, key, url, code=None, headers=None, body=None,
+                is_unicode=False, error=None):
+        db = self._db
+        with self._lock:
+            db.execute('INSERT INTO interactions (key, url, code, headers, '
+                       'body, is_unicode, error) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                       (key, url, code, headers, body, is_unicode, error))
+            db.commit()
+
+    def record(self, url, method, body, response, data):
+        """
+        store the :class:`scrapelib.Response` and body received for a
+        request
+        """
+        is_unicode = isinstance(data, unicode)
+        data = data.encode('utf8') if is_unicode else str(data)
+        self._insert(self._key(url, method, body), response.url,
+                     code=response.code,
+                     headers=json.dumps(dict(response.headers or {})),
+                     body=sqlite3.Binary(zlib.compress(data)),
+                     is_unicode=is_unicode)
+
+    def record_error(self, url, method, body, error):
+        """ store an exception urlopen raised for a request """
+        self._insert(self._key(url, method, body), url,
+                     error=str(getattr(error, 'reason', error)))
+
+    def play(self, scraper, url, method, body):
+        """
+        get the recorded result for a request, wrapped by scraper as a
+        live response would be
+        """
+        key = self._key(url, method, body)
+        with self._lock:
+            offset = self._plays[key]
+            self._plays[key] += 1
+
+        db = self._db
+        row = db.execute('SELECT url, code, headers, body, is_unicode, error '
+                         'FROM interactions WHERE key=? ORDER BY id '
+                         'LIMIT 1 OFFSET ?', (key, offset)).fetchone()
+        if row is None and offset:
+            row = db.execute('SELECT url, code, headers, body, is_unicode, '
+                             'error FROM interactions WHERE key=? '
+                             'ORDER BY id DESC LIMIT 1', (key,)).fetchone()
+        if row is None:
+            raise urllib2.URLError('%s %s not in cassette %s' % (
+                method, url, self.path))
+
+        final_url, code, headers, data, is_unicode, error = row
+        if error is not None:
+            raise urllib2.URLError(error)
+
+        data = zlib.decompress(data)
+        if is_unicode:
+            data = data.decode('utf8')
+        headers = json.loads(headers)
+        response = scrapelib.Response(final_url, url, code=code,
+                                      protocol=url.split(':', 1)[0],
+                                      headers=headers)
+        return scraper._wrap_result(response, data)
@@ -1,7 +1,5 @@
-import os
-import json
-
 from billy.scrape import Scraper, SourcedObject, JSONDateEncoder
+from billy.scrape.validator import load_schema
 
 
 class CommitteeScraper(Scraper):
@@ -9,9 +7,7 @@ class CommitteeScraper(Scraper):
     scraper_type = 'committees'
 
     def _get_schema(self):
-        schema_path = os.path.join(os.path.split(__file__)[0],
-                                   '../schemas/committee.json')
-        schema = json.load(open(schema_path))
+        schema = load_schema('committee')
         return schema
 
     def scrape(self, chamber, term):
@@ -1,8 +1,7 @@
-import os
 import uuid
-import json
 
 from billy.scrape import Scraper, SourcedObject, JSONDateEncoder
+from billy.scrape.validator import load_schema
 
 
 class EventScraper(Scraper):
@@ -10,12 +9,7 @@ class EventScraper(Scraper):
     scraper_type = 'events'
 
     def _get_schema(self):
-        schema_path = os.path.join(os.path.split(__file__)[0],
-                                   '../schemas/event.json')
-
-        with open(schema_path) as f:
-            schema = json.load(f)
-
+        schema = load_schema('event')
         return schema
 
     def scrape(self, chamber, session):
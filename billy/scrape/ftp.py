@@ -0,0 +1,206 @@
+import re
+import socket
+import urllib
+import ftplib
+import sqlite3
+import urllib2
+import urlparse
+import datetime
+import threading
+import collections
+
+
+FTPEntry = collections.namedtuple('FTPEntry', 'filename size mtime is_dir')
+
+_dos_re = re.compile(r'^(?P<mtime>\d\d-\d\d-\d\d\s+\d\d:\d\d[AP]M)\s+'
+                     r'(?P<size><DIR>|\d+)\s+(?P<filename>.+?)\s*$')
+_unix_re = re.compile(r'^(?P<type>[-dl])[rwxsStT-]{9}\S*\s+\d+\s+'
+                      r'\S+\s+\S+\s+(?P<size>\d+)\s+'
+                      r'(?P<mtime>[A-Z][a-z]{2}\s+\d+\s+(\d\d:\d\d|\d{4}))\s+'
+                      r'(?P<filename>.+?)\s*$')
+
+
+def _parse_unix_mtime(mtime):
+    mtime = re.sub(r'\s+', ' ', mtime)
+    if ':' not in mtime:
+        return datetime.datetime.strptime(mtime, '%b %d %Y')
+
+    # recent files are listed without a year, they are never in the future
+    now = datetime.datetime.now()
+    mtime = datetime.datetime.strptime(mtime, '%b %d %H:%M')
+    mtime = mtime.replace(year=now.year)
+    if mtime > now + datetime.timedelta(days=1):
+        mtime = mtime.replace(year=now.year - 1)
+    return mtime
+
+
+def parse_listing(text):
+    """
+    Parse the output of an FTP LIST command, in either the Unix ``ls -l``
+    or MS-DOS style, into a list of :class:`FTPEntry` tuples.
+
+    Lines in neither format (totals, symlink targets, etc.) are skipped.
+    """
+    entries = []
+    for line in text.splitlines():
+        match = _dos_re.match(line)
+        if match:
+            size = match.group('size')
+            is_dir = size == '<DIR>'
+            mtime = datetime.datetime.strptime(
+                re.sub(r'\s+', ' ', match.group('mtime')),
+                '%m-%d-%y %I:%M%p')
+            entries.append(FTPEntry(match.group('filename'),
+                                    0 if is_dir else int(size),
+                                    mtime, is_dir))
+            continue
+
+        match = _unix_re.match(line)
+        if match:
+            filename = match.group('filename')
+            if match.group('type') == 'l':
+                filename = filename.split(' -> ')[0]
+            entries.append(FTPEntry(filename, int(match.group('size')),
+                                    _parse_unix_mtime(match.group('mtime')),
+                                    match.group('type') == 'd'))
+    return entries
+
+
+class FTPPool(object):
+    """
+    Keeps one logged in :class:`ftplib.FTP` connection per host (and per
+    thread, as ftplib isn't thread-safe) open for reuse, so that a scraper
+    walking hundreds of files on one server only logs in once.
+
+    Failures are raised as :class:`urllib2.URLError` to match what
+    scrapelib raises for FTP URLs.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connections(self):
+        if not hasattr(self._local, 'connections'):
+            self._local.connections = {}
+        return self._local.connections
+
+    def _connect(self, parsed):
+        key = (parsed.hostname, parsed.port, parsed.username)
+        connections = self._connections()
+        ftp = connections.get(key)
+        if ftp is None:
+            ftp = ftplib.FTP()
+            if self.timeout:
+                ftp.connect(parsed.hostname, parsed.port or ftplib.FTP_PORT,
+                            self.timeout)
+            else:
+                ftp.connect(parsed.hostname, parsed.port or ftplib.FTP_PORT)
+            ftp.login(urllib.unquote(parsed.username or 'anonymous'),
+                      urllib.unquote(parsed.password or ''))
+            connections[key] = ftp
+        return key, ftp
+
+    def _drop(self, key):
+        ftp = self._connections().pop(key, None)
+        if ftp:
+            try:
+                ftp.close()
+            except Exception:
+                pass
+
+    def _transfer(self, ftp, cmd, type):
+        ftp.voidcmd('TYPE ' + type)
+        chunks = []
+        conn = ftp.transfercmd(cmd)
+        try:
+            while True:
+                data = conn.recv(8192)
+                if not data:
+                    break
+                chunks.append(data)
+        finally:
+            conn.close()
+        ftp.voidresp()
+        return ''.join(chunks)
+
+    def _retrieve(self, ftp, path):
+        dirname, filename = path.rsplit('/', 1)
+        ftp.cwd(dirname or '/')
+
+        if filename:
+            try:
+                return self._transfer(ftp, 'RETR ' + filename, 'I')
+            except ftplib.error_perm as e:
+                # like urllib, fall back to listing it as a directory
+                if not str(e).startswith('550'):
+                    raise
+                ftp.cwd(filename)
+
+        return self._transfer(ftp, 'LIST', 'A')
+
+    def retrieve(self, url):
+        """
+        Get the file at an ftp:// URL, or the LIST output if it is a
+        directory.
+        """
+        parsed = urlparse.urlparse(url)
+        path = urllib.unquote(parsed.path) or '/'
+
+        # a pooled connection may have been closed by the server since its
+        # last use, in which case reconnect once and try again
+        for attempt in (1, 2):
+            key, ftp = None, None
+            try:
+                key, ftp = self._connect(parsed)
+                return self._retrieve(ftp, path)
+            except (EOFError, socket.error, ftplib.error_temp,
+                    ftplib.error_reply) as e:
+                if key:
+                    self._drop(key)
+                if attempt == 2 or key is None:
+                    raise urllib2.URLError('ftp error: %s' % e)
+            except ftplib.error_perm as e:
+                raise urllib2.URLError('ftp error: %s' % e)
+
+    def close(self):
+        """ close this thread's connections """
+        for key in self._connections().keys():
+            self._drop(key)
+
+
+class FTPState(object):
+    """
+    Remembers the size and mtime each FTP file had when it was last
+    processed, persisted in a small SQLite database so that it survives
+    between runs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        db = self._db
+        db.execute('CREATE TABLE IF NOT EXISTS files ('
+                   'url TEXT PRIMARY KEY, size INTEGER, mtime TEXT)')
+        db.commit()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=60)
+            db.text_factory = str
+            self._local.db = db
+        return db
+
+    def get(self, url):
+        """ (size, mtime isoformat) as last recorded, or None """
+        row = self._db.execute('SELECT size, mtime FROM files WHERE url=?',
+                               (url,)).fetchone()
+        return tuple(row) if row else None
+
+    def set(self, url, entry):
+        self._db.execute('INSERT OR REPLACE INTO files (url, size, mtime) '
+                         'VALUES (?, ?, ?)',
+                         (url, entry.size, entry.mtime.isoformat()))
+        self._db.commit()
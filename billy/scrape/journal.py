@@ -0,0 +1,92 @@
+import os
+import json
+import threading
+from collections import defaultdict
+
+
+class RunJournal(object):
+    """
+    Append-only record of a scraper type's progress through a run: the
+    files saved for each (chamber, session/term) unit, URLs skipped because
+    their host was down and which units finished, one JSON object per line
+    so that nothing is lost if the run dies.
+
+    If ``resume`` is True the existing journal at ``path`` is loaded and
+    added to, otherwise a new one is started.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._completed = set()
+        self._saved = defaultdict(list)
+        self._skipped = defaultdict(list)
+        line = '\n'
+
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # last line may be cut short by a crash
+                        continue
+                    unit = tuple(entry['unit'])
+                    if entry['event'] == 'saved':
+                        self._saved[unit].append(entry['filename'])
+                    elif entry['event'] == 'skipped':
+                        self._skipped[unit].append(entry['url'])
+                    elif entry['event'] == 'completed':
+                        self._completed.add(unit)
+
+        self._file = open(path, 'a' if resume else 'w')
+        if not line.endswith('\n'):
+            self._file.write('\n')
+
+    def _write(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry) + '\n')
+            self._file.flush()
+
+    def saved(self, unit, filename):
+        """ record that filename was written while scraping unit """
+        unit = tuple(unit)
+        self._saved[unit].append(filename)
+        self._write({'event': 'saved', 'unit': unit, 'filename': filename})
+
+    def skipped(self, unit, url):
+        """
+        record that url wasn't requested while scraping unit because its
+        host was down
+        """
+        unit = tuple(unit)
+        self._skipped[unit].append(url)
+        self._write({'event': 'skipped', 'unit': unit, 'url': url})
+
+    def complete(self, unit):
+        """ record that unit was scraped successfully """
+        unit = tuple(unit)
+        self._completed.add(unit)
+        self._write({'event': 'completed', 'unit': unit})
+
+    def is_complete(self, unit):
+        return tuple(unit) in self._completed
+
+    def incomplete_files(self):
+        """ files saved by units that never completed """
+        files = []
+        for unit, filenames in self._saved.iteritems():
+            if unit not in self._completed:
+                files.extend(filenames)
+        return files
+
+    def skipped_urls(self):
+        """ urls skipped by units that never completed """
+        urls = []
+        for unit, unit_urls in self._skipped.iteritems():
+            if unit not in self._completed:
+                urls.extend(unit_urls)
+        return urls
+
+    def close(self):
+        self._file.close()
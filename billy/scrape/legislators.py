@@ -1,7 +1,5 @@
-import os
-import json
-
 from billy.scrape import Scraper, SourcedObject, JSONDateEncoder
+from billy.scrape.validator import load_schema
 
 
 class LegislatorScraper(Scraper):
@@ -9,9 +7,7 @@ class LegislatorScraper(Scraper):
     scraper_type = 'legislators'
 
     def _get_schema(self):
-        schema_path = os.path.join(os.path.split(__file__)[0],
-                                   '../schemas/person.json')
-        schema = json.load(open(schema_path))
+        schema = load_schema('person')
         terms = [t['name'] for t in self.metadata['terms']]
         schema['properties']['roles']['items']['properties']['term']['enum'] = terms
         return schema
@@ -0,0 +1,120 @@
+import os
+import glob
+import gzip
+import json
+import time
+import itertools
+import threading
+
+# output formats understood by Scraper.save_object
+OUTPUT_FORMATS = ('json', 'jsonl', 'jsonl.gz')
+
+_segment_patterns = ('*.json', '*.jsonl', '*.jsonl.gz')
+
+# numbers segments uniquely within a process, along with the pid and the
+# time the run started this keeps names from colliding between runs
+_segment_counter = itertools.count()
+_segment_lock = threading.Lock()
+_started = int(time.time())
+
+
+def _open_segment(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def scraped_files(directory):
+    """
+    every file of scraped objects in directory, both single object .json
+    files and .jsonl(.gz) segments
+    """
+    paths = []
+    for pattern in _segment_patterns:
+        paths.extend(glob.glob(os.path.join(directory, pattern)))
+    return sorted(paths)
+
+
+def iter_scraped_objects(directory):
+    """
+    yield each object saved in directory regardless of the format it was
+    written in, segments are read a line at a time
+    """
+    for path in scraped_files(directory):
+        if path.endswith('.json'):
+            with open(path) as f:
+                yield json.load(f)
+        else:
+            with _open_segment(path) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+def clear_scraped_files(directory):
+    """ remove every file of scraped objects from directory """
+    for path in scraped_files(directory):
+        os.remove(path)
+
+
+class SegmentWriter(object):
+    """
+    Appends objects as JSON lines to segment files in ``directory``,
+    starting a new segment every ``segment_size`` objects.
+
+    Segments are written to a ``.part`` file and only renamed into place
+    once complete, so importers never pick up half-written data. Call
+    :meth:`close` when done to finish the last segment.
+
+    If given, ``on_segment`` is called with the filename of each segment
+    as it is started.
+    """
+
+    def __init__(self, directory, prefix, compress=False, segment_size=1000,
+                 encoder=None, on_segment=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.compress = compress
+        self.segment_size = segment_size
+        self.encoder = encoder
+        self.on_segment = on_segment
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._count = 0
+
+    def _start_segment(self):
+        with _segment_lock:
+            number = _segment_counter.next()
+        filename = '%s-%s-%s-%05d.jsonl' % (self.prefix, _started,
+                                            os.getpid(), number)
+        if self.compress:
+            filename += '.gz'
+        if self.on_segment:
+            self.on_segment(filename)
+        self._path = os.path.join(self.directory, filename)
+        if self.compress:
+            self._file = gzip.open(self._path + '.part', 'wb')
+        else:
+            self._file = open(self._path + '.part', 'wb', 1 << 16)
+        self._count = 0
+
+    def _finish_segment(self):
+        if self._file:
+            self._file.close()
+            os.rename(self._path + '.part', self._path)
+            self._file = None
+
+    def write(self, obj):
+        line = json.dumps(obj, cls=self.encoder) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._start_segment()
+            self._file.write(line)
+            self._count += 1
+            if self._count >= self.segment_size:
+                self._finish_segment()
+
+    def close(self):
+        with self._lock:
+            self._finish_segment()
@@ -0,0 +1,126 @@
+import os
+import zlib
+import hashlib
+import tempfile
+import threading
+import subprocess
+from multiprocessing.pool import ThreadPool
+
+_commands = {'text': ['pdftotext', '-layout', '{0}', '-'],
+             'text-nolayout': ['pdftotext', '{0}', '-'],
+             'xml': ['pdftohtml', '-xml', '-stdout', '{0}'],
+             'html': ['pdftohtml', '-stdout', '{0}']}
+
+
+def _run_converter(filename, type):
+    command = [arg.format(filename) for arg in _commands[type]]
+    pipe = subprocess.Popen(command, stdout=subprocess.PIPE,
+                            close_fds=True).stdout
+    data = pipe.read()
+    pipe.close()
+    return data
+
+
+class _Converted(object):
+    """ stands in for an AsyncResult when the result was cached """
+
+    def __init__(self, value):
+        self.value = value
+
+    def ready(self):
+        return True
+
+    def get(self, timeout=None):
+        return self.value
+
+
+class PDFConverter(object):
+    """
+    Converts PDFs with pdftotext/pdftohtml, remembering the output by the
+    SHA-1 of the PDF so an unchanged document is never converted twice.
+
+    Conversions submitted with :meth:`submit` run on a pool of
+    ``workers`` threads, each of which drives one converter process at a
+    time, so at most ``workers`` conversions run at once and the caller
+    can keep fetching in the meantime.
+
+    Cached output is stored zlib-compressed under
+    ``cache_dir/<type>/ab/abcdef...``, if ``cache_dir`` is None only the
+    pool is used.
+    """
+
+    def __init__(self, cache_dir=None, workers=4):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _cache_path(self, hash, type):
+        return os.path.join(self.cache_dir, type, hash[:2], hash)
+
+    def _cache_get(self, hash, type):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(hash, type), 'rb') as f:
+                return zlib.decompress(f.read())
+        except (IOError, zlib.error):
+            return None
+
+    def _cache_set(self, hash, type, output):
+        if not self.cache_dir:
+            return
+        path = self._cache_path(hash, type)
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError as e:
+            if e.errno != 17:
+                raise e
+        # write then rename so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(zlib.compress(output))
+        os.rename(tmp_path, path)
+
+    def _convert(self, data, hash, type):
+        fd, filename = tempfile.mkstemp(suffix='.pdf')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            output = _run_converter(filename, type)
+        finally:
+            os.remove(filename)
+        self._cache_set(hash, type, output)
+        return output
+
+    def convert(self, data, type='xml'):
+        """ convert the PDF in the string data, returns the output """
+        if type not in _commands:
+            raise ValueError('unknown PDF conversion type: %s' % type)
+        hash = hashlib.sha1(data).hexdigest()
+        output = self._cache_get(hash, type)
+        if output is None:
+            output = self._convert(data, hash, type)
+        return output
+
+    def convert_file(self, filename, type='xml'):
+        """ convert the PDF at filename, returns the output """
+        with open(filename, 'rb') as f:
+            return self.convert(f.read(), type)
+
+    def submit(self, data, type='xml'):
+        """
+        queue the PDF in the string data for conversion, returns an object
+        whose get() method blocks until the output is available
+        """
+        if type not in _commands:
+            raise ValueError('unknown PDF conversion type: %s' % type)
+        hash = hashlib.sha1(data).hexdigest()
+        output = self._cache_get(hash, type)
+        if output is not None:
+            return _Converted(output)
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPool(self.workers)
+        return self._pool.apply_async(self._convert, (data, hash, type))
@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+
+_fields = ('requests', 'bytes', 'seconds', 'cache_hits', 'cache_misses',
+           'retries', 'errors', 'throttle_seconds', 'parses',
+           'parse_seconds')
+
+
+def _new_stats():
+    return dict.fromkeys(_fields, 0)
+
+
+class ScrapeProfile(object):
+    """
+    Thread-safe tally of where a scrape run spends its time, kept per URL
+    host and per scraper method (eg. ``bills.scrape_bill``).
+
+    For each it counts requests, bytes received, seconds spent requesting
+    (including retries), cache hits and misses, retries, errors, seconds
+    spent waiting on the rate limiter and time spent parsing responses
+    (the body of ``with self.urlopen(...) as page:`` blocks).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.hosts = defaultdict(_new_stats)
+        self.methods = defaultdict(_new_stats)
+
+    def record_request(self, host, method, bytes=0, seconds=0.0,
+                       from_cache=False, retries=0, error=False,
+                       throttle_seconds=0.0):
+        with self._lock:
+            for stats in (self.hosts[host], self.methods[method]):
+                stats['requests'] += 1
+                stats['bytes'] += bytes
+                stats['seconds'] += seconds
+                stats['retries'] += retries
+                stats['throttle_seconds'] += throttle_seconds
+                if error:
+                    stats['errors'] += 1
+                elif from_cache:
+                    stats['cache_hits'] += 1
+                else:
+                    stats['cache_misses'] += 1
+
+    def record_parse(self, host, method, seconds):
+        with self._lock:
+            for stats in (self.hosts[host], self.methods[method]):
+                stats['parses'] += 1
+                stats['parse_seconds'] += seconds
+
+    def as_dict(self):
+        with self._lock:
+            return {'started': self.started,
+                    'elapsed': time.time() - self.started,
+                    'hosts': dict((k, dict(v)) for k, v in
+                                  self.hosts.iteritems()),
+                    'methods': dict((k, dict(v)) for k, v in
+                                    self.methods.iteritems())}
+
+    def summary(self):
+        """ human readable report, slowest hosts and methods first """
+        profile = self.as_dict()
+        lines = ['scrape profile, %.1f seconds' % profile['elapsed']]
+        for title in ('hosts', 'methods'):
+            lines.append('')
+            lines.append('%-40s %8s %10s %9s %9s %7s %7s %9s' % (
+                title, 'requests', 'KB', 'req secs', 'avg ms', 'cached',
+                'retries', 'parse s'))
+            rows = sorted(profile[title].iteritems(), reverse=True,
+                          key=lambda i: (i[1]['seconds'] +
+                                         i[1]['parse_seconds']))
+            for name, stats in rows:
+                avg = (stats['seconds'] / stats['requests'] * 1000
+                       if stats['requests'] else 0)
+                lines.append('%-40s %8d %10.1f %9.1f %9.1f %7d %7d %9.1f' % (
+                    name[:40], stats['requests'], stats['bytes'] / 1024.0,
+                    stats['seconds'], avg, stats['cache_hits'],
+                    stats['retries'], stats['parse_seconds']))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, output_dir):
+        """ write profile.json and profile.txt to output_dir """
+        with open(os.path.join(output_dir, 'profile.json'), 'w') as f:
+            json.dump(self.as_dict(), f, indent=1)
+        with open(os.path.join(output_dir, 'profile.txt'), 'w') as f:
+            f.write(self.summary())
@@ -0,0 +1,169 @@
+import time
+import urlparse
+import threading
+
+
+class RateLimiter(object):
+    """
+    Thread-safe request throttle that can be shared between
+    :class:`~billy.scrape.Scraper` instances.
+
+    Each call to :meth:`wait` reserves the next available request slot and
+    sleeps (outside of the lock) until it arrives, so no matter how many
+    threads are making requests at most ``requests_per_minute`` go out.
+    """
+
+    def __init__(self, requests_per_minute=60):
+        self._lock = threading.Lock()
+        self._next_request = 0
+        self.requests_per_minute = requests_per_minute
+
+    @property
+    def requests_per_minute(self):
+        return self._requests_per_minute
+
+    @requests_per_minute.setter
+    def requests_per_minute(self, value):
+        with self._lock:
+            if value > 0:
+                self._requests_per_minute = value
+                self._interval = 60.0 / value
+            else:
+                self._requests_per_minute = 0
+                self._interval = 0.0
+
+    def wait(self, url=None):
+        """ block until another request may be made """
+        if not self._interval:
+            return
+
+        with self._lock:
+            now = time.time()
+            slot = max(self._next_request, now)
+            self._next_request = slot + self._interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+    def record(self, url, seconds, error=False):
+        """ told how each request went, a fixed rate ignores it """
+        pass
+
+
+class HostRateLimiter(object):
+    """
+    Applies a separate :class:`RateLimiter` to each host, so that
+    requests to one server are never held up by requests to another.
+
+    Has the same interface as :class:`RateLimiter` but :meth:`wait`
+    requires the URL about to be requested.
+    """
+
+    def __init__(self, requests_per_minute=60):
+        self._lock = threading.Lock()
+        self._limiters = {}
+        self.requests_per_minute = requests_per_minute
+
+    def _new_limiter(self, host):
+        return RateLimiter(self.requests_per_minute)
+
+    def limiter_for(self, host):
+        """ get (or create) the :class:`RateLimiter` for host """
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._new_limiter(host)
+                self._limiters[host] = limiter
+            return limiter
+
+    def wait(self, url):
+        """ block until another request may be made to url's host """
+        self.limiter_for(urlparse.urlparse(url).netloc).wait()
+
+    def record(self, url, seconds, error=False):
+        """ told how each request went, fixed rates ignore it """
+        pass
+
+
+class _HostState(object):
+    def __init__(self):
+        self.latency = None
+        self.successes = 0
+        self.last_decrease = 0
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """
+    :class:`HostRateLimiter` that adjusts each host's rate to how well
+    the host is coping, AIMD style.
+
+    Every ``window`` healthy responses from a host raise its rate by
+    ``increase`` requests per minute, up to ``max_rpm``. An error (5xx,
+    timeout, refused connection) or a response taking more than
+    ``slow_factor`` times the host's usual latency multiplies the rate by
+    ``decrease``, down to ``min_rpm``; after a decrease further bad
+    responses are ignored for ``cooldown`` seconds, since requests made at
+    the old rate are still coming back.
+
+    Scrapers report how each request went with :meth:`record`.
+    """
+
+    def __init__(self, requests_per_minute=60, max_rpm=600, min_rpm=6,
+                 increase=6, decrease=0.5, window=10, slow_factor=3.0,
+                 min_slow_seconds=1.0, cooldown=5.0):
+        # unlimited makes no sense as a starting point here
+        super(AdaptiveRateLimiter, self).__init__(
+            requests_per_minute or max_rpm)
+        self.max_rpm = max_rpm
+        self.min_rpm = min_rpm
+        self.increase = increase
+        self.decrease = decrease
+        self.window = window
+        self.slow_factor = slow_factor
+        self.min_slow_seconds = min_slow_seconds
+        self.cooldown = cooldown
+        self._states = {}
+
+    def _new_limiter(self, host):
+        self._states[host] = _HostState()
+        return RateLimiter(min(self.requests_per_minute, self.max_rpm))
+
+    def rates(self):
+        """ current requests per minute of each host """
+        with self._lock:
+            return dict((host, limiter.requests_per_minute)
+                        for host, limiter in self._limiters.iteritems())
+
+    def record(self, url, seconds, error=False):
+        """ adjust the rate for url's host given how a request went """
+        host = urlparse.urlparse(url).netloc
+        limiter = self.limiter_for(host)
+
+        with self._lock:
+            state = self._states[host]
+            slow = (state.latency is not None and
+                    seconds > self.min_slow_seconds and
+                    seconds > state.latency * self.slow_factor)
+
+            if error or slow:
+                state.successes = 0
+                now = time.time()
+                if now - state.last_decrease < self.cooldown:
+                    return
+                state.last_decrease = now
+                rpm = max(self.min_rpm,
+                          limiter.requests_per_minute * self.decrease)
+            else:
+                # moving average of healthy latencies
+                if state.latency is None:
+                    state.latency = seconds
+                else:
+                    state.latency = state.latency * 0.8 + seconds * 0.2
+                state.successes += 1
+                if state.successes < self.window:
+                    return
+                state.successes = 0
+                rpm = min(self.max_rpm,
+                          limiter.requests_per_minute + self.increase)
+
+        limiter.requests_per_minute = rpm
@@ -0,0 +1,171 @@
+import os
+import imp
+import copy
+import json
+import logging
+import datetime
+import threading
+
+from billy.conf import settings
+
+# bump when the layout of the index file changes, older files are ignored
+INDEX_VERSION = 1
+
+SCRAPER_TYPES = ('bills', 'legislators', 'votes', 'committees', 'events')
+
+_log = logging.getLogger('billy')
+
+_indexes = {}
+_index_lock = threading.Lock()
+
+
+def _encode(obj):
+    # metadata holds dates (session_details start/end), keep their type
+    if isinstance(obj, datetime.datetime):
+        return {'__datetime__': obj.strftime('%Y-%m-%dT%H:%M:%S.%f')}
+    if isinstance(obj, datetime.date):
+        return {'__date__': obj.strftime('%Y-%m-%d')}
+    raise TypeError('%r is not JSON serializable' % obj)
+
+
+def _decode(obj):
+    if '__datetime__' in obj:
+        return datetime.datetime.strptime(obj['__datetime__'],
+                                          '%Y-%m-%dT%H:%M:%S.%f')
+    if '__date__' in obj:
+        return datetime.datetime.strptime(obj['__date__'], '%Y-%m-%d').date()
+    return obj
+
+
+def _module_dir(name):
+    """ directory of the scraper package name, found without importing it """
+    try:
+        return imp.find_module(name)[1]
+    except ImportError:
+        return None
+
+
+def _sources(module_dir):
+    """ [mtime, size] of each .py file in a scraper package """
+    sources = {}
+    for filename in os.listdir(module_dir):
+        if filename.endswith('.py'):
+            stat = os.stat(os.path.join(module_dir, filename))
+            sources[filename] = [int(stat.st_mtime), stat.st_size]
+    return sources
+
+
+class ScraperIndex(object):
+    """
+    Prebuilt index of scraper packages, stored as JSON at ``path``.
+
+    For each package (eg. ``nc``) it records the package's metadata and,
+    for each scraper type, the module and name of the scraper class along
+    with the size and modification time of the package's source files.
+    This lets the metadata be read and a scraper be found without importing
+    every scraper of every state; an entry whose sources have changed since
+    it was built is ignored and the package is imported as before.
+
+    Build or refresh the index with :meth:`add` and :meth:`save`
+    (see ``build_scraper_index.py``).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.modules = {}
+
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f, object_hook=_decode)
+            except ValueError:
+                _log.warning('ignoring corrupt scraper index %s' % path)
+            else:
+                if data.get('version') == INDEX_VERSION:
+                    self.modules = data['modules']
+
+    def _entry(self, name):
+        """ the index entry for name if it is up to date, otherwise None """
+        entry = self.modules.get(name)
+        if entry is None:
+            return None
+        module_dir = _module_dir(name)
+        if not module_dir or _sources(module_dir) != entry['sources']:
+            return None
+        return entry
+
+    def metadata(self, name):
+        """ metadata of scraper package name """
+        entry = self._entry(name)
+        if entry is None:
+            return __import__(name, fromlist=['metadata']).metadata
+        return copy.deepcopy(entry['metadata'])
+
+    def scraper(self, name, scraper_type):
+        """
+        ``(module path, class name)`` of name's scraper_type scraper, or
+        None if name has none
+
+        raises KeyError if the index can't tell
+        """
+        entry = self._entry(name)
+        if entry is None or scraper_type in entry['unindexed']:
+            raise KeyError((name, scraper_type))
+        return entry['scrapers'].get(scraper_type)
+
+    def add(self, name):
+        """ import scraper package name and (re)index it """
+        # imported here, billy.scrape uses this module
+        from billy.scrape import _scraper_registry
+
+        module_dir = _module_dir(name)
+        if not module_dir:
+            raise ImportError('No module named %s' % name)
+        entry = {'sources': _sources(module_dir),
+                 'metadata': __import__(name,
+                                        fromlist=['metadata']).metadata,
+                 'scrapers': {},
+                 'unindexed': []}
+
+        for scraper_type in SCRAPER_TYPES:
+            if not os.path.exists(os.path.join(module_dir,
+                                               scraper_type + '.py')):
+                continue
+            _scraper_registry.pop(scraper_type, None)
+            try:
+                __import__('%s.%s' % (name, scraper_type))
+            except Exception as e:
+                # missing dependencies here aren't necessarily missing
+                # where the scraper runs, leave it to be imported then
+                _log.warning('could not import %s.%s: %s' % (
+                    name, scraper_type, e))
+                entry['unindexed'].append(scraper_type)
+                continue
+            cls = _scraper_registry.get(scraper_type)
+            if cls:
+                entry['scrapers'][scraper_type] = [cls.__module__,
+                                                   cls.__name__]
+
+        self.modules[name] = entry
+        return entry
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'modules': self.modules},
+                      f, default=_encode, indent=1, sort_keys=True)
+        os.rename(tmp_path, self.path)
+
+
+def get_scraper_index(path=None):
+    """ the process-wide ScraperIndex for path (BILLY_SCRAPER_INDEX) """
+    path = path or settings.BILLY_SCRAPER_INDEX
+    with _index_lock:
+        if path not in _indexes:
+            _indexes[path] = ScraperIndex(path)
+        return _indexes[path]
+
+
+def get_metadata(name):
+    """ metadata of scraper package name, from the index when possible """
+    return get_scraper_index().metadata(name)
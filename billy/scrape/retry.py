@@ -0,0 +1,104 @@
+import time
+import random
+import urllib2
+import logging
+import urlparse
+import threading
+from collections import defaultdict
+
+import scrapelib
+
+_log = logging.getLogger('billy')
+
+
+class HostDownError(scrapelib.HTTPError, urllib2.URLError):
+    """
+    Raised instead of making a request to url when its host's circuit
+    breaker is open.  It's an HTTPError (as for a 503) so scrapers that
+    skip a bill whose page errored skip it too, and a URLError so code
+    that copes with unreachable servers copes with this too.
+    """
+
+    def __init__(self, url):
+        self.host = urlparse.urlparse(url).netloc
+        scrapelib.HTTPError.__init__(self, scrapelib.Response(url, url,
+                                                              code=503), '')
+        self.reason = '%s is down, not requesting %s' % (self.host, url)
+        self.args = (self.reason,)
+
+
+def backoff_wait(tries, base, max_wait=None):
+    """
+    seconds to sleep before retry number ``tries``: doubles with each try
+    starting from ``base``, capped at ``max_wait`` and jittered by up to
+    half so scrapers that failed together don't all retry together
+    """
+    wait = base * (2 ** (tries - 1))
+    if max_wait:
+        wait = min(wait, max_wait)
+    return wait / 2.0 + random.uniform(0, wait / 2.0)
+
+
+class CircuitBreaker(object):
+    """
+    Thread-safe per-host circuit breaker that can be shared between
+    :class:`~billy.scrape.Scraper` instances.
+
+    After ``failure_threshold`` failed requests in a row (timeouts,
+    connection errors, 5xx, counted once per request however many times
+    it was retried) a host's circuit opens and :meth:`allow`
+    refuses requests to it.  Once ``reset_seconds`` have passed a single
+    request is let through: if it works the circuit closes again,
+    otherwise it stays open for another ``reset_seconds``.
+
+    A ``failure_threshold`` of 0 disables the breaker.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=300):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = defaultdict(int)
+        self._opened = {}
+
+    def _host(self, url):
+        return urlparse.urlparse(url).netloc
+
+    def allow(self, url):
+        """ True if a request to url's host may be made """
+        if not self.failure_threshold:
+            return True
+        host = self._host(url)
+        with self._lock:
+            opened = self._opened.get(host)
+            if opened is None:
+                return True
+            if time.time() - opened >= self.reset_seconds:
+                # half open, this request finds out if the host is back
+                self._opened[host] = time.time()
+                return True
+            return False
+
+    def record(self, url, error=False):
+        """ note whether a request to url's host failed """
+        if not self.failure_threshold:
+            return
+        host = self._host(url)
+        with self._lock:
+            if not error:
+                self._failures[host] = 0
+                if self._opened.pop(host, None) is not None:
+                    _log.warning('%s is back up' % host)
+                return
+            self._failures[host] += 1
+            if self._failures[host] >= self.failure_threshold:
+                if host not in self._opened:
+                    _log.warning('%s failed %d times in a row, not '
+                                 'requesting from it for %d seconds' % (
+                                     host, self._failures[host],
+                                     self.reset_seconds))
+                self._opened[host] = time.time()
+
+    def is_open(self, url):
+        with self._lock:
+            return self._host(url) in self._opened
@@ -0,0 +1,161 @@
+import os
+import json
+import zlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import scrapelib
+
+from billy.scrape.retry import HostDownError
+
+
+class _Flight(object):
+    # a fetch in progress that other threads wait on
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class RunCache(object):
+    """
+    Responses to the GET requests made during a single scrape run, shared
+    by every scraper of the run so each URL is only downloaded once.
+
+    Fetches are single-flight: if several threads ask for a URL at the
+    same time one of them fetches it and the rest wait for its result
+    (or its exception).  Up to ``max_memory`` bytes of responses are kept
+    in memory, the least recently used are moved to a SQLite file at
+    ``path`` when that fills up (kept in memory only if ``path`` is None).
+
+    Error responses aren't kept.  The cache is meant to last as long as a
+    run, :meth:`close` removes the file.
+    """
+
+    def __init__(self, path=None, max_memory=64 * 1024 * 1024):
+        self.path = path
+        self.max_memory = max_memory
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._flights = {}
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+        if path:
+            if os.path.exists(path):
+                os.remove(path)
+            self._db.execute('CREATE TABLE responses (url TEXT PRIMARY KEY, '
+                             'response TEXT, body BLOB, is_unicode INTEGER)')
+            self._db.commit()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=60)
+            db.text_factory = str
+            self._local.db = db
+        return db
+
+    def _lookup(self, url):
+        # called with the lock held
+        entry = self._memory.pop(url, None)
+        if entry is not None:
+            self._memory[url] = entry
+            return entry
+        if self.path:
+            row = self._db.execute('SELECT response, body, is_unicode FROM '
+                                   'responses WHERE url=?',
+                                   (url,)).fetchone()
+            if row:
+                body = zlib.decompress(row[1])
+                if row[2]:
+                    body = body.decode('utf8')
+                return json.loads(row[0]), body
+
+    def _store(self, url, response, body):
+        # called with the lock held
+        entry = ({'url': response.url, 'code': response.code,
+                  'protocol': response.protocol,
+                  'headers': dict(response.headers or {})}, body)
+        self._memory[url] = entry
+        self._memory_size += len(body)
+
+        while self._memory_size > self.max_memory and len(self._memory) > 1:
+            old_url, (old_response, old_body) = self._memory.popitem(False)
+            self._memory_size -= len(old_body)
+            if self.path:
+                is_unicode = isinstance(old_body, unicode)
+                data = old_body.encode('utf8') if is_unicode else old_body
+                self._db.execute('INSERT OR REPLACE INTO responses VALUES '
+                                 '(?, ?, ?, ?)',
+                                 (old_url, json.dumps(old_response),
+                                  sqlite3.Binary(zlib.compress(data)),
+                                  is_unicode))
+                self._db.commit()
+
+    def fetch(self, scraper, url, fetch):
+        """
+        get the response for url, calling fetch() to download it unless
+        it's cached or being downloaded by another thread
+
+        fetch must return a result as returned by ``Scraper.urlopen``,
+        cached responses are wrapped by scraper the same way
+        """
+        with self._lock:
+            entry = self._lookup(url)
+            if entry is None:
+                flight = self._flights.get(url)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[url] = _Flight()
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            else:
+                self.hits += 1
+
+        if entry is None and not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                if isinstance(flight.error, HostDownError):
+                    # a skip for this scraper's journal unit too
+                    scraper._record_skipped(url)
+                raise flight.error
+            with self._lock:
+                entry = self._lookup(url)
+            if entry is None:
+                # the leader got an error page, which isn't kept
+                return fetch()
+
+        if entry is not None:
+            response, body = entry
+            return scraper._wrap_result(
+                scrapelib.Response(response['url'], url,
+                                   code=response['code'], fromcache=True,
+                                   protocol=response['protocol'],
+                                   headers=response['headers']), body)
+
+        try:
+            result = fetch()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            if result.response.code < 400:
+                body = (unicode(result) if isinstance(result, unicode)
+                        else str(result))
+                with self._lock:
+                    self._store(url, result.response, body)
+            return result
+        finally:
+            with self._lock:
+                del self._flights[url]
+            flight.done.set()
+
+    def close(self):
+        """ throw away the on-disk part of the cache """
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,18 +1,80 @@
-import subprocess
+import os
+import re
+import threading
+from StringIO import StringIO
+
+from billy.conf import settings
+from billy.scrape.pdf import PDFConverter
+
+_xml_declaration = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+_pdf_converter = None
+_pdf_converter_lock = threading.Lock()
+
+
+def get_pdf_converter():
+    """ the process-wide :class:`~billy.scrape.pdf.PDFConverter` """
+    global _pdf_converter
+    with _pdf_converter_lock:
+        if _pdf_converter is None:
+            cache_dir = None
+            if settings.BILLY_CACHE_DIR:
+                cache_dir = os.path.join(settings.BILLY_CACHE_DIR, 'pdf')
+            _pdf_converter = PDFConverter(cache_dir,
+                                          settings.BILLY_PDF_WORKERS)
+        return _pdf_converter
+
 
 def convert_pdf(filename, type='xml'):
-    commands = {'text': ['pdftotext', '-layout', filename, '-'],
-                'text-nolayout': ['pdftotext', filename, '-'],
-                'xml':  ['pdftohtml', '-xml', '-stdout', filename],
-                'html': ['pdftohtml', '-stdout', filename]}
-    pipe = subprocess.Popen(commands[type], stdout=subprocess.PIPE,
-                            close_fds=True).stdout
-    data = pipe.read()
-    pipe.close()
-    return data
+    return get_pdf_converter().convert_file(filename, type)
+
+
+def convert_pdf_data(data, type='xml'):
+    """ like convert_pdf but takes the contents of the PDF """
+    return get_pdf_converter().convert(data, type)
+
+
+def convert_pdf_async(data, type='xml'):
+    """
+    start converting the contents of a PDF in the background, returns an
+    object whose get() method returns the output of convert_pdf_data
+    """
+    return get_pdf_converter().submit(data, type)
 
 
 def pdf_to_lxml(filename, type='html'):
     import lxml.html
     text = convert_pdf(filename, type)
     return lxml.html.fromstring(text)
+
+
+def iterparse(source, tag, recover=False):
+    """
+    Yield the elements of an XML document named ``tag`` (a name,
+    ``'{*}name'`` to ignore namespaces, or a list of names) as each one is
+    finished parsing, rather than parsing the whole document up front.
+
+    Once the caller moves on, the element is cleared and removed from the
+    tree, so memory use stays flat no matter how long the document is;
+    use what's needed from each element (and its children) before asking
+    for the next one.  Stopping early skips parsing the rest of the
+    document.
+
+    ``source`` is a string of XML or a file-like object, ``recover`` is
+    passed on to the parser to cope with broken markup.
+    """
+    from lxml import etree
+
+    if isinstance(source, unicode):
+        # the parser wants bytes, drop any declared encoding as they're
+        # about to be UTF-8
+        source = _xml_declaration.sub('', source, 1).encode('utf8')
+    if isinstance(source, str):
+        source = StringIO(source)
+
+    for event, elem in etree.iterparse(source, tag=tag, recover=recover):
+        yield elem
+        elem.clear()
+        # drop references from the parent to the elements already seen
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
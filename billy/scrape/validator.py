@@ -1,5 +1,20 @@
 from validictory.validator import SchemaValidator
+from collections import Mapping
 import datetime
+import threading
+import copy
+import json
+import os
+
+_schema_dir = os.path.join(os.path.dirname(__file__), '../schemas')
+
+# schema name -> parsed schema, and serialized schema -> CompiledSchema
+_schemas = {}
+_compiled = {}
+_cache_lock = threading.Lock()
+
+# modes accepted by validation_mode
+VALIDATION_MODES = ('full', 'sample', 'deferred', 'off')
 
 
 class DatetimeValidator(SchemaValidator):
@@ -9,3 +24,181 @@ class DatetimeValidator(SchemaValidator):
 
     def validate_type_datetime(self, x):
         return isinstance(x, (datetime.date, datetime.datetime))
+
+
+def load_schema(name):
+    """
+    get a copy of billy/schemas/<name>.json, the file is only read once
+    per process so callers are free to modify the copy they get
+    """
+    with _cache_lock:
+        if name not in _schemas:
+            with open(os.path.join(_schema_dir, name + '.json')) as f:
+                _schemas[name] = json.load(f)
+        return copy.deepcopy(_schemas[name])
+
+
+def validation_mode(value):
+    """
+    parse a validation mode: 'full', 'deferred', 'off' or 'sample:N'
+    (validate every Nth object), returns a (mode, N) tuple
+    """
+    mode, _, rate = value.partition(':')
+    if mode not in VALIDATION_MODES or bool(rate) != (mode == 'sample'):
+        raise ValueError('invalid validation mode: %s' % value)
+    if mode == 'sample':
+        rate = int(rate)
+        if rate < 1:
+            raise ValueError('invalid validation mode: %s' % value)
+        return mode, rate
+    return mode, 1
+
+
+class _Unsupported(Exception):
+    pass
+
+
+_type_checks = {
+    'string': lambda v: isinstance(v, basestring),
+    'integer': lambda v: type(v) in (int, long),
+    'number': lambda v: type(v) in (int, long, float),
+    'boolean': lambda v: type(v) == bool,
+    'object': lambda v: isinstance(v, Mapping),
+    'array': lambda v: isinstance(v, (list, tuple)),
+    'null': lambda v: v is None,
+    'any': lambda v: True,
+    'datetime': lambda v: isinstance(v, (datetime.date, datetime.datetime)),
+}
+
+# schema attributes _compile_field knows how to check, or that don't
+# affect validation
+_known_attributes = set(['type', 'required', 'blank', 'enum', 'minimum',
+                         'maximum', 'minLength', 'maxLength', 'minItems',
+                         'maxItems', 'properties', 'items', 'description',
+                         'title'])
+
+
+def _compile_type(fieldtype):
+    if isinstance(fieldtype, (list, tuple)):
+        checks = [_compile_type(t) for t in fieldtype]
+        return lambda v: any(check(v) for check in checks)
+    try:
+        return _type_checks[fieldtype]
+    except (KeyError, TypeError):
+        raise _Unsupported(fieldtype)
+
+
+def _compile_field(schema):
+    """
+    turn a (sub)schema into a function f(present, value) that returns
+    True if DatetimeValidator would accept the field, mirroring its
+    quirks (eg. properties are only checked on dicts)
+    """
+    if not isinstance(schema, dict) or set(schema) - _known_attributes:
+        raise _Unsupported(schema)
+
+    required = schema.get('required', True)
+    checks = []
+
+    if 'type' in schema:
+        checks.append(_compile_type(schema['type']))
+
+    if not schema.get('blank', False):
+        checks.append(lambda v: not (isinstance(v, basestring) and not v))
+
+    if 'enum' in schema:
+        options = schema['enum']
+        checks.append(lambda v: v is None or v in options)
+
+    if 'minimum' in schema:
+        minimum = schema['minimum']
+        checks.append(lambda v: not (type(v) in (int, float) and
+                                     v < minimum))
+
+    if 'maximum' in schema:
+        maximum = schema['maximum']
+        checks.append(lambda v: not (type(v) in (int, float) and
+                                     v > maximum))
+
+    for attr in ('minLength', 'minItems'):
+        if attr in schema:
+            min_length = schema[attr]
+            checks.append(lambda v, n=min_length: not (
+                isinstance(v, (basestring, list, tuple)) and len(v) < n))
+
+    for attr in ('maxLength', 'maxItems'):
+        if attr in schema:
+            max_length = schema[attr]
+            checks.append(lambda v, n=max_length: not (
+                isinstance(v, (basestring, list, tuple)) and len(v) > n))
+
+    if 'properties' in schema:
+        properties = [(name, _compile_field(sub)) for name, sub in
+                      schema['properties'].iteritems()]
+
+        def check_properties(v):
+            if not isinstance(v, dict):
+                return True
+            for name, check in properties:
+                if name in v:
+                    if not check(True, v[name]):
+                        return False
+                elif not check(False, None):
+                    return False
+            return True
+        checks.append(check_properties)
+
+    if 'items' in schema:
+        check_item = _compile_field(schema['items'])
+
+        def check_items(v):
+            if not isinstance(v, (list, tuple)):
+                return True
+            for item in v:
+                if not check_item(True, item):
+                    return False
+            return True
+        checks.append(check_items)
+
+    def check_field(present, value):
+        if not present:
+            return not required
+        for check in checks:
+            if not check(value):
+                return False
+        return True
+
+    return check_field
+
+
+class CompiledSchema(object):
+    """
+    Validates objects against a schema with a checker compiled from it
+    ahead of time, only falling back to the much slower
+    :class:`DatetimeValidator` to produce the error message when an
+    object fails. Schemas using attributes the compiler doesn't handle
+    are always checked with DatetimeValidator.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.validator = DatetimeValidator()
+        try:
+            self._check = _compile_field(schema)
+        except _Unsupported:
+            self._check = None
+
+    def validate(self, obj):
+        """ raises ValueError if obj doesn't match the schema """
+        if self._check and self._check(True, obj):
+            return
+        self.validator.validate(obj, self.schema)
+
+
+def compile_schema(schema):
+    """ get the process-wide CompiledSchema for schema """
+    key = json.dumps(schema, sort_keys=True)
+    with _cache_lock:
+        if key not in _compiled:
+            _compiled[key] = CompiledSchema(schema)
+        return _compiled[key]
@@ -1,8 +1,7 @@
-import os
 import itertools
-import json
 
 from billy.scrape import Scraper, SourcedObject, JSONDateEncoder
+from billy.scrape.validator import load_schema
 
 
 class VoteScraper(Scraper):
@@ -13,9 +12,7 @@ class VoteScraper(Scraper):
         super(VoteScraper, self).__init__(*args, **kwargs)
 
     def _get_schema(self):
-        schema_path = os.path.join(os.path.split(__file__)[0],
-                                   '../schemas/vote.json')
-        schema = json.load(open(schema_path))
+        schema = load_schema('vote')
         schema['properties']['session']['enum'] = self.all_sessions()
         return schema
 
@@ -0,0 +1,34 @@
+import time
+import datetime
+
+from billy.scrape.bills import BillScraper, BillCandidate
+
+
+class ExBillScraper(BillScraper):
+    state = 'ex'
+
+
+def test_prioritize_bills():
+    scraper = ExBillScraper({}, no_cache=True, error_dir=None)
+    candidates = [BillCandidate('HB 1'),
+                  BillCandidate('HB 2',
+                                last_action=datetime.date(2011, 3, 1)),
+                  BillCandidate('HB 3', new=True),
+                  BillCandidate('HB 4'),
+                  BillCandidate('HB 5', updated_at=datetime.datetime(
+                      2011, 4, 1, 12, 30))]
+    order = [c['bill_id'] for c in
+             scraper.prioritize_bills('lower', '2011', candidates)]
+    assert order == ['HB 3', 'HB 5', 'HB 2', 'HB 1', 'HB 4']
+
+
+def test_prioritize_bills_deadline():
+    scraper = ExBillScraper({}, no_cache=True, error_dir=None,
+                            deadline=time.time() + 0.1)
+    scraped = []
+    for candidate in scraper.prioritize_bills(
+            'lower', '2011', [BillCandidate('HB %s' % i) for i in xrange(5)]):
+        scraped.append(candidate['bill_id'])
+        time.sleep(0.06)
+    assert scraped == ['HB 0', 'HB 1']
+    assert scraper.deferred_bills == ['HB 2', 'HB 3', 'HB 4']
@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from nose.tools import with_setup, assert_raises
+
+from billy.conf import settings
+from billy.scrape import bulk
+from billy.scrape.bulk import BulkSource, get_bulk_source
+
+_dir = None
+_cache_dir = None
+
+_history = """bill_num,act_date,act_desc
+HB 5001,2012-02-10,Referred to Committee
+SB 2,2012-02-11,Referred to Committee
+HB 5001,2012-03-01,Reported Out
+SB 9,,Introduced
+"""
+
+
+def setup_func():
+    global _dir, _cache_dir
+    _dir = tempfile.mkdtemp()
+    _cache_dir = settings.BILLY_CACHE_DIR
+    settings.BILLY_CACHE_DIR = os.path.join(_dir, 'cache')
+    bulk._sources.clear()
+
+
+def teardown_func():
+    settings.BILLY_CACHE_DIR = _cache_dir
+    bulk._sources.clear()
+    shutil.rmtree(_dir)
+
+
+class _FakeScraper(object):
+    state = 'ex'
+
+    def __init__(self, release=None):
+        self.release = release
+        self.started = threading.Event()
+        self.downloads = []
+
+    def urlretrieve(self, url, filename=None):
+        self.started.set()
+        if self.release:
+            self.release.wait(5)
+        self.downloads.append(url)
+        fd, filename = tempfile.mkstemp(dir=_dir)
+        with os.fdopen(fd, 'w') as f:
+            f.write(_history)
+        return filename, None
+
+    def urlopen(self, url, method='GET'):
+        raise IOError('no HEAD here')
+
+    def log(self, msg):
+        pass
+
+    debug = log
+
+
+def _write(text):
+    filename = os.path.join(_dir, 'bill_history.csv')
+    with open(filename, 'w') as f:
+        f.write(text)
+    return filename
+
+
+def _source():
+    return BulkSource(os.path.join(_dir, 'bill_history.sqlite'), 'bill_num',
+                      types={'act_date': lambda d: d.replace('-', '')})
+
+
+@with_setup(setup_func, teardown_func)
+def test_lookups():
+    source = _source()
+    assert not source.loaded
+    assert source.load(_write(_history)) == 4
+    assert source.loaded
+
+    assert len(source) == 3
+    assert sorted(source.keys()) == ['HB 5001', 'SB 2', 'SB 9']
+    assert 'SB 2' in source and 'HB 1' not in source
+
+    rows = source.get('HB 5001')
+    assert [r['act_date'] for r in rows] == ['20120210', '20120301']
+    assert rows[1]['act_desc'] == 'Reported Out'
+    assert source.get('HB 1') == []
+
+    assert source.first('SB 9')['act_date'] is None
+    assert source.first('HB 1', 'missing') == 'missing'
+    assert [r['bill_num'] for r in source.rows()] == [
+        'HB 5001', 'SB 2', 'HB 5001', 'SB 9']
+
+
+@with_setup(setup_func, teardown_func)
+def test_refresh_new_key():
+    scraper = _FakeScraper()
+    url = 'http://example.com/bill_history.csv'
+    assert _source().refresh(scraper, url)
+    assert not _source().refresh(scraper, url)
+
+    # the same file indexed by another column is loaded again
+    source = BulkSource(os.path.join(_dir, 'bill_history.sqlite'), 'act_date')
+    assert source.refresh(scraper, url)
+    assert len(source.get('2012-03-01')) == 1
+    assert len(scraper.downloads) == 3
+
+
+@with_setup(setup_func, teardown_func)
+def test_get_bulk_source():
+    # a slow download only holds up the source being downloaded
+    release = threading.Event()
+    slow_scraper = _FakeScraper(release)
+    slow = threading.Thread(target=get_bulk_source, args=(
+        slow_scraper, 'http://example.com/slow.csv', 'bill_num'))
+    slow.start()
+    slow_scraper.started.wait()
+
+    scraper = _FakeScraper()
+    source = get_bulk_source(scraper, 'http://example.com/bill_history.csv',
+                             'bill_num')
+    assert slow.is_alive()
+    release.set()
+    slow.join()
+
+    assert source.path == os.path.join(_dir, 'cache', 'bulk', 'ex',
+                                       'bill_history.sqlite')
+    assert len(source.get('HB 5001')) == 2
+
+    # and is only refreshed once per process
+    assert get_bulk_source(scraper, 'http://example.com/bill_history.csv',
+                           'bill_num') is source
+    assert scraper.downloads == ['http://example.com/bill_history.csv']
+
+    # but not under another key
+    assert_raises(ValueError, get_bulk_source, scraper,
+                  'http://example.com/bill_history.csv', 'act_date')
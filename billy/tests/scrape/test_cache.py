@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+
+from nose.tools import with_setup
+
+from billy.scrape.cache import CompressedCache
+
+_cache_dir = None
+
+
+def setup_func():
+    global _cache_dir
+    _cache_dir = tempfile.mkdtemp()
+
+
+def teardown_func():
+    shutil.rmtree(_cache_dir)
+
+
+def _response(body, etag='"x"'):
+    return 'status: 200\r\netag: %s\r\n\r\n%s' % (etag, body)
+
+
+def _object_files():
+    return [f for d, _, files in os.walk(os.path.join(_cache_dir, 'objects'))
+            for f in files]
+
+
+@with_setup(setup_func, teardown_func)
+def test_get_set_delete():
+    cache = CompressedCache(_cache_dir)
+    assert cache.get('http://example.com/') is None
+
+    cache.set('http://example.com/', _response('hello'))
+    assert cache.get('http://example.com/') == _response('hello')
+
+    cache.delete('http://example.com/')
+    assert cache.get('http://example.com/') is None
+    assert _object_files() == []
+
+
+@with_setup(setup_func, teardown_func)
+def test_dedup():
+    cache = CompressedCache(_cache_dir)
+    body = 'same body ' * 1000
+    cache.set('http://example.com/1', _response(body, '"1"'))
+    cache.set('http://example.com/2', _response(body, '"2"'))
+
+    stats = cache.stats()
+    assert stats['entries'] == 2
+    assert stats['objects'] == 1
+    assert stats['size'] < stats['raw_size']
+    assert len(_object_files()) == 1
+
+    # headers are kept per entry
+    assert cache.get('http://example.com/2') == _response(body, '"2"')
+
+    # replacing one entry's body keeps the shared object around
+    cache.set('http://example.com/1', _response('new', '"1"'))
+    assert cache.get('http://example.com/2') == _response(body, '"2"')
+    assert len(_object_files()) == 2
+
+
+@with_setup(setup_func, teardown_func)
+def test_prune():
+    cache = CompressedCache(_cache_dir)
+    for i in xrange(10):
+        cache.set('http://example.com/%s' % i,
+                  _response(os.urandom(1000)))
+        # make access order explicit
+        cache._db.execute('UPDATE entries SET atime=? WHERE key=?',
+                          (i, 'http://example.com/%s' % i))
+    cache._db.commit()
+
+    evicted = cache.prune(5500)
+    assert evicted == 5
+    assert cache.get('http://example.com/4') is None
+    assert cache.get('http://example.com/5') is not None
+    assert cache.stats()['entries'] == 5
+    assert len(_object_files()) == 5
+
+
+@with_setup(setup_func, teardown_func)
+def test_shared_index():
+    # two caches on one directory, like scrape_states' processes
+    cache = CompressedCache(_cache_dir)
+    other = CompressedCache(_cache_dir)
+    seen = []
+
+    class _CheckedCache(CompressedCache):
+        def _write_object(self, hash, data):
+            # the entry isn't visible until its object is on disk
+            seen.append(other.get('http://example.com/'))
+            super(_CheckedCache, self)._write_object(hash, data)
+
+    _CheckedCache(_cache_dir).set('http://example.com/', _response('body'))
+    assert seen == [None]
+    assert other.get('http://example.com/') == _response('body')
+
+    # an object released by one cache and set again by the other stays
+    other.delete('http://example.com/')
+    cache.set('http://example.com/2', _response('body'))
+    assert other.get('http://example.com/2') == _response('body')
+    assert len(_object_files()) == 1
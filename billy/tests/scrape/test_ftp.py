@@ -0,0 +1,77 @@
+import shutil
+import datetime
+import tempfile
+
+from nose.tools import with_setup
+
+from billy.scrape import Scraper
+from billy.scrape.ftp import parse_listing, FTPEntry
+
+_output_dir = None
+
+
+def setup_func():
+    global _output_dir
+    _output_dir = tempfile.mkdtemp()
+
+
+def teardown_func():
+    shutil.rmtree(_output_dir)
+
+
+class ExScraper(Scraper):
+    state = 'ex'
+
+
+def test_parse_dos_listing():
+    text = ('01-13-11  10:46AM       <DIR>          HB00001_HB00099\r\n'
+            '03-02-11  04:05PM                 6183 HB 10.xml\r\n')
+    entries = parse_listing(text)
+    assert entries == [
+        FTPEntry('HB00001_HB00099', 0,
+                 datetime.datetime(2011, 1, 13, 10, 46), True),
+        FTPEntry('HB 10.xml', 6183,
+                 datetime.datetime(2011, 3, 2, 16, 5), False),
+    ]
+
+
+def test_parse_unix_listing():
+    text = ('total 8\n'
+            'drwxr-xr-x    2 1001     1001         4096 Jan 05  2010 old\n'
+            '-rw-r--r--    1 ftp      ftp      12345678 Mar 14  2011 '
+            'pubinfo_Mon.zip\n'
+            'lrwxrwxrwx    1 0        0              11 Mar 14  2011 '
+            'latest -> pubinfo_Mon.zip\n')
+    entries = parse_listing(text)
+    assert [e.filename for e in entries] == ['old', 'pubinfo_Mon.zip',
+                                             'latest']
+    assert entries[0].is_dir
+    assert entries[1].size == 12345678
+    assert entries[1].mtime == datetime.datetime(2011, 3, 14)
+
+
+@with_setup(setup_func, teardown_func)
+def test_ftp_unchanged():
+    dir_url = 'ftp://ftp.example.com/bills/'
+    url = dir_url + 'HB1.xml'
+    old = FTPEntry('HB1.xml', 100, datetime.datetime(2011, 1, 1), False)
+    new = FTPEntry('HB1.xml', 120, datetime.datetime(2011, 1, 2), False)
+
+    scraper = ExScraper({}, output_dir=_output_dir, error_dir=None,
+                        no_cache=True, skip_unchanged=True)
+    scraper._ftp_listings[dir_url] = [old]
+    assert not scraper.ftp_unchanged(url)
+    scraper.ftp_mark_seen(url)
+    assert scraper.ftp_unchanged(url)
+
+    # next run, the file has changed
+    scraper = ExScraper({}, output_dir=_output_dir, error_dir=None,
+                        no_cache=True, skip_unchanged=True)
+    scraper._ftp_listings[dir_url] = [new]
+    assert not scraper.ftp_unchanged(url)
+
+    # without skip_unchanged nothing is ever skipped
+    scraper = ExScraper({}, output_dir=_output_dir, error_dir=None,
+                        no_cache=True)
+    scraper._ftp_listings[dir_url] = [old]
+    assert not scraper.ftp_unchanged(url)
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+
+from nose.tools import with_setup
+
+from billy.scrape.journal import RunJournal
+
+_dir = None
+
+
+def setup_func():
+    global _dir
+    _dir = tempfile.mkdtemp()
+
+
+def teardown_func():
+    shutil.rmtree(_dir)
+
+
+@with_setup(setup_func, teardown_func)
+def test_resume():
+    path = os.path.join(_dir, 'bills.journal')
+    journal = RunJournal(path)
+    journal.saved(('upper', '2011'), 'HB 1.json')
+    journal.complete(('upper', '2011'))
+    journal.saved(('lower', '2011'), 'SB 1.json')
+    journal.saved(('lower', '2011'), 'SB 2.json')
+    journal.close()
+
+    # simulate a crash partway through writing a line
+    with open(path, 'a') as f:
+        f.write('{"event": "sav')
+
+    journal = RunJournal(path, resume=True)
+    assert journal.is_complete(('upper', '2011'))
+    assert not journal.is_complete(('lower', '2011'))
+    assert journal.incomplete_files() == ['SB 1.json', 'SB 2.json']
+    journal.complete(['lower', '2011'])
+    journal.close()
+
+    journal = RunJournal(path, resume=True)
+    assert journal.is_complete(('lower', '2011'))
+    assert journal.incomplete_files() == []
+    journal.close()
+
+    # starting over forgets everything
+    journal = RunJournal(path)
+    assert not journal.is_complete(('upper', '2011'))
+    journal.close()
@@ -0,0 +1,58 @@
+import os
+import json
+import shutil
+import datetime
+import tempfile
+
+from nose.tools import with_setup
+
+from billy.scrape import JSONDateEncoder
+from billy.scrape.output import (SegmentWriter, scraped_files,
+                                 iter_scraped_objects, clear_scraped_files)
+
+_output_dir = None
+
+
+def setup_func():
+    global _output_dir
+    _output_dir = tempfile.mkdtemp()
+
+
+def teardown_func():
+    shutil.rmtree(_output_dir)
+
+
+@with_setup(setup_func, teardown_func)
+def test_segments():
+    for compress in (False, True):
+        clear_scraped_files(_output_dir)
+        writer = SegmentWriter(_output_dir, 'bills', compress=compress,
+                               segment_size=2, encoder=JSONDateEncoder)
+        for i in xrange(5):
+            writer.write({'bill_id': 'HB %s' % i,
+                          'date': datetime.datetime(2011, 1, 1)})
+
+        # the last segment isn't visible until closed
+        assert len(scraped_files(_output_dir)) == 2
+        writer.close()
+        assert len(scraped_files(_output_dir)) == 3
+
+        bills = list(iter_scraped_objects(_output_dir))
+        assert sorted(b['bill_id'] for b in bills) == ['HB 0', 'HB 1',
+                                                       'HB 2', 'HB 3', 'HB 4']
+        assert isinstance(bills[0]['date'], float)
+
+
+@with_setup(setup_func, teardown_func)
+def test_mixed_formats():
+    with open(os.path.join(_output_dir, 'HB 1.json'), 'w') as f:
+        json.dump({'bill_id': 'HB 1'}, f)
+    writer = SegmentWriter(_output_dir, 'bills', compress=True)
+    writer.write({'bill_id': 'HB 2'})
+    writer.close()
+
+    bills = list(iter_scraped_objects(_output_dir))
+    assert sorted(b['bill_id'] for b in bills) == ['HB 1', 'HB 2']
+
+    clear_scraped_files(_output_dir)
+    assert os.listdir(_output_dir) == []
@@ -0,0 +1,57 @@
+import shutil
+import tempfile
+
+from nose.tools import with_setup
+
+from billy.scrape import pdf
+
+_cache_dir = None
+_converted = []
+
+
+def _fake_converter(filename, type):
+    with open(filename, 'rb') as f:
+        data = f.read()
+    _converted.append(data)
+    return '%s of %s' % (type, data)
+
+
+def setup_func():
+    global _cache_dir, _real_converter
+    _cache_dir = tempfile.mkdtemp()
+    _real_converter = pdf._run_converter
+    pdf._run_converter = _fake_converter
+    del _converted[:]
+
+
+def teardown_func():
+    pdf._run_converter = _real_converter
+    shutil.rmtree(_cache_dir)
+
+
+@with_setup(setup_func, teardown_func)
+def test_convert_cached():
+    converter = pdf.PDFConverter(_cache_dir)
+    assert converter.convert('pdf 1', 'text') == 'text of pdf 1'
+    assert converter.convert('pdf 1', 'xml') == 'xml of pdf 1'
+    assert converter.convert('pdf 1', 'text') == 'text of pdf 1'
+    assert _converted == ['pdf 1', 'pdf 1']
+
+    # a new converter (eg. the next run) shares the on-disk results
+    converter = pdf.PDFConverter(_cache_dir)
+    assert converter.convert('pdf 1', 'text') == 'text of pdf 1'
+    assert len(_converted) == 2
+
+
+@with_setup(setup_func, teardown_func)
+def test_submit():
+    converter = pdf.PDFConverter(_cache_dir, workers=2)
+    pending = [converter.submit('pdf %s' % i, 'text') for i in xrange(5)]
+    assert [p.get() for p in pending] == ['text of pdf %s' % i
+                                          for i in xrange(5)]
+    assert sorted(_converted) == ['pdf %s' % i for i in xrange(5)]
+
+    cached = converter.submit('pdf 3', 'text')
+    assert cached.ready()
+    assert cached.get() == 'text of pdf 3'
+    assert len(_converted) == 5
@@ -0,0 +1,60 @@
+import time
+import threading
+
+from billy.scrape.ratelimit import RateLimiter, AdaptiveRateLimiter
+
+
+def test_rate_limiter_unlimited():
+    limiter = RateLimiter(0)
+    start = time.time()
+    for i in xrange(100):
+        limiter.wait()
+    assert time.time() - start < 0.1
+
+
+def test_rate_limiter_shared_between_threads():
+    # 1200 rpm = one request every 0.05s, across all threads
+    limiter = RateLimiter(1200)
+    times = []
+
+    def worker():
+        for i in xrange(3):
+            limiter.wait()
+            times.append(time.time())
+
+    threads = [threading.Thread(target=worker) for i in xrange(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    times.sort()
+    assert len(times) == 9
+    # allow a little scheduling slop
+    assert times[-1] - times[0] >= 8 * 0.05 * 0.9
+
+
+def test_adaptive_rate_limiter():
+    limiter = AdaptiveRateLimiter(60, max_rpm=80, min_rpm=10, increase=10,
+                                  window=2, cooldown=60)
+    url = 'http://example.com/'
+
+    # healthy responses raise the rate up to the ceiling
+    for i in xrange(8):
+        limiter.record(url, 0.1)
+    assert limiter.rates() == {'example.com': 80}
+
+    # an error halves it, errors right after are from the old rate
+    limiter.record(url, 0.1, error=True)
+    limiter.record(url, 0.1, error=True)
+    assert limiter.rates() == {'example.com': 40}
+
+    # other hosts are left alone
+    limiter.record('http://other.com/', 0.1, error=True)
+    assert limiter.rates()['example.com'] == 40
+    assert limiter.rates()['other.com'] == 30
+
+    # as are slow responses, once cooled down
+    limiter.cooldown = 0
+    limiter.record(url, 5.0)
+    assert limiter.rates()['example.com'] == 20
@@ -0,0 +1,63 @@
+import os
+import sys
+import shutil
+import datetime
+import tempfile
+
+from nose.tools import with_setup, assert_raises
+
+from billy.scrape.registry import ScraperIndex
+
+_dir = None
+
+_init = """import datetime
+metadata = {'name': 'Example', 'abbreviation': 'zz',
+            'session_details': {'2011': {
+                'start_date': datetime.date(2011, 1, 12)}}}
+"""
+
+_bills = """from billy.scrape.bills import BillScraper
+
+class ZZBillScraper(BillScraper):
+    state = 'zz'
+"""
+
+
+def setup_func():
+    global _dir
+    _dir = tempfile.mkdtemp()
+    os.mkdir(os.path.join(_dir, 'zz'))
+    with open(os.path.join(_dir, 'zz', '__init__.py'), 'w') as f:
+        f.write(_init)
+    with open(os.path.join(_dir, 'zz', 'bills.py'), 'w') as f:
+        f.write(_bills)
+    sys.path.insert(0, _dir)
+
+
+def teardown_func():
+    sys.path.remove(_dir)
+    for name in ('zz', 'zz.bills'):
+        sys.modules.pop(name, None)
+    shutil.rmtree(_dir)
+
+
+@with_setup(setup_func, teardown_func)
+def test_index():
+    path = os.path.join(_dir, 'index.json')
+    index = ScraperIndex(path)
+    index.add('zz')
+    index.save()
+
+    index = ScraperIndex(path)
+    metadata = index.metadata('zz')
+    assert metadata['name'] == 'Example'
+    assert (metadata['session_details']['2011']['start_date'] ==
+            datetime.date(2011, 1, 12))
+    assert index.scraper('zz', 'bills') == ['zz.bills', 'ZZBillScraper']
+    assert index.scraper('zz', 'votes') is None
+
+    # editing the package makes its entry stale
+    with open(os.path.join(_dir, 'zz', 'bills.py'), 'a') as f:
+        f.write('\n# changed\n')
+    assert_raises(KeyError, index.scraper, 'zz', 'bills')
+    assert_raises(KeyError, index.scraper, 'yy', 'bills')
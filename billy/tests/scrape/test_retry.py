@@ -0,0 +1,77 @@
+import time
+import socket
+import urllib2
+
+import scrapelib
+from nose.tools import assert_raises
+
+from billy.scrape import Scraper
+from billy.scrape.retry import HostDownError, CircuitBreaker, backoff_wait
+
+
+class ExScraper(Scraper):
+    state = 'ex'
+
+
+def test_backoff_wait():
+    for i in xrange(20):
+        assert 10 <= backoff_wait(1, 20) <= 20
+        assert 40 <= backoff_wait(3, 20) <= 80
+        assert 150 <= backoff_wait(10, 20, max_wait=300) <= 300
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=0.2)
+    url = 'http://example.com/'
+    breaker.record(url, error=True)
+    breaker.record(url, error=True)
+    breaker.record(url)
+    breaker.record(url, error=True)
+    assert breaker.allow(url)
+
+    breaker.record(url, error=True)
+    breaker.record(url, error=True)
+    assert not breaker.allow(url)
+    assert breaker.allow('http://other.com/')
+
+    # after the reset period one request may try the host again
+    time.sleep(0.2)
+    assert breaker.allow(url)
+    assert not breaker.allow(url)
+    breaker.record(url)
+    assert breaker.allow(url)
+
+
+def _unused_url():
+    # find a port nothing is listening on
+    sock = socket.socket()
+    sock.bind(('localhost', 0))
+    url = 'http://localhost:%s/' % sock.getsockname()[1]
+    sock.close()
+    return url
+
+
+def test_scraper_skips_down_host():
+    url = _unused_url()
+
+    scraper = ExScraper({}, no_cache=True, error_dir=None, retry_attempts=0,
+                        circuit_breaker=CircuitBreaker(1, 60))
+    assert_raises(socket.error, scraper.urlopen, url)
+    assert_raises(HostDownError, scraper.urlopen, url + 'page')
+    assert issubclass(HostDownError, urllib2.URLError)
+    # caught by scrapers that skip bills whose pages error
+    assert issubclass(HostDownError, scrapelib.HTTPError)
+    assert scraper.skipped_urls[None] == [url + 'page']
+
+
+def test_retries_count_once():
+    url = _unused_url()
+    scraper = ExScraper({}, no_cache=True, error_dir=None, retry_attempts=2,
+                        retry_wait_seconds=0.01,
+                        circuit_breaker=CircuitBreaker(2, 60))
+
+    # three failed attempts at one page are one failure
+    assert_raises(socket.error, scraper.urlopen, url)
+    assert scraper.circuit_breaker.allow(url)
+    assert_raises(socket.error, scraper.urlopen, url + 'other')
+    assert not scraper.circuit_breaker.allow(url)
@@ -0,0 +1,230 @@
+import os
+import time
+import shutil
+import urllib2
+import tempfile
+import threading
+import SocketServer
+import BaseHTTPServer
+from collections import defaultdict
+
+from nose.tools import assert_raises
+
+from billy.scrape import Scraper
+from billy.scrape.cassette import Cassette
+from billy.scrape.runcache import RunCache
+from billy.scrape.retry import HostDownError
+
+_server = None
+_requests = []
+_hits = defaultdict(int)
+
+
+class _SlowHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # every page takes 0.2s to come back and echoes its path
+    def do_GET(self):
+        if self.path.startswith('/etag'):
+            return self.etag_GET()
+
+        _hits[self.path] += 1
+        time.sleep(0.2)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.end_headers()
+        self.wfile.write(self.path)
+
+    # claims to be fresh for an hour but supports revalidation
+    def etag_GET(self):
+        _requests.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Cache-Control', 'max-age=3600')
+        self.end_headers()
+        self.wfile.write('etag body')
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class ExScraper(Scraper):
+    state = 'ex'
+
+
+def setup_module():
+    global _server
+    _server = _Server(('localhost', 0), _SlowHandler)
+    thread = threading.Thread(target=_server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+
+def teardown_module():
+    _server.shutdown()
+
+
+def _url(path):
+    return 'http://localhost:%s%s' % (_server.server_address[1], path)
+
+
+def test_urlopen_many():
+    scraper = ExScraper({}, no_cache=True, error_dir=None, fetch_workers=4)
+    urls = [_url('/%s' % i) for i in xrange(8)]
+
+    start = time.time()
+    pages = list(scraper.urlopen_many(urls))
+    elapsed = time.time() - start
+
+    assert pages == ['/%s' % i for i in xrange(8)]
+    # 8 pages at 0.2s each, 4 at a time
+    assert elapsed < 1.2
+
+
+def test_urlopen_async():
+    scraper = ExScraper({}, no_cache=True, error_dir=None)
+    result = scraper.urlopen_async(_url('/async'))
+    assert result.get() == '/async'
+    assert result.get().response.code == 200
+
+
+def test_revalidate_cache():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        url = _url('/etag')
+
+        # normal scraper trusts max-age and doesn't ask again
+        scraper = ExScraper({}, cache_dir=cache_dir, error_dir=None)
+        assert scraper.urlopen(url) == 'etag body'
+        assert scraper.urlopen(url).response.fromcache
+        assert _requests == [None]
+
+        # revalidating scraper sends the ETag and gets the cached copy back
+        scraper = ExScraper({}, cache_dir=cache_dir, error_dir=None,
+                            revalidate_cache=True)
+        resp = scraper.urlopen(url)
+        assert resp == 'etag body'
+        assert resp.response.fromcache
+        assert _requests == [None, '"v1"']
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_profile():
+    scraper = ExScraper({}, no_cache=True, error_dir=None)
+    with scraper.urlopen(_url('/profiled')) as page:
+        assert page == '/profiled'
+        time.sleep(0.1)
+    scraper.urlopen_async(_url('/async')).get()
+
+    host = 'localhost:%s' % _server.server_address[1]
+    profile = scraper.profile.as_dict()
+    stats = profile['hosts'][host]
+    assert stats['requests'] == 2
+    assert stats['bytes'] == len('/profiled') + len('/async')
+    assert stats['cache_misses'] == 2
+    assert stats['seconds'] >= 0.4
+    assert stats['parses'] == 1
+    assert stats['parse_seconds'] >= 0.1
+
+    # both requests are credited to the function that made them
+    assert profile['methods'].keys() == ['ExScraper.test_profile']
+
+
+def test_cassette():
+    cassette_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(cassette_dir, 'ex.cassette')
+        scraper = ExScraper({}, no_cache=True, error_dir=None,
+                            cassette=Cassette(path, 'record'))
+        assert scraper.urlopen(_url('/recorded')) == '/recorded'
+        assert scraper.urlopen(_url('/recorded?page=2')) == '/recorded?page=2'
+
+        # replaying needs no server, and is fast
+        scraper = ExScraper({}, no_cache=True, error_dir=None,
+                            retry_attempts=0,
+                            cassette=Cassette(path, 'replay'))
+        start = time.time()
+        page = scraper.urlopen(_url('/recorded'))
+        assert time.time() - start < 0.1
+        assert page == '/recorded'
+        assert page.response.code == 200
+        assert page.response.headers['content-type'] == 'text/plain'
+        assert scraper.urlopen(_url('/recorded?page=2')) == '/recorded?page=2'
+        assert_raises(urllib2.URLError, scraper.urlopen, _url('/missing'))
+    finally:
+        shutil.rmtree(cassette_dir)
+
+
+def test_run_cache():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        # tiny memory limit so responses end up on disk too
+        run_cache = RunCache(os.path.join(cache_dir, 'run_cache.sqlite'),
+                             max_memory=10)
+        bills = ExScraper({}, no_cache=True, error_dir=None,
+                          run_cache=run_cache)
+        votes = ExScraper({}, no_cache=True, error_dir=None,
+                          run_cache=run_cache)
+
+        # simultaneous requests share a single fetch
+        results = []
+        threads = [threading.Thread(target=lambda s: results.append(
+            s.urlopen(_url('/shared'))), args=(s,))
+            for s in (bills, votes, bills, votes)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == ['/shared'] * 4
+        assert _hits['/shared'] == 1
+
+        assert bills.urlopen(_url('/other')) == '/other'
+        page = votes.urlopen(_url('/shared'))
+        assert page == '/shared'
+        assert page.response.headers['content-type'] == 'text/plain'
+        assert _hits['/shared'] == 1 and _hits['/other'] == 1
+        assert run_cache.misses == 2
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_run_cache_host_down():
+    run_cache = RunCache(None)
+    bills = ExScraper({}, no_cache=True, error_dir=None)
+    votes = ExScraper({}, no_cache=True, error_dir=None)
+    bills.journal_unit = ('upper', 'bills')
+    votes.journal_unit = ('upper', 'votes')
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait()
+        bills._record_skipped(_url('/down'))
+        raise HostDownError(_url('/down'))
+
+    def get(scraper):
+        assert_raises(HostDownError, run_cache.fetch, scraper, _url('/down'),
+                      fetch)
+
+    leader = threading.Thread(target=get, args=(bills,))
+    leader.start()
+    started.wait()
+    waiter = threading.Thread(target=get, args=(votes,))
+    waiter.start()
+    time.sleep(0.1)
+    release.set()
+    leader.join()
+    waiter.join()
+
+    # the scraper waiting on the failed fetch records its skip as well
+    assert bills.skipped_urls[('upper', 'bills')] == [_url('/down')]
+    assert votes.skipped_urls[('upper', 'votes')] == [_url('/down')]
@@ -0,0 +1,30 @@
+from billy.scrape.utils import iterparse
+
+_doc = u"""<?xml version="1.0" encoding="iso-8859-1"?>
+<root xmlns="urn:ex">
+  <body Body="S">
+    <committee id="1">Appropriations</committee>
+    <committee id="2">Judiciary <i>and</i> Courts</committee>
+  </body>
+  <body Body="H">
+    <committee id="3">Educaci\xf3n</committee>
+  </body>
+</root>
+"""
+
+
+def test_iterparse():
+    seen = []
+    for com in iterparse(_doc, '{*}committee'):
+        seen.append((com.getparent().get('Body'), com.get('id'),
+                     ''.join(com.itertext())))
+        # earlier committees are cleared once we've moved on
+        previous = com.getprevious()
+        assert previous is None or previous.get('id') is None
+    assert seen == [('S', '1', 'Appropriations'),
+                    ('S', '2', 'Judiciary and Courts'),
+                    ('H', '3', u'Educaci\xf3n')]
+
+    # stopping early is fine, byte strings work too
+    elems = iterparse(_doc.encode('iso-8859-1'), ['{*}body', '{*}i'])
+    assert elems.next().text == 'and'
@@ -0,0 +1,84 @@
+import datetime
+
+from nose.tools import assert_raises
+
+from billy.scrape.validator import (load_schema, compile_schema,
+                                    validation_mode, DatetimeValidator)
+
+
+def _bill(**kwargs):
+    bill = {'_type': 'bill', 'level': 'state', 'state': 'ex',
+            'country': 'us', 'session': '2011', 'chamber': 'upper',
+            'bill_id': 'HB 1', 'title': 'A bill', 'type': ['bill'],
+            'alternate_titles': [],
+            'versions': [{'name': 'Introduced', 'url': ''}],
+            'documents': [], 'votes': [],
+            'sponsors': [{'type': 'primary', 'name': 'Smith'}],
+            'actions': [{'action': 'Introduced', 'actor': 'upper',
+                         'date': datetime.datetime(2011, 1, 1),
+                         'type': ['bill:introduced']}],
+            'sources': [{'url': 'http://example.com'}]}
+    bill.update(kwargs)
+    return bill
+
+
+def test_load_schema_copies():
+    schema = load_schema('bill')
+    schema['properties']['session']['enum'] = ['2011']
+    assert 'enum' not in load_schema('bill')['properties']['session']
+
+
+def test_compiled_schema_matches_validictory():
+    schema = load_schema('bill')
+    schema['properties']['session']['enum'] = ['2011']
+    compiled = compile_schema(schema)
+    assert compiled._check is not None
+    assert compile_schema(load_schema('bill')) is not compiled
+
+    vote = {'_type': 'vote', 'chamber': 'upper',
+            'date': datetime.datetime(2011, 1, 1), 'motion': 'passage',
+            'passed': True, 'yes_count': 1, 'yes_votes': ['Smith'],
+            'no_count': 0, 'no_votes': [], 'other_count': 0,
+            'other_votes': [], 'sources': []}
+
+    bills = [
+        _bill(),
+        _bill(votes=[vote]),
+        _bill(votes=[dict(vote, yes_count=-1)]),
+        _bill(session='2010'),
+        _bill(state='exx'),
+        _bill(title=''),
+        _bill(title=None),
+        _bill(type='bill'),
+        _bill(subjects=['Crime']),
+        _bill(versions=[{'url': 'http://example.com'}]),
+        _bill(actions=[{'action': 'x', 'actor': 'upper', 'date': '2011',
+                        'type': []}]),
+        _bill(actions=[{'action': 'x', 'actor': 'upper',
+                        'date': datetime.date(2011, 1, 1),
+                        'type': ['bill:vetoed']}]),
+    ]
+    del bills[-1]['sources']
+
+    validator = DatetimeValidator()
+    for bill in bills:
+        try:
+            validator.validate(bill, schema)
+            expected = None
+        except ValueError as e:
+            expected = str(e)
+
+        assert compiled._check(True, bill) == (expected is None)
+        try:
+            compiled.validate(bill)
+            assert expected is None
+        except ValueError as e:
+            assert str(e) == expected
+
+
+def test_validation_mode():
+    assert validation_mode('full') == ('full', 1)
+    assert validation_mode('sample:10') == ('sample', 10)
+    assert validation_mode('deferred') == ('deferred', 1)
+    for bad in ('sample', 'sample:0', 'full:2', 'sometimes'):
+        assert_raises(ValueError, validation_mode, bad)
@@ -0,0 +1,97 @@
+import sys
+import time
+import shutil
+import tempfile
+
+from billy.jobs import MemoryJobQueue, Worker
+
+
+class _ExWorker(Worker):
+    # jobs are python snippets instead of billy scripts
+    def command(self, job):
+        return [sys.executable, '-c'] + job['args']
+
+
+def test_lease_and_complete():
+    queue = MemoryJobQueue(lease_seconds=60, max_attempts=2)
+    first = queue.enqueue('scrape', ['nc', '--bills', '-s', '2011'],
+                          state='nc', session='2011')
+    queue.enqueue('import', ['nc', '--bills'], state='nc')
+
+    job = queue.lease('a')
+    assert job['_id'] == first
+    assert job['attempts'] == 1
+    assert queue.lease('b')['kind'] == 'import'
+    assert queue.lease('c') is None
+
+    # only the worker holding a job can complete it
+    queue.complete(first, 'b')
+    assert queue.jobs('done') == []
+    queue.complete(first, 'a')
+    assert [j['_id'] for j in queue.jobs('done')] == [first]
+
+
+def test_expired_lease():
+    queue = MemoryJobQueue(lease_seconds=0.1, max_attempts=2)
+    job_id = queue.enqueue('scrape', ['nc'])
+
+    # worker a dies, b picks the job up once the lease runs out
+    assert queue.lease('a')['_id'] == job_id
+    assert queue.lease('b') is None
+    time.sleep(0.15)
+    job = queue.lease('b')
+    assert job['_id'] == job_id and job['attempts'] == 2
+    assert not queue.heartbeat(job_id, 'a')
+    assert queue.heartbeat(job_id, 'b')
+
+    # out of attempts
+    queue.fail(job_id, 'b', 'broken')
+    assert queue.jobs('failed')[0]['error'] == 'broken'
+    assert queue.lease('c') is None
+
+
+def test_after():
+    queue = MemoryJobQueue(lease_seconds=60, max_attempts=1)
+    scrapes = [queue.enqueue('scrape', ['nc', '-s', session], state='nc',
+                             session=session) for session in ('2009', '2011')]
+    queue.enqueue('scrape', ['sc'], state='sc')
+    assert queue.unfinished('scrape', 'nc') == scrapes
+    imp = queue.enqueue('import', ['nc', '--bills'], state='nc',
+                        after=scrapes)
+
+    # the import waits for both of nc's scrapes
+    assert queue.lease('a')['_id'] == scrapes[0]
+    assert queue.lease('b')['_id'] == scrapes[1]
+    assert queue.lease('c')['state'] == 'sc'
+    assert queue.lease('d') is None
+    queue.complete(scrapes[0], 'a')
+    assert queue.lease('d') is None
+    queue.complete(scrapes[1], 'b')
+    assert queue.lease('d')['_id'] == imp
+
+    # and fails if one of them does
+    scrape = queue.enqueue('scrape', ['nc'], state='nc')
+    imp = queue.enqueue('import', ['nc'], state='nc', after=[scrape])
+    queue.fail(queue.lease('e')['_id'], 'e', 'broken')
+    assert queue.lease('e') is None
+    failed = queue.jobs('failed')
+    assert [j['_id'] for j in failed] == [scrape, imp]
+    assert 'runs after' in failed[1]['error']
+
+
+def test_worker():
+    log_dir = tempfile.mkdtemp()
+    try:
+        queue = MemoryJobQueue(lease_seconds=60, max_attempts=1)
+        ok = queue.enqueue('scrape', ['print "hello"'])
+        bad = queue.enqueue('scrape', ['import sys; sys.exit(3)'])
+        _ExWorker(queue, log_dir, name='w').run(once=True)
+
+        assert [j['_id'] for j in queue.jobs('done')] == [ok]
+        failed = queue.jobs('failed')
+        assert [j['_id'] for j in failed] == [bad]
+        assert 'status 3' in failed[0]['error']
+        with open('%s/job-%s.log' % (log_dir, ok)) as f:
+            assert f.read() == 'hello\n'
+    finally:
+        shutil.rmtree(log_dir)
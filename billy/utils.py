@@ -99,7 +99,7 @@ def extract_fields(d, fields, delimiter='|'):
     return rd
 
 
-def configure_logging(verbosity_count=0, module=None):
+def configure_logging(verbosity_count=0, module=None, filename=None):
     verbosity = {0: logging.WARNING, 1: logging.INFO}.get(verbosity_count,
                                                           logging.DEBUG)
     if module:
@@ -107,4 +107,5 @@ def configure_logging(verbosity_count=0, module=None):
                   " %(message)s")
     else:
         format = "%(asctime)s %(name)s %(levelname)s %(message)s"
-    logging.basicConfig(level=verbosity, format=format, datefmt="%H:%M:%S")
+    logging.basicConfig(level=verbosity, format=format, datefmt="%H:%M:%S",
+                        filename=filename)
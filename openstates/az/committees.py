@@ -1,6 +1,7 @@
 from billy.scrape import NoDataForPeriod
 from billy.scrape.committees import CommitteeScraper, Committee
-from lxml import etree, html
+from billy.scrape.utils import iterparse
+from lxml import html
 from openstates.az import utils
 from scrapelib import HTTPError
 import re, datetime
@@ -48,11 +49,10 @@ class AZCommitteeScraper(CommitteeScraper):
         url = base_url + 'xml/committees.asp?session=%s' % session_id
         
         with self.urlopen(url) as page:
-            root = etree.fromstring(page, etree.XMLParser(recover=True))
-            
-            body = '//body[@Body="%s"]/committee' % {'upper': 'S',
-                                                     'lower': 'H'}[chamber]
-            for com in root.xpath(body):
+            body = {'upper': 'S', 'lower': 'H'}[chamber]
+            for com in iterparse(page, 'committee', recover=True):
+                if com.getparent().get('Body') != body:
+                    continue
                 c_id, name, short_name, sub = com.values()
                 # the really good thing about AZ xml api is that their committee element
                 # tells you whether this is a sub committee or not
@@ -104,12 +104,11 @@ class AZCommitteeScraper(CommitteeScraper):
         url = base_url + 'xml/committees.asp?session=%s&type=%s' % (session_id,
                                                                  committee_type)
         with self.urlopen(url) as page:
-            root = etree.fromstring(page, etree.XMLParser(recover=True))
-            
-            body = '//body[@Body="%s"]/committee' % {'upper': 'S',
-                                                     'lower': 'H'}[chamber]
+            body = {'upper': 'S', 'lower': 'H'}[chamber]
             # TODO need to and make sure to add sub committees
-            for com in root.xpath(body):
+            for com in iterparse(page, 'committee', recover=True):
+                if com.getparent().get('Body') != body:
+                    continue
                 c_id, name, short_name, sub = com.values()
                 c = Committee(chamber, name, short_name=short_name, 
                               session=session, az_committee_id=c_id)
@@ -0,0 +1,166 @@
+"""
+Set-based loading of capublic bills for the CA bill scraper.
+
+Walking ``session.query(CABill)`` and touching each bill's relations
+costs a handful of queries per bill.  :class:`BillLoader` instead loads
+bills a window at a time, with their actions, versions (and authors) and
+votes (with motions, locations and per-legislator records) fetched by a
+few queries per window.
+
+Versions are loaded without their (large) ``bill_xml``: titles come from
+a :class:`TitleCache` keyed by ``bill_version_id`` and ``trans_update``,
+and only versions missing from it have their XML loaded and parsed.
+"""
+import os
+import sqlite3
+import threading
+
+from sqlalchemy.orm import subqueryload, subqueryload_all, joinedload, defer
+
+from openstates.ca.models import CABill, CABillVersion, parse_header
+
+
+def _chunks(items, size):
+    for i in xrange(0, len(items), size):
+        yield items[i:i + size]
+
+
+class TitleCache(object):
+    """
+    Title and Subject of bill versions, parsed from their XML once and
+    kept (in a SQLite file at ``path`` if given) until the version's
+    ``trans_update`` changes.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._local = threading.local()
+        self._memory = {}
+        if path:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            self._db.execute('CREATE TABLE IF NOT EXISTS titles ('
+                             'bill_version_id TEXT PRIMARY KEY, '
+                             'trans_update TEXT, has_xml INTEGER, '
+                             'title TEXT, subject TEXT)')
+            self._db.commit()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=60)
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _stamp(version):
+        if version.trans_update is None:
+            return ''
+        return version.trans_update.isoformat()
+
+    def get(self, versions):
+        """
+        {bill_version_id: (has_xml, header)} for those of versions that
+        are cached and unchanged
+        """
+        found = {}
+        stamps = dict((v.bill_version_id, self._stamp(v)) for v in versions)
+        if not self.path:
+            for id, stamp in stamps.iteritems():
+                if self._memory.get(id, (None,))[0] == stamp:
+                    found[id] = self._memory[id][1:]
+            return found
+
+        for chunk in _chunks(stamps.keys(), 500):
+            rows = self._db.execute(
+                'SELECT bill_version_id, trans_update, has_xml, title, '
+                'subject FROM titles WHERE bill_version_id IN (%s)' %
+                ','.join('?' * len(chunk)), chunk)
+            for id, stamp, has_xml, title, subject in rows:
+                if stamps[id] != stamp:
+                    continue
+                header = {}
+                if title is not None:
+                    header['Title'] = title
+                if subject is not None:
+                    header['Subject'] = subject
+                found[id] = (bool(has_xml), header)
+        return found
+
+    def set(self, version, has_xml, header):
+        if not self.path:
+            self._memory[version.bill_version_id] = (self._stamp(version),
+                                                     has_xml, header)
+            return
+        self._db.execute('INSERT OR REPLACE INTO titles VALUES '
+                         '(?, ?, ?, ?, ?)',
+                         (version.bill_version_id, self._stamp(version),
+                          has_xml, header.get('Title'),
+                          header.get('Subject')))
+
+    def commit(self):
+        if self.path:
+            self._db.commit()
+
+
+class BillLoader(object):
+    """
+    Loads the bills matching a query ``window_size`` bills at a time,
+    ordered by bill_id, with their related rows already loaded.
+
+    Each window's bills are expunged from the session once all of them have
+    been yielded, so memory use doesn't grow with the number of bills.
+    """
+
+    def __init__(self, session, title_cache=None, window_size=500):
+        self.session = session
+        self.title_cache = title_cache or TitleCache()
+        self.window_size = window_size
+
+    def _query(self, bill_ids):
+        return self.session.query(CABill).filter(
+            CABill.bill_id.in_(bill_ids)).order_by(CABill.bill_id).options(
+                subqueryload('actions'),
+                subqueryload_all('versions.authors'),
+                defer('versions.bill_xml'),
+                subqueryload_all('votes.votes'),
+                joinedload('votes.motion'),
+                joinedload('votes.location'))
+
+    def _load_titles(self, bills):
+        versions = [v for bill in bills for v in bill.versions]
+        cached = self.title_cache.get(versions)
+
+        missing = dict((v.bill_version_id, v) for v in versions
+                       if v.bill_version_id not in cached)
+        for chunk in _chunks(missing.keys(), self.window_size):
+            rows = self.session.query(CABillVersion.bill_version_id,
+                                      CABillVersion.bill_xml).filter(
+                CABillVersion.bill_version_id.in_(chunk))
+            for id, bill_xml in rows:
+                header = parse_header(bill_xml) if bill_xml else {}
+                cached[id] = (bool(bill_xml), header)
+                self.title_cache.set(missing[id], *cached[id])
+        self.title_cache.commit()
+
+        for version in versions:
+            version._has_xml, version._header_text = cached.get(
+                version.bill_version_id, (False, {}))
+
+    def bills(self, only=None, **filters):
+        """
+        the bills matching filters (as for filter_by), in windows,
+        restricted to the bill ids in only if it is given
+        """
+        bill_ids = [row[0] for row in self.session.query(
+            CABill.bill_id).filter_by(**filters).order_by(CABill.bill_id)]
+        if only is not None:
+            bill_ids = [id for id in bill_ids if id in only]
+
+        for window in _chunks(bill_ids, self.window_size):
+            bills = self._query(window).all()
+            self._load_titles(bills)
+            for bill in bills:
+                yield bill
+            self.session.expunge_all()
@@ -5,10 +5,11 @@ import datetime
 from billy.conf import settings
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
-from openstates.ca.models import CABill
+from openstates.ca.batch import BillLoader, TitleCache
+from openstates.ca.models import CAChangedBill
 
 from sqlalchemy.orm import sessionmaker, relation, backref
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, and_
 
 import pytz
 import lxml.html
@@ -27,7 +28,8 @@ class CABillScraper(BillScraper):
     _tz = pytz.timezone('US/Pacific')
 
     def __init__(self, metadata, host='localhost', user='', pw='',
-                 db='capublic', **kwargs):
+                 db='capublic', window_size=500, changed_only=None,
+                 **kwargs):
         super(CABillScraper, self).__init__(metadata, **kwargs)
 
         if not user:
@@ -47,6 +49,20 @@ class CABillScraper(BillScraper):
         self.Session = sessionmaker(bind=self.engine)
         self.session = self.Session()
 
+        # parsed version titles are kept between runs
+        title_cache = None
+        if settings.BILLY_CACHE_DIR:
+            title_cache = TitleCache(os.path.join(settings.BILLY_CACHE_DIR,
+                                                  'ca_titles.sqlite'))
+        self.loader = BillLoader(self.session, title_cache, window_size)
+
+        # only scrape the bills download.load_changes recorded as changed
+        if changed_only is None:
+            changed_only = getattr(settings, 'CA_CHANGED_BILLS_ONLY', False)
+        self.changed_only = changed_only
+        if changed_only:
+            CAChangedBill.__table__.create(self.engine, checkfirst=True)
+
     def scrape(self, chamber, session):
         self.validate_session(session)
 
@@ -68,10 +84,13 @@ class CABillScraper(BillScraper):
         else:
             chamber_name = 'ASSEMBLY'
 
-        bills = self.session.query(CABill).filter_by(
-            session_year=session).filter_by(
-            measure_type=type_abbr)
+        changed = None
+        if self.changed_only:
+            changed = dict(self.session.query(CAChangedBill.bill_id,
+                                              CAChangedBill.changed_at))
 
+        bills = self.loader.bills(changed, session_year=session,
+                                  measure_type=type_abbr)
 
         for bill in bills:
             bill_session = session
@@ -105,7 +124,7 @@ class CABillScraper(BillScraper):
             all_titles = set()
             i = 0
             for version in bill.versions:
-                if not version.bill_xml:
+                if not version.has_xml:
                     continue
 
                 title = clean_title(version.title)
@@ -302,6 +321,13 @@ class CABillScraper(BillScraper):
 
             self.save_bill(fsbill)
 
+            if changed is not None:
+                # done with it unless it changed again meanwhile
+                changes = CAChangedBill.__table__
+                self.engine.execute(changes.delete(and_(
+                    changes.c.bill_id == bill.bill_id,
+                    changes.c.changed_at <= changed[bill.bill_id])))
+
     def scrape_site_versions(self, source_url):
         with self.urlopen(source_url) as page:
             page = lxml.html.fromstring(page)
@@ -1,17 +1,41 @@
 import os
 import re
+import csv
+import shutil
 import os.path
+import urllib2
 import zipfile
 import datetime
 import tempfile
+import argparse
 import scrapelib
 
+from sqlalchemy import create_engine, MetaData, Table, select, tuple_, text
+from sqlalchemy.exc import NoSuchTableError
+
 from billy import db, settings
+from openstates.ca.models import CAChangedBill
+
+# the daily files' tables, in the order load_data loads them (versions
+# before the tables that only refer to a bill by version)
+TABLES = ['BILL_VERSION_TBL', 'LAW_SECTION_TBL', 'BILL_DETAIL_VOTE_TBL',
+          'LOCATION_CODE_TBL', 'BILL_ANALYSIS_TBL', 'BILL_MOTION_TBL',
+          'LAW_TOC_TBL', 'BILL_VERSION_AUTHORS_TBL', 'DAILY_FILE_TBL',
+          'BILL_SUMMARY_VOTE_TBL', 'LAW_TOC_SECTIONS_TBL',
+          'COMMITTEE_HEARING_TBL', 'CODES_TBL', 'BILL_HISTORY_TBL',
+          'LEGISLATOR_TBL', 'BILL_TBL']
 
+# rows are applied this many at a time
+BATCH_SIZE = 500
 
-def get_latest():
+
+def get_latest(full=False):
     """
     Get and load the latest SQL dumps from the California legislature.
+
+    Each day's changes are applied to the tables row by row with
+    :func:`load_changes` unless full is True, in which case the files are
+    extracted and loaded with the load_data script.
     """
     scraper = scrapelib.Scraper()
 
@@ -30,7 +54,7 @@ def get_latest():
 
                     url = base_url + f['filename']
                     print "Getting %s" % url
-                    get_and_load(url)
+                    get_and_load(url, full)
 
                     meta['_last_update'] = next_day
                     db.metadata.save(meta, safe=True)
@@ -42,7 +66,29 @@ def get_latest():
             next_day = next_day + datetime.timedelta(days=1)
 
 
-def get_and_load(url):
+def get_engine(host='localhost', db='capublic'):
+    user = os.environ.get('MYSQL_USER', getattr(settings, 'MYSQL_USER',
+                                                ''))
+    password = os.environ.get('MYSQL_PASSWORD', getattr(settings,
+                                                        'MYSQL_PASSWORD',
+                                                        ''))
+    if user and password:
+        conn_str = 'mysql://%s:%s@' % (user, password)
+    else:
+        conn_str = 'mysql://'
+    return create_engine('%s%s/%s?charset=utf8' % (conn_str, host, db))
+
+
+def get_and_load(url, full=False):
+    if not full:
+        zip_path = download(url)
+        try:
+            changed = load_changes(zip_path, get_engine())
+        finally:
+            os.remove(zip_path)
+        print "%d bills changed" % len(changed)
+        return
+
     user = os.environ.get('MYSQL_USER', getattr(settings, 'MYSQL_USER',
                                                 ''))
     password = os.environ.get('MYSQL_PASSWORD', getattr(settings,
@@ -62,14 +108,23 @@ def get_and_load(url):
     os.remove(zip_path)
 
 def download(url):
-    scraper = scrapelib.Scraper()
-    with scraper.urlopen(url) as resp:
-        (fd, path) = tempfile.mkstemp('.zip')
-
-        with os.fdopen(fd, 'wb') as w:
-            w.write(resp)
+    """
+    save url to a temporary .zip file, a chunk at a time rather than
+    holding the (often hundreds of MB) file in memory
+    """
+    (fd, path) = tempfile.mkstemp('.zip')
+    try:
+        resp = urllib2.urlopen(url)
+        try:
+            with os.fdopen(fd, 'wb') as w:
+                shutil.copyfileobj(resp, w, 1024 * 1024)
+        finally:
+            resp.close()
+    except:
+        os.remove(path)
+        raise
 
-        return path
+    return path
 
 
 def extract(path, directory):
@@ -110,5 +165,222 @@ def parse_directory_listing(s):
         yield entry
 
 
+
+_load_re = re.compile(r"INTO\s+TABLE\s+(?:\w+\.)?(\w+).*?"
+                      r"LINES\s+TERMINATED\s+BY\s+'[^']*'\s*"
+                      r"\(([^)]*)\)(.*)", re.I | re.S)
+_lob_re = re.compile(r"(\w+)\s*=\s*LOAD_FILE\s*\(\s*concat\s*\("
+                     r"[^,]+,\s*(@\w+)\s*\)\s*\)", re.I)
+_datetime_re = re.compile(r'^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d')
+
+
+def parse_load_sql(sql):
+    """
+    Get the table name, the .dat file's columns (LOB columns are given as
+    the @variable holding the LOB's file name) and a mapping of those
+    variables to their columns from one of the daily LOAD DATA .sql files.
+
+    Returns None if it isn't in the expected form.
+    """
+    match = _load_re.search(sql)
+    if not match:
+        return None
+    table, columns, rest = match.groups()
+    columns = [c.strip().lower() for c in columns.split(',')]
+    lobs = dict((var.lower(), col.lower())
+                for col, var in _lob_re.findall(rest))
+    return table.lower(), columns, lobs
+
+
+def _normalize(value):
+    # compare values read from the .dat files with values from MySQL
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    value = unicode(value).strip()
+    if _datetime_re.match(value):
+        return value[:19]
+    return value
+
+
+def read_rows(archive, name, columns, lobs):
+    """
+    Stream the rows of the .dat file name in the zip archive as dicts of
+    the given columns, with LOB file names replaced by the LOBs.
+    """
+    members = dict((n.lower(), n) for n in archive.namelist())
+
+    for row in csv.reader(archive.open(members[name.lower()]),
+                          delimiter='\t', quotechar='`'):
+        if not row:
+            continue
+        values = {}
+        for column, value in zip(columns, row):
+            if value in ('', '\\N', 'NULL'):
+                value = None
+            if column in lobs:
+                column = lobs[column]
+                if value is not None:
+                    lob_name = os.path.basename(value.replace('\\', '/'))
+                    value = archive.read(members[lob_name.lower()])
+            values[column] = value
+        yield values
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _apply(conn, table, rows, replaced=None):
+    """
+    write the rows that differ (by primary key and trans_update) from what
+    is in table, returns the rows that were written
+
+    For tables without a primary key, replaced is the set of bills (or
+    versions) whose rows were already replaced by earlier batches of the
+    same file, so a bill's rows are only deleted once however many
+    batches they span.
+    """
+    columns = [c for c in rows[0] if c in table.c]
+    pk = [c.name for c in table.primary_key.columns]
+    stamp = [c.name for c in table.c if c.name.startswith('trans_update')]
+
+    if pk:
+        # skip the rows that are already there with the same trans_update
+        key_cols = [table.c[name] for name in pk]
+        if len(pk) == 1:
+            where = key_cols[0].in_([row[pk[0]] for row in rows])
+        else:
+            where = tuple_(*key_cols).in_(
+                [tuple(row[name] for name in pk) for row in rows])
+        existing = set()
+        for found in conn.execute(select(key_cols +
+                                         [table.c[n] for n in stamp[:1]],
+                                         where)):
+            existing.add(tuple(_normalize(v) for v in found))
+        rows = [row for row in rows
+                if tuple(_normalize(row.get(n)) for n in pk + stamp[:1])
+                not in existing]
+        if not rows:
+            return []
+    else:
+        # without a key, a bill's (or version's) rows are replaced as a
+        # group
+        group = [c for c in ('bill_version_id', 'bill_id') if c in table.c]
+        if not group:
+            return None
+        group = group[0]
+        if replaced is None:
+            replaced = set()
+        new = set(row[group] for row in rows) - replaced
+        if new:
+            conn.execute(table.delete(table.c[group].in_(new)))
+            replaced.update(new)
+
+    conn.execute(text('REPLACE INTO %s (%s) VALUES (%s)' % (
+        table.name, ', '.join(columns),
+        ', '.join(':%s' % c for c in columns))),
+        [dict((c, row.get(c)) for c in columns) for row in rows])
+    return rows
+
+
+def _changed_bill_ids(conn, metadata, rows):
+    bill_ids = set(row['bill_id'] for row in rows if row.get('bill_id'))
+    version_ids = set(row['bill_version_id'] for row in rows
+                      if not row.get('bill_id') and
+                      row.get('bill_version_id'))
+    if version_ids:
+        versions = Table('bill_version_tbl', metadata, autoload=True)
+        for (bill_id,) in conn.execute(select(
+                [versions.c.bill_id],
+                versions.c.bill_version_id.in_(version_ids))):
+            bill_ids.add(bill_id)
+    return bill_ids
+
+
+def load_changes(zip_path, engine):
+    """
+    Apply the rows of a daily pubinfo zip file to the capublic tables,
+    without extracting it.
+
+    Rows whose primary key is already in the table with the same
+    trans_update are skipped, tables without a primary key have the rows
+    of each bill (or bill version) in the file replaced.  The bills that
+    any written row belongs to are recorded in ``billy_changed_bill_tbl``
+    (see :class:`~openstates.ca.models.CAChangedBill`) for the bill
+    scraper, and returned.
+    """
+    CAChangedBill.__table__.create(engine, checkfirst=True)
+    metadata = MetaData(bind=engine)
+    archive = zipfile.ZipFile(zip_path)
+    members = dict((n.lower(), n) for n in archive.namelist())
+    changed = set()
+
+    for name in TABLES:
+        dat = '%s.dat' % name.lower()
+        if dat not in members:
+            continue
+
+        try:
+            table = Table(name.lower(), metadata, autoload=True)
+        except NoSuchTableError:
+            print "%s: no such table, skipping" % name
+            continue
+
+        parsed = None
+        sql = '%s.sql' % name.lower()
+        if sql in members:
+            parsed = parse_load_sql(archive.read(members[sql]))
+        if parsed:
+            table_name, columns, lobs = parsed
+        else:
+            columns, lobs = [c.name for c in table.c], {}
+
+        written = 0
+        replaced = set()
+        conn = engine.connect()
+        try:
+            for rows in _chunks(read_rows(archive, dat, columns, lobs),
+                                BATCH_SIZE):
+                trans = conn.begin()
+                applied = _apply(conn, table, rows, replaced)
+                if applied is None:
+                    trans.rollback()
+                    print "%s: no key to apply changes by, skipping" % name
+                    break
+                bill_ids = _changed_bill_ids(conn, metadata, applied)
+                if bill_ids:
+                    now = datetime.datetime.now()
+                    conn.execute(CAChangedBill.__table__.delete(
+                        CAChangedBill.bill_id.in_(bill_ids)))
+                    conn.execute(CAChangedBill.__table__.insert(),
+                                 [{'bill_id': bill_id, 'changed_at': now}
+                                  for bill_id in bill_ids])
+                trans.commit()
+                written += len(applied)
+                changed.update(bill_ids)
+        finally:
+            conn.close()
+        print "%s: %d rows changed" % (name, written)
+
+    archive.close()
+    return changed
+
+
 if __name__ == '__main__':
-    get_latest()
+    parser = argparse.ArgumentParser(
+        description="Load the daily updates to CA's capublic database.")
+    parser.add_argument('--full', action='store_true', default=False,
+                        help='extract the files and run load_data instead '
+                        'of applying changed rows')
+    args = parser.parse_args()
+
+    get_latest(args.full)
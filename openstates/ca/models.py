@@ -6,9 +6,28 @@ from sqlalchemy.ext.declarative import declarative_base
 
 from lxml import etree
 
+from billy.scrape.utils import iterparse
+
 Base = declarative_base()
 
 
+def parse_header(bill_xml):
+    """
+    the Title and Subject of a bill version's XML, by name
+
+    They come before the (long) bill text, parsing stops once both are
+    found.
+    """
+    found = {}
+    for elem in iterparse(bill_xml, ['{*}Title', '{*}Subject'],
+                          recover=True):
+        name = etree.QName(elem).localname
+        found.setdefault(name, ''.join(elem.itertext()))
+        if len(found) == 2:
+            break
+    return found
+
+
 class CABill(Base):
     __tablename__ = "bill_tbl"
 
@@ -45,6 +64,18 @@ class CABill(Base):
         return "%s%d" % (self.measure_type, self.measure_num)
 
 
+class CAChangedBill(Base):
+    """
+    Bills changed by a daily update (see
+    :func:`openstates.ca.download.load_changes`) that the bill scraper
+    hasn't saved since.  Not part of capublic.
+    """
+    __tablename__ = "billy_changed_bill_tbl"
+
+    bill_id = Column(String(20), primary_key=True)
+    changed_at = Column(DateTime)
+
+
 class CABillVersion(Base):
     __tablename__ = "bill_version_tbl"
 
@@ -74,15 +105,25 @@ class CABillVersion(Base):
                                          etree.XMLParser(recover=True))
         return self._xml
 
+    def _header(self):
+        if not '_header_text' in self.__dict__:
+            self._header_text = parse_header(self.bill_xml)
+        return self._header_text
+
+    @property
+    def has_xml(self):
+        # BillLoader sets _has_xml so bill_xml needn't be loaded
+        if not '_has_xml' in self.__dict__:
+            self._has_xml = bool(self.bill_xml)
+        return self._has_xml
+
     @property
     def title(self):
-        text = self.xml.xpath("string(//*[local-name() = 'Title'])") or ''
-        return text.strip()
+        return self._header().get('Title', '').strip()
 
     @property
     def short_title(self):
-        text = self.xml.xpath("string(//*[local-name() = 'Subject'])") or ''
-        return text.strip()
+        return self._header().get('Subject', '').strip()
 
 
 class CABillVersionAuthor(Base):
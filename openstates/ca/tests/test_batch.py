@@ -0,0 +1,115 @@
+import os
+import shutil
+import datetime
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, object_session
+
+from openstates.ca.batch import TitleCache, BillLoader
+from openstates.ca.models import Base, CABill, CABillVersion
+
+_xml = (u'<caml:MeasureDoc xmlns:caml="http://lc.ca.gov/legalservices/'
+        'schemas/caml.1#"><caml:Description><caml:Title>%s</caml:Title>'
+        '<caml:Subject>%s</caml:Subject></caml:Description>'
+        '<caml:Bill>...</caml:Bill></caml:MeasureDoc>')
+
+
+def _session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    for num in (1, 2, 3):
+        bill_id = '20110AB%d' % num
+        session.add(CABill(bill_id=bill_id, session_year='20112012',
+                           measure_type='AB', measure_num=num))
+        session.add(CABillVersion(
+            bill_version_id=bill_id + '_99', bill_id=bill_id, version_num=99,
+            bill_xml=_xml % ('An act %d' % num, 'Subject %d' % num),
+            trans_update=datetime.datetime(2011, 1, 10)))
+    session.add(CABillVersion(bill_version_id='20110AB1_98',
+                              bill_id='20110AB1', version_num=98,
+                              trans_update=datetime.datetime(2011, 1, 9)))
+    session.commit()
+    return session
+
+
+def _titles(loader):
+    return dict((v.bill_version_id, (v.has_xml, v.title, v.short_title))
+                for bill in loader.bills() for v in bill.versions)
+
+
+def _update(session, bill_version_id, title, trans_update=None):
+    version = session.query(CABillVersion).get(bill_version_id)
+    version.bill_xml = _xml % (title, 'Changed')
+    if trans_update:
+        version.trans_update = trans_update
+    session.commit()
+    session.expunge_all()
+
+
+def test_windows():
+    session = _session()
+    loader = BillLoader(session, window_size=2)
+
+    bills = loader.bills()
+    first = bills.next()
+    assert first.bill_id == '20110AB1'
+    assert [v.version_num for v in first.versions] == [99, 98]
+    assert bills.next().bill_id == '20110AB2'
+    assert object_session(first) is session
+
+    # the first window is expunged once the next is loaded
+    assert bills.next().bill_id == '20110AB3'
+    assert object_session(first) is None
+    assert list(bills) == []
+
+    assert [b.bill_id for b in loader.bills(only=set(['20110AB2']))] == [
+        '20110AB2']
+
+
+def test_titles():
+    session = _session()
+    versions = []
+    for bill in BillLoader(session).bills():
+        versions.extend(bill.versions)
+
+    # has_xml and the titles work without loading bill_xml, even once
+    # the versions are expunged
+    assert versions[0].bill_version_id == '20110AB1_99'
+    assert object_session(versions[0]) is None
+    for version in versions:
+        assert 'bill_xml' not in version.__dict__
+    assert versions[0].has_xml
+    assert versions[0].title == 'An act 1'
+    assert versions[0].short_title == 'Subject 1'
+    assert versions[1].bill_version_id == '20110AB1_98'
+    assert not versions[1].has_xml and versions[1].title == ''
+
+
+def _check_cache(title_cache):
+    session = _session()
+    assert _titles(BillLoader(session, title_cache))['20110AB2_99'] == (
+        True, 'An act 2', 'Subject 2')
+
+    # cached titles are used while trans_update is unchanged
+    _update(session, '20110AB2_99', 'Amended')
+    assert _titles(BillLoader(session, title_cache))['20110AB2_99'] == (
+        True, 'An act 2', 'Subject 2')
+
+    _update(session, '20110AB2_99', 'Amended',
+            datetime.datetime(2011, 2, 1))
+    titles = _titles(BillLoader(session, title_cache))
+    assert titles['20110AB2_99'] == (True, 'Amended', 'Changed')
+    assert titles['20110AB1_99'] == (True, 'An act 1', 'Subject 1')
+
+
+def test_title_cache():
+    _check_cache(TitleCache())
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        _check_cache(TitleCache(os.path.join(cache_dir, 'ca', 'titles.db')))
+    finally:
+        shutil.rmtree(cache_dir)
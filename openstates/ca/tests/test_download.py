@@ -0,0 +1,103 @@
+import zipfile
+import StringIO
+
+from sqlalchemy import (create_engine, MetaData, Table, Column, String,
+                        Integer, DateTime, select)
+
+from openstates.ca.download import parse_load_sql, read_rows, _apply, _chunks
+
+_version_sql = r"""LOAD DATA LOCAL INFILE 'BILL_VERSION_TBL.dat'
+INTO TABLE capublic.bill_version_tbl
+FIELDS TERMINATED BY '\t' OPTIONALLY ENCLOSED BY '`'
+LINES TERMINATED BY '\n'
+(bill_version_id, bill_id, @var1, trans_uid, trans_update)
+SET bill_xml=LOAD_FILE(concat('/data/capublic/', @var1));
+"""
+
+
+def _archive(files):
+    f = StringIO.StringIO()
+    archive = zipfile.ZipFile(f, 'w')
+    for name, data in files.iteritems():
+        archive.writestr(name, data)
+    archive.close()
+    return zipfile.ZipFile(f)
+
+
+def _tables():
+    metadata = MetaData(bind=create_engine('sqlite://'))
+    versions = Table('bill_version_tbl', metadata,
+                     Column('bill_version_id', String(30), primary_key=True),
+                     Column('bill_id', String(20)),
+                     Column('trans_update', DateTime))
+    authors = Table('bill_version_authors_tbl', metadata,
+                    Column('bill_version_id', String(30)),
+                    Column('name', String(100)),
+                    Column('seq', Integer))
+    metadata.create_all()
+    return metadata.bind.connect(), versions, authors
+
+
+def test_parse_load_sql():
+    table, columns, lobs = parse_load_sql(_version_sql)
+    assert table == 'bill_version_tbl'
+    assert columns == ['bill_version_id', 'bill_id', '@var1', 'trans_uid',
+                       'trans_update']
+    assert lobs == {'@var1': 'bill_xml'}
+
+    assert parse_load_sql('DELETE FROM bill_tbl;') is None
+
+
+def test_read_rows():
+    archive = _archive({
+        'BILL_VERSION_TBL.dat':
+            '`20110AB1_99`\t`20110AB1`\t`BILL_VERSION_TBL_1.lob`\t'
+            '`\\N`\t`2011-01-10 12:00:00`\n'
+            '\n'
+            '`20110AB2_99`\t`20110AB2`\t``\tNULL\t`2011-01-11 12:00:00`\n',
+        'bill_version_tbl_1.lob': '<caml/>'})
+    table, columns, lobs = parse_load_sql(_version_sql)
+
+    rows = list(read_rows(archive, 'bill_version_tbl.dat', columns, lobs))
+    assert len(rows) == 2
+    assert rows[0] == {'bill_version_id': '20110AB1_99',
+                       'bill_id': '20110AB1', 'bill_xml': '<caml/>',
+                       'trans_uid': None,
+                       'trans_update': '2011-01-10 12:00:00'}
+    assert rows[1]['bill_xml'] is None
+
+
+def test_apply_by_key():
+    conn, versions, authors = _tables()
+    rows = [{'bill_version_id': '20110AB1_99', 'bill_id': '20110AB1',
+             'trans_update': '2011-01-10 12:00:00'},
+            {'bill_version_id': '20110AB2_99', 'bill_id': '20110AB2',
+             'trans_update': '2011-01-10 12:00:00'}]
+    assert _apply(conn, versions, rows) == rows
+
+    # only rows with a new trans_update are written again
+    rows[1] = dict(rows[1], trans_update='2011-01-11 12:00:00')
+    assert _apply(conn, versions, rows) == rows[1:]
+    assert _apply(conn, versions, rows) == []
+    assert len(conn.execute(select([versions])).fetchall()) == 2
+
+
+def test_apply_without_key():
+    conn, versions, authors = _tables()
+    conn.execute(authors.insert(), [
+        {'bill_version_id': '20110AB1_99', 'name': 'Old', 'seq': 0},
+        {'bill_version_id': '20110AB3_99', 'name': 'Kept', 'seq': 0}])
+
+    # a version's rows are replaced as a group, even when they span
+    # batches
+    rows = [{'bill_version_id': '20110AB1_99', 'name': 'Author %d' % i,
+             'seq': i} for i in range(5)]
+    replaced = set()
+    for batch in _chunks(rows, 2):
+        _apply(conn, authors, batch, replaced)
+
+    found = conn.execute(select([authors.c.bill_version_id, authors.c.seq])
+                         .order_by(authors.c.bill_version_id,
+                                   authors.c.seq)).fetchall()
+    assert [tuple(row) for row in found] == [
+        ('20110AB1_99', i) for i in range(5)] + [('20110AB3_99', 0)]
@@ -1,14 +1,8 @@
 import re
-import csv
 import datetime
 from operator import itemgetter
 from collections import defaultdict
 
-try:
-    import cStringIO as StringIO
-except ImportError:
-    import StringIO
-
 from billy.scrape import NoDataForPeriod
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
@@ -20,13 +14,11 @@ import lxml.html
 class CTBillScraper(BillScraper):
     state = 'ct'
 
-    _committee_names = {}
-    _introducers = defaultdict(set)
-    _subjects = defaultdict(list)
-
     def __init__(self, *args, **kwargs):
         super(CTBillScraper, self).__init__(*args, **kwargs)
         self.raise_errors = False
+        self._introducers = defaultdict(set)
+        self._subjects = defaultdict(list)
         self.scrape_committee_names()
         self.scrape_subjects()
         self.scrape_introducers('upper')
@@ -46,12 +38,11 @@ class CTBillScraper(BillScraper):
 
     def scrape_bill_info(self, chamber, session):
         info_url = "ftp://ftp.cga.ct.gov/pub/data/bill_info.csv"
-        page = self.urlopen(info_url)
-        page = csv.DictReader(StringIO.StringIO(page))
+        bill_info = self.bulk_source(info_url, 'bill_num')
 
         abbrev = {'upper': 'S', 'lower': 'H'}[chamber]
 
-        for row in page:
+        for row in bill_info.rows():
             bill_id = row['bill_num']
             if not bill_id[0] == abbrev:
                 continue
@@ -184,27 +175,16 @@ class CTBillScraper(BillScraper):
 
     def scrape_bill_history(self):
         history_url = "ftp://ftp.cga.ct.gov/pub/data/bill_history.csv"
-        page = self.urlopen(history_url)
-        page = csv.DictReader(StringIO.StringIO(page))
-
-        action_rows = defaultdict(list)
-
-        for row in page:
-            bill_id = row['bill_num']
-
-            if bill_id in self.bills:
-                action_rows[bill_id].append(row)
-
-        for (bill_id, actions) in action_rows.iteritems():
-            bill = self.bills[bill_id]
+        history = self.bulk_source(history_url, 'bill_num', types={
+            'act_date': lambda date: datetime.datetime.strptime(
+                date, "%Y-%m-%d %H:%M:%S")})
 
-            actions.sort(key=itemgetter('act_date'))
+        for (bill_id, bill) in self.bills.iteritems():
+            actions = sorted(history.get(bill_id), key=itemgetter('act_date'))
             act_chamber = bill['chamber']
 
             for row in actions:
-                date = row['act_date']
-                date = datetime.datetime.strptime(
-                    date, "%Y-%m-%d %H:%M:%S").date()
+                date = row['act_date'].date()
 
                 action = row['act_desc'].decode('latin-1').strip()
                 act_type = []
@@ -212,8 +192,7 @@ class CTBillScraper(BillScraper):
                 match = re.search('COMM(ITTEE|\.) ON$', action)
                 if match:
                     comm_code = row['qual1']
-                    comm_name = self._committee_names.get(comm_code,
-                                                          comm_code)
+                    comm_name = self.committee_name(comm_code)
                     action = "%s %s" % (action, comm_name)
                     act_type.append('committee:referred')
                 elif row['qual1']:
@@ -276,14 +255,14 @@ class CTBillScraper(BillScraper):
 
     def scrape_committee_names(self):
         comm_url = "ftp://ftp.cga.ct.gov/pub/data/committee.csv"
-        page = self.urlopen(comm_url)
-        page = csv.DictReader(StringIO.StringIO(page))
-
-        for row in page:
-            comm_code = row['comm_code'].strip()
-            comm_name = row['comm_name'].strip()
-            comm_name = re.sub(r' Committee$', '', comm_name)
-            self._committee_names[comm_code] = comm_name
+        self._committee_names = self.bulk_source(
+            comm_url, lambda row: row['comm_code'].strip())
+
+    def committee_name(self, comm_code):
+        row = self._committee_names.first(comm_code)
+        if row is None:
+            return comm_code
+        return re.sub(r' Committee$', '', row['comm_name'].strip())
 
     def scrape_introducers(self, chamber):
         chamber_letter = {'upper': 's', 'lower': 'h'}[chamber]
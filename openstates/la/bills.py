@@ -1,17 +1,18 @@
-import os
 import re
-import tempfile
 import datetime
 
 from billy.scrape import ScrapeError
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
-from billy.scrape.utils import pdf_to_lxml
+from billy.scrape.utils import convert_pdf_async
 from openstates.la import metadata
 
 import lxml.html
 
 
+_vote_re = '^(Senate|House) Vote on [^,]*,(.*)$'
+
+
 class LABillScraper(BillScraper):
     state = 'la'
 
@@ -221,11 +222,20 @@ class LABillScraper(BillScraper):
             page = lxml.html.fromstring(text)
             page.make_links_absolute(url)
 
+            # start converting every vote pdf before parsing any of them
+            votes = []
             for a in page.xpath("//a[contains(@href, 'streamdocument.asp')]"):
-                self.scrape_vote(bill, a.text, a.attrib['href'])
+                if not re.match(_vote_re, a.text):
+                    continue
+                with self.urlopen(a.attrib['href']) as pdf:
+                    votes.append((a.text, a.attrib['href'],
+                                  convert_pdf_async(pdf, 'html')))
 
-    def scrape_vote(self, bill, name, url):
-        match = re.match('^(Senate|House) Vote on [^,]*,(.*)$', name)
+            for name, vote_url, conversion in votes:
+                self.scrape_vote(bill, name, vote_url, conversion.get())
+
+    def scrape_vote(self, bill, name, url, text):
+        match = re.match(_vote_re, name)
 
         if not match:
             return
@@ -247,46 +257,41 @@ class LABillScraper(BillScraper):
         vote['type'] = type
         vote.add_source(url)
 
-        with self.urlopen(url) as text:
-            (fd, temp_path) = tempfile.mkstemp()
-            with os.fdopen(fd, 'wb') as w:
-                w.write(text)
-            html = pdf_to_lxml(temp_path)
-            os.remove(temp_path)
+        html = lxml.html.fromstring(text)
 
-            vote_type = None
-            total_re = re.compile('^Total--(\d+)$')
-            body = html.xpath('string(/html/body)')
+        vote_type = None
+        total_re = re.compile('^Total--(\d+)$')
+        body = html.xpath('string(/html/body)')
 
-            date_match = re.search('Date: (\d{1,2}/\d{1,2}/\d{4})', body)
-            try:
-                date = date_match.group(1)
-            except AttributeError:
-                self.warning("BAD VOTE: date error")
-                return
+        date_match = re.search('Date: (\d{1,2}/\d{1,2}/\d{4})', body)
+        try:
+            date = date_match.group(1)
+        except AttributeError:
+            self.warning("BAD VOTE: date error")
+            return
 
-            vote['date'] = datetime.datetime.strptime(date, '%m/%d/%Y')
+        vote['date'] = datetime.datetime.strptime(date, '%m/%d/%Y')
 
-            for line in body.replace(u'\xa0', '\n').split('\n'):
-                line = line.replace('&nbsp;', '').strip()
-                if not line:
-                    continue
+        for line in body.replace(u'\xa0', '\n').split('\n'):
+            line = line.replace('&nbsp;', '').strip()
+            if not line:
+                continue
 
-                if line in ('YEAS', 'NAYS', 'ABSENT'):
-                    vote_type = {'YEAS': 'yes', 'NAYS': 'no',
-                                 'ABSENT': 'other'}[line]
-                elif line in ('Total', '--'):
-                    vote_type = None
-                elif vote_type:
-                    match = total_re.match(line)
-                    if match:
-                        vote['%s_count' % vote_type] = int(match.group(1))
-                    elif vote_type == 'yes':
-                        vote.yes(line)
-                    elif vote_type == 'no':
-                        vote.no(line)
-                    elif vote_type == 'other':
-                        vote.other(line)
+            if line in ('YEAS', 'NAYS', 'ABSENT'):
+                vote_type = {'YEAS': 'yes', 'NAYS': 'no',
+                             'ABSENT': 'other'}[line]
+            elif line in ('Total', '--'):
+                vote_type = None
+            elif vote_type:
+                match = total_re.match(line)
+                if match:
+                    vote['%s_count' % vote_type] = int(match.group(1))
+                elif vote_type == 'yes':
+                    vote.yes(line)
+                elif vote_type == 'no':
+                    vote.no(line)
+                elif vote_type == 'other':
+                    vote.other(line)
 
         # tally counts
         vote['yes_count'] = len(vote['yes_votes'])
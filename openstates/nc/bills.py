@@ -4,7 +4,7 @@ from collections import defaultdict
 
 import lxml.html
 
-from billy.scrape.bills import BillScraper, Bill
+from billy.scrape.bills import BillScraper, Bill, BillCandidate
 
 class NCBillScraper(BillScraper):
 
@@ -164,17 +164,26 @@ class NCBillScraper(BillScraper):
 
             self.save_bill(bill)
 
+    def bill_key(self, bill_id):
+        # listings have H102, saved bills HB 102/HR 102/HJR 102
+        if ' ' in bill_id:
+            bill_id = bill_id[0] + bill_id.split(' ')[-1]
+        return bill_id
+
     def scrape(self, chamber, session):
-        chamber = {'lower': 'House', 'upper': 'Senate'}[chamber]
+        chamber_name = {'lower': 'House', 'upper': 'Senate'}[chamber]
         url = 'http://www.ncga.state.nc.us/gascripts/SimpleBillInquiry/'\
             'displaybills.pl?Session=%s&tab=Chamber&Chamber=%s' % (
-            session, chamber)
+            session, chamber_name)
 
         if self.is_latest_session(session):
             self.build_subject_map()
 
         with self.urlopen(url) as data:
             doc = lxml.html.fromstring(data)
-            for row in doc.xpath('//table[@cellpadding=3]/tr')[1:]:
-                bill_id = row.xpath('td[1]/a/text()')[0]
-                self.scrape_bill(chamber, session, bill_id)
+            candidates = [BillCandidate(row.xpath('td[1]/a/text()')[0])
+                          for row in
+                          doc.xpath('//table[@cellpadding=3]/tr')[1:]]
+
+        for candidate in self.prioritize_bills(chamber, session, candidates):
+            self.scrape_bill(chamber, session, candidate['bill_id'])
@@ -6,7 +6,9 @@ from billy.scrape.votes import VoteScraper, Vote
 
 import lxml.etree
 import scrapelib
+import threading
 import zipfile
+import copy
 import csv
 import os
 
@@ -113,6 +115,10 @@ class NJBillScraper(BillScraper, DBFMixin):
 
     _version_types = ('I', 'R', 'RS', 'ACS', 'AS', 'SCS', 'SS')
 
+    # parsed vote archives by URL, see get_vote_archive
+    _vote_archives = {}
+    _vote_archive_lock = threading.Lock()
+
     def initialize_committees(self, year_abr):
         chamber = {'A':'Assembly', 'S': 'Senate', '':''}
 
@@ -161,8 +167,19 @@ class NJBillScraper(BillScraper, DBFMixin):
         #Main Bill information
         main_bill_url, main_bill_db = self.get_dbf(year_abr, 'MAINBILL')
 
-        # keep a dictionary of bills (mapping bill_id to Bill obj)
-        bill_dict = {}
+        # the other tables are looked up by bill id as each bill is built
+        bill_sponsors_url, bill_sponsors_db = self.get_bill_dbf(year_abr,
+                                                                'BILLSPON')
+        bill_document_url, bill_document_db = self.get_bill_dbf(year_abr,
+                                                                'BILLWP')
+        bill_action_url, bill_action_db = self.get_bill_dbf(year_abr,
+                                                            'BILLHIST')
+        subject_url, subject_db = self.get_bill_dbf(year_abr, 'BILLSUBJ')
+
+        bill_votes = self.scrape_votes(year_abr)
+
+        # ids of the bills that were saved
+        bill_ids = set()
 
         for rec in main_bill_db:
             bill_type = rec["billtype"]
@@ -181,58 +198,76 @@ class NJBillScraper(BillScraper, DBFMixin):
             bill = Bill(str(session), chamber, bill_id, title,
                         type=self._bill_types[bill_type[1:]])
             bill.add_source(main_bill_url)
-            bill_dict[bill_id] = bill
 
-        #Sponsors
-        bill_sponsors_url, bill_sponsors_db = self.get_dbf(year_abr, 'BILLSPON')
+            #Sponsors
+            for rec in bill_sponsors_db.lookup('bill', bill_id):
+                name = rec["sponsor"]
+                sponsor_type = rec["type"]
+                if sponsor_type == 'P':
+                    sponsor_type = "Primary"
+                else:
+                    sponsor_type = "Co-sponsor"
+                bill.add_sponsor(sponsor_type, name)
+
+            #Documents
+            for rec in bill_document_db.lookup('bill', bill_id):
+                document = rec["document"]
+                document = document.split('\\')
+                document = document[-2] + "/" + document[-1]
+
+                htm_url = 'http://www.njleg.state.nj.us/%s/Bills/%s' % (
+                    year_abr, document.replace('.DOC', '.HTM'))
+
+                # name document based _doctype
+                try:
+                    doc_name = self._doctypes[rec['doctype']]
+                except KeyError:
+                    raise Exception('unknown doctype %s on %s' %
+                                    (rec['doctype'], bill_id))
+                if rec['comment']:
+                    doc_name += ' ' + rec['comment']
+
+                if rec['doctype'] in self._version_types:
+                    bill.add_version(doc_name, htm_url)
+                else:
+                    bill.add_document(doc_name, htm_url)
 
-        for rec in bill_sponsors_db:
-            bill_type = rec["billtype"]
-            bill_number = int(rec["billnumber"])
-            bill_id = bill_type + str(bill_number)
-            bill = bill_dict[bill_id]
-            name = rec["sponsor"]
-            sponsor_type = rec["type"]
-            if sponsor_type == 'P':
-                sponsor_type = "Primary"
-            else:
-                sponsor_type = "Co-sponsor"
-            bill.add_sponsor(sponsor_type, name)
+            # Votes
+            for vote in bill_votes.pop(bill_id, ()):
+                bill.add_vote(vote)
 
+            #Actions
+            for rec in bill_action_db.lookup('bill', bill_id):
+                action = rec["action"]
+                date = rec["dateaction"]
+                actor = rec["house"]
+                comment = rec["comment"]
+                action, atype = self.categorize_action(action)
+                if comment:
+                    action += (' ' + comment)
+                bill.add_action(actor, action, date, type=atype)
+
+            # Subjects
+            for rec in subject_db.lookup('bill', bill_id):
+                bill.setdefault('subjects', []).append(rec['subjectkey'])
 
-        #Documents
-        bill_document_url, bill_document_db = self.get_dbf(year_abr, 'BILLWP')
+            # add sources
+            bill.add_source(bill_sponsors_url)
+            bill.add_source(bill_document_url)
+            bill.add_source(bill_action_url)
+            bill.add_source(subject_url)
+            self.save_bill(bill)
+            bill_ids.add(bill_id)
 
-        #print bill_document_db[2]
-        for rec in bill_document_db:
-            bill_type = rec["billtype"]
-            bill_number = int(rec["billnumber"])
-            bill_id = bill_type + str(bill_number)
-            bill = bill_dict[bill_id]
-            document = rec["document"]
-            document = document.split('\\')
-            document = document[-2] + "/" + document[-1]
-            year = str(year_abr) + str((year_abr + 1))
-
-            #doc_url = "ftp://www.njleg.state.nj.us/%s/%s" % (year, document)
-            htm_url = 'http://www.njleg.state.nj.us/%s/Bills/%s' % (year_abr,
-                document.replace('.DOC', '.HTM'))
-
-            # name document based _doctype
-            try:
-                doc_name = self._doctypes[rec['doctype']]
-            except KeyError:
-                raise Exception('unknown doctype %s on %s' %
-                                (rec['doctype'], bill_id))
-            if rec['comment']:
-                doc_name += ' ' + rec['comment']
-
-            if rec['doctype'] in self._version_types:
-                bill.add_version(doc_name, htm_url)
-            else:
-                bill.add_document(doc_name, htm_url)
+        for bill_id in bill_votes:
+            self.warning('votes for unknown bill %s' % bill_id)
+        for bill_id in set(subject_db.keys('bill')) - bill_ids:
+            self.warning('invalid bill id in BILLSUBJ.DBF: %s' % bill_id)
+
+    def scrape_votes(self, year_abr):
+        """ the votes in the session's vote files, by bill id """
+        bill_votes = {}
 
-        # Votes
         next_year = int(year_abr)+1
         vote_info_list = ['A%s' % year_abr,
                           'A%s' % next_year,
@@ -243,113 +278,104 @@ class NJBillScraper(BillScraper, DBFMixin):
                          ]
 
         for filename in vote_info_list:
-            s_vote_url = 'ftp://www.njleg.state.nj.us/votes/%s.zip' % filename
-            s_vote_zip, resp = self.urlretrieve(s_vote_url)
-            zipedfile = zipfile.ZipFile(s_vote_zip)
-            vfile = "%s.txt" % filename
-            vote_file = zipedfile.open(vfile, 'U')
-            vdict_file = csv.DictReader(vote_file)
-
-            votes = {}
-            if filename.startswith('A') or filename.startswith('CA'):
-                chamber = "lower"
-            else:
-                chamber = "upper"
+            for bill_id, votes in self.get_vote_archive(filename).iteritems():
+                # copies, the archive's votes are shared with other scrapers
+                bill_votes.setdefault(bill_id, []).extend(
+                    copy.deepcopy(votes))
 
-            if filename.startswith('C'):
-                vote_file_type = 'committee'
-            else:
-                vote_file_type = 'chamber'
+        return bill_votes
 
-            for rec in vdict_file:
+    def get_vote_archive(self, filename):
+        """
+        the votes in a vote ZIP, by bill id
 
-                if vote_file_type == 'chamber':
-                    bill_id = rec["Bill"].strip()
-                    leg = rec["Full_Name"]
+        Each archive is downloaded and parsed once per process, every NJ
+        bill scraper (e.g. one per chamber) shares the result.
+        """
+        s_vote_url = 'ftp://www.njleg.state.nj.us/votes/%s.zip' % filename
+
+        with self._vote_archive_lock:
+            if s_vote_url not in self._vote_archives:
+                s_vote_zip, resp = self.urlretrieve(s_vote_url)
+                try:
+                    self._vote_archives[s_vote_url] = self.parse_vote_archive(
+                        filename, s_vote_zip)
+                finally:
+                    # remove temp file
+                    os.remove(s_vote_zip)
+            return self._vote_archives[s_vote_url]
+
+    def parse_vote_archive(self, filename, s_vote_zip):
+        zipedfile = zipfile.ZipFile(s_vote_zip)
+        # index the members by lowercased name, NJ isn't consistent
+        members = dict((name.lower(), name) for name in zipedfile.namelist())
+        vfile = members.get("%s.txt" % filename.lower(), "%s.txt" % filename)
+        vote_file = zipedfile.open(vfile, 'U')
+        vdict_file = csv.DictReader(vote_file)
+
+        votes = {}
+        if filename.startswith('A') or filename.startswith('CA'):
+            chamber = "lower"
+        else:
+            chamber = "upper"
 
-                    date = rec["Session_Date"]
-                    action = rec["Action"]
-                    leg_vote = rec["Legislator_Vote"]
-                else:
-                    bill_id = '%s%s' % (rec['Bill_Type'], rec['Bill_Number'])
-                    leg = rec['Name']
-                    # drop time portion
-                    date = rec['Agenda_Date'].split()[0]
-                    # make motion readable
-                    action = self._com_vote_motions[rec['BillAction']]
-                    # first char (Y/N) use [0:1] to ignore ''
-                    leg_vote = rec['LegislatorVote'][0:1]
-
-                date = datetime.strptime(date, "%m/%d/%Y")
-                vote_id = '_'.join((bill_id, chamber, action))
-                vote_id = vote_id.replace(" ", "_")
-
-                if vote_id not in votes:
-                    votes[vote_id] = Vote(chamber, date, action, None, None,
-                                          None, None, bill_id=bill_id)
-                if vote_file_type == 'committee':
-                    votes[vote_id]['committee'] = self._committees[
-                        rec['Committee_House']]
-
-                if leg_vote == "Y":
-                    votes[vote_id].yes(leg)
-                elif leg_vote == "N":
-                    votes[vote_id].no(leg)
-                else:
-                    votes[vote_id].other(leg)
-
-            # remove temp file
-            os.remove(s_vote_zip)
-
-            #Counts yes/no/other votes and saves overall vote
-            for vote in votes.itervalues():
-                vote_yes_count = len(vote["yes_votes"])
-                vote_no_count = len(vote["no_votes"])
-                vote_other_count = len(vote["other_votes"])
-                vote["yes_count"] = vote_yes_count
-                vote["no_count"] = vote_no_count
-                vote["other_count"] = vote_other_count
-                if vote_yes_count > vote_no_count:
-                    vote["passed"] = True
-                else:
-                    vote["passed"] = False
-                vote_bill_id = vote["bill_id"]
-                bill = bill_dict[vote_bill_id]
-                bill.add_vote(vote)
+        if filename.startswith('C'):
+            vote_file_type = 'committee'
+        else:
+            vote_file_type = 'chamber'
 
-        #Actions
-        bill_action_url, bill_action_db = self.get_dbf(year_abr, 'BILLHIST')
+        for rec in vdict_file:
 
+            if vote_file_type == 'chamber':
+                bill_id = rec["Bill"].strip()
+                leg = rec["Full_Name"]
 
-        for rec in bill_action_db:
-            bill_type = rec["billtype"]
-            bill_number = int(rec["billnumber"])
-            bill_id = bill_type + str(bill_number)
-            bill = bill_dict[bill_id]
-            action = rec["action"]
-            date = rec["dateaction"]
-            actor = rec["house"]
-            comment = rec["comment"]
-            action, atype = self.categorize_action(action)
-            if comment:
-                action += (' ' + comment)
-            bill.add_action(actor, action, date, type=atype)
-
-        # Subjects
-        subject_url, subject_db = self.get_dbf(year_abr, 'BILLSUBJ')
-        for rec in subject_db:
-            bill_id = rec['billtype'] + str(int(rec['billnumber']))
-            bill = bill_dict.get(bill_id)
-            if bill:
-                bill.setdefault('subjects', []).append(rec['subjectkey'])
+                date = rec["Session_Date"]
+                action = rec["Action"]
+                leg_vote = rec["Legislator_Vote"]
             else:
-                self.warning('invalid bill id in BILLSUBJ.DBF: %s' % bill_id)
+                bill_id = '%s%s' % (rec['Bill_Type'], rec['Bill_Number'])
+                leg = rec['Name']
+                # drop time portion
+                date = rec['Agenda_Date'].split()[0]
+                # make motion readable
+                action = self._com_vote_motions[rec['BillAction']]
+                # first char (Y/N) use [0:1] to ignore ''
+                leg_vote = rec['LegislatorVote'][0:1]
+
+            date = datetime.strptime(date, "%m/%d/%Y")
+            vote_id = '_'.join((bill_id, chamber, action))
+            vote_id = vote_id.replace(" ", "_")
+
+            if vote_id not in votes:
+                votes[vote_id] = Vote(chamber, date, action, None, None,
+                                      None, None, bill_id=bill_id)
+            if vote_file_type == 'committee':
+                votes[vote_id]['committee'] = self._committees[
+                    rec['Committee_House']]
+
+            if leg_vote == "Y":
+                votes[vote_id].yes(leg)
+            elif leg_vote == "N":
+                votes[vote_id].no(leg)
+            else:
+                votes[vote_id].other(leg)
+
+        zipedfile.close()
+
+        #Counts yes/no/other votes and saves overall vote
+        bill_votes = {}
+        for vote in votes.itervalues():
+            vote_yes_count = len(vote["yes_votes"])
+            vote_no_count = len(vote["no_votes"])
+            vote_other_count = len(vote["other_votes"])
+            vote["yes_count"] = vote_yes_count
+            vote["no_count"] = vote_no_count
+            vote["other_count"] = vote_other_count
+            if vote_yes_count > vote_no_count:
+                vote["passed"] = True
+            else:
+                vote["passed"] = False
+            bill_votes.setdefault(vote["bill_id"], []).append(vote)
 
-        # save all bills at the end
-        for bill in bill_dict.itervalues():
-            # add sources
-            bill.add_source(bill_sponsors_url)
-            bill.add_source(bill_document_url)
-            bill.add_source(bill_action_url)
-            bill.add_source(subject_url)
-            self.save_bill(bill)
+        return bill_votes
@@ -5,7 +5,6 @@ from billy.scrape.committees import CommitteeScraper, Committee
 from openstates.nj.utils import clean_committee_name, DBFMixin
 
 import lxml.etree
-from dbfpy import dbf
 import scrapelib
 
 class NJCommitteeScraper(CommitteeScraper, DBFMixin):
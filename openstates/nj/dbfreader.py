@@ -0,0 +1,177 @@
+"""
+Read-only access to the dBase/FoxPro DBF tables NJ publishes.
+
+Tables are memory-mapped rather than parsed up front, records are decoded
+when they are read, and :meth:`DBFTable.index` builds (once per file, it
+is saved next to the table) an index from a key to record numbers so a
+scraper can look up the few records of one bill without scanning the
+whole table.
+"""
+import os
+import mmap
+import struct
+import marshal
+import datetime
+import tempfile
+
+# days between the start of the Julian calendar and datetime's day 1
+_JULIAN_OFFSET = 1721425
+
+
+class DBFRecord(dict):
+    """ a record, fields can be looked up in any case like dbfpy's """
+
+    def __getitem__(self, key):
+        return dict.__getitem__(self, key.upper())
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key.upper())
+
+    def get(self, key, default=None):
+        return dict.get(self, key.upper(), default)
+
+
+def _decode(type, value, decimals):
+    if type in 'CM':
+        return value.rstrip(' \0')
+    elif type in 'NF':
+        value = value.strip(' \0')
+        if '.' in value:
+            return float(value)
+        return int(value) if value else 0
+    elif type == 'D':
+        value = value.strip(' \0')
+        if not value:
+            return None
+        return datetime.datetime.strptime(value, '%Y%m%d').date()
+    elif type == 'T':
+        day, msecs = struct.unpack('<2i', value)
+        if day < 1:
+            return None
+        return (datetime.datetime.fromordinal(day - _JULIAN_OFFSET) +
+                datetime.timedelta(milliseconds=msecs))
+    elif type == 'L':
+        if value in 'YyTt':
+            return True
+        elif value in 'NnFf':
+            return False
+        return None
+    elif type == 'I':
+        return struct.unpack('<i', value)[0]
+    elif type == 'Y':
+        return struct.unpack('<q', value)[0] / 10000.0
+    elif type in 'BO':
+        return struct.unpack('<d', value)[0]
+    return value
+
+
+class DBFTable(object):
+    """
+    A memory-mapped DBF table.
+
+    Iterating over it yields the records that aren't marked deleted as
+    :class:`DBFRecord` objects, ``table[n]`` reads record number ``n``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._indexes = {}
+
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (self.num_records, self.header_length,
+         self.record_length) = struct.unpack('<4xIHH', self._map[:12])
+
+        # 32 byte field descriptors follow the header up to a \r
+        self.fields = []
+        offset = 1  # past the deleted flag
+        pos = 32
+        while pos + 32 <= self.header_length and self._map[pos] != '\r':
+            desc = self._map[pos:pos + 32]
+            name = desc[:11].split('\0', 1)[0].upper()
+            length, decimals = ord(desc[16]), ord(desc[17])
+            self.fields.append((name, desc[11], offset, length, decimals))
+            offset += length
+            pos += 32
+
+    def __len__(self):
+        return self.num_records
+
+    def _raw(self, recno):
+        if not 0 <= recno < self.num_records:
+            raise IndexError('record %d out of range' % recno)
+        start = self.header_length + recno * self.record_length
+        return self._map[start:start + self.record_length]
+
+    def _decode(self, raw):
+        return DBFRecord((name, _decode(type, raw[offset:offset + length],
+                                        decimals))
+                         for name, type, offset, length, decimals
+                         in self.fields)
+
+    def __getitem__(self, recno):
+        return self._decode(self._raw(recno))
+
+    def __iter__(self):
+        for recno in xrange(self.num_records):
+            raw = self._raw(recno)
+            if raw[0] != '*':
+                yield self._decode(raw)
+
+    def _index_path(self, name):
+        return '%s.%s.idx' % (self.path, name)
+
+    def index(self, name, key):
+        """
+        Map ``key(record)`` to the numbers of the records with that key
+        (in table order), for every record that isn't deleted.
+
+        The index is built on first use and saved as ``<path>.<name>.idx``
+        for as long as the table file is unchanged, so name must identify
+        key.
+        """
+        if name in self._indexes:
+            return self._indexes[name]
+
+        stat = os.stat(self.path)
+        stamp = (stat.st_size, int(stat.st_mtime), stat.st_ino)
+        index_path = self._index_path(name)
+        try:
+            with open(index_path, 'rb') as f:
+                saved_stamp, index = marshal.load(f)
+            if saved_stamp != stamp:
+                index = None
+        except (IOError, EOFError, ValueError, TypeError):
+            index = None
+
+        if index is None:
+            index = {}
+            for recno in xrange(self.num_records):
+                raw = self._raw(recno)
+                if raw[0] != '*':
+                    index.setdefault(key(self._decode(raw)),
+                                     []).append(recno)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(index_path),
+                prefix=os.path.basename(index_path) + '.')
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump((stamp, index), f)
+            os.rename(tmp_path, index_path)
+
+        self._indexes[name] = index
+        return index
+
+    def lookup(self, name, value):
+        """
+        records whose key is value in the index called name, which must
+        have been built with :meth:`index`
+        """
+        return [self[recno] for recno in self._indexes[name].get(value, ())]
+
+    def keys(self, name):
+        """ the keys in the index called name """
+        return self._indexes[name].keys()
+
+    def close(self):
+        self._map.close()
@@ -7,7 +7,6 @@ from billy.scrape.legislators import LegislatorScraper, Legislator
 from openstates.nj.utils import clean_committee_name, DBFMixin
 
 import scrapelib
-from dbfpy import dbf
 
 class NJLegislatorScraper(LegislatorScraper, DBFMixin):
     state = 'nj'
@@ -0,0 +1,60 @@
+import os
+import shutil
+import zipfile
+import tempfile
+
+from nose.tools import with_setup
+
+from openstates.nj import metadata
+from openstates.nj.bills import NJBillScraper
+
+_dir = None
+
+_votes = """Bill,Full_Name,Session_Date,Action,Legislator_Vote
+A12,Smith,1/12/2012,3RDG FINAL PASSAGE,Y
+A12,Jones,1/12/2012,3RDG FINAL PASSAGE,N
+A12,Brown,1/12/2012,3RDG FINAL PASSAGE,Y
+A40,Smith,1/13/2012,3RDG FINAL PASSAGE,N
+"""
+
+
+class FakeNJBillScraper(NJBillScraper):
+    downloads = []
+
+    def urlretrieve(self, url, filename=None, method='GET', body=None):
+        self.downloads.append(url)
+        fd, filename = tempfile.mkstemp(dir=_dir)
+        os.close(fd)
+        with zipfile.ZipFile(filename, 'w') as archive:
+            archive.writestr('a2012.txt', _votes)
+        return filename, None
+
+
+def setup_func():
+    global _dir
+    _dir = tempfile.mkdtemp()
+    FakeNJBillScraper.downloads = []
+    NJBillScraper._vote_archives.clear()
+
+
+def teardown_func():
+    NJBillScraper._vote_archives.clear()
+    shutil.rmtree(_dir)
+
+
+@with_setup(setup_func, teardown_func)
+def test_vote_archive():
+    scrapers = [FakeNJBillScraper(metadata, output_dir=_dir, no_cache=True,
+                                  error_dir=None) for i in range(2)]
+    for scraper in scrapers:
+        votes = scraper.get_vote_archive('A2012')
+        assert sorted(votes) == ['A12', 'A40']
+        vote = votes['A12'][0]
+        assert vote['chamber'] == 'lower'
+        assert vote['yes_count'] == 2 and vote['no_count'] == 1
+        assert vote['passed']
+
+    # downloaded and parsed once for both scrapers
+    assert FakeNJBillScraper.downloads == [
+        'ftp://www.njleg.state.nj.us/votes/A2012.zip']
+    assert os.listdir(_dir) == []
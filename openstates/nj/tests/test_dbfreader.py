@@ -0,0 +1,152 @@
+import os
+import shutil
+import struct
+import datetime
+import tempfile
+import threading
+
+from nose.tools import with_setup, assert_raises
+
+from openstates.nj.dbfreader import DBFTable
+from openstates.nj.utils import bill_id, DBFMixin
+
+_dir = None
+
+_fields = [('BILLTYPE', 'C', 2), ('BILLNUMBER', 'N', 5),
+           ('DATEACTION', 'D', 8), ('ACTION', 'C', 10)]
+
+_records = [(' ', 'A', 12, '20120110', 'INT 1RA'),
+            (' ', 'S', 3, '20120112', 'INT 1RS'),
+            ('*', 'A', 12, '20120113', 'DELETED'),
+            (' ', 'A', 12, '20120115', 'PA'),
+            (' ', 'S', 40, '        ', '')]
+
+
+def _write_dbf(path):
+    header_length = 32 + 32 * len(_fields) + 1
+    record_length = 1 + sum(length for name, type, length in _fields)
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<B3BIHH20x', 3, 112, 1, 1, len(_records),
+                            header_length, record_length))
+        for name, type, length in _fields:
+            f.write(struct.pack('<11sc4xBB14x', name, type, length, 0))
+        f.write('\r')
+        for deleted, btype, number, date, action in _records:
+            f.write(deleted + btype.ljust(2) + str(number).rjust(5) + date +
+                    action.ljust(10))
+        f.write('\x1a')
+
+
+def setup_func():
+    global _dir
+    _dir = tempfile.mkdtemp()
+    _write_dbf(os.path.join(_dir, 'BILLHIST.DBF'))
+
+
+def teardown_func():
+    shutil.rmtree(_dir)
+
+
+@with_setup(setup_func, teardown_func)
+def test_read():
+    table = DBFTable(os.path.join(_dir, 'BILLHIST.DBF'))
+    assert len(table) == 5
+    assert [f[0] for f in table.fields] == ['BILLTYPE', 'BILLNUMBER',
+                                            'DATEACTION', 'ACTION']
+
+    records = list(table)
+    assert len(records) == 4
+    assert records[0]['billtype'] == 'A'
+    assert records[0]['BILLNUMBER'] == 12
+    assert records[0]['dateaction'] == datetime.date(2012, 1, 10)
+    assert records[3]['dateaction'] is None
+    assert records[3]['action'] == ''
+
+    assert table[2]['action'] == 'DELETED'
+    assert_raises(IndexError, table.__getitem__, 5)
+    table.close()
+
+
+@with_setup(setup_func, teardown_func)
+def test_index():
+    path = os.path.join(_dir, 'BILLHIST.DBF')
+    table = DBFTable(path)
+    index = table.index('bill', bill_id)
+    assert index == {'A12': [0, 3], 'S3': [1], 'S40': [4]}
+    assert [r['action'] for r in table.lookup('bill', 'A12')] == ['INT 1RA',
+                                                                 'PA']
+    assert table.lookup('bill', 'A1') == []
+    assert sorted(table.keys('bill')) == ['A12', 'S3', 'S40']
+    table.close()
+    assert sorted(os.listdir(_dir)) == ['BILLHIST.DBF',
+                                        'BILLHIST.DBF.bill.idx']
+
+    # a later run loads the saved index instead of scanning the table
+    table = DBFTable(path)
+    assert table.index('bill', None) == index
+    table.close()
+
+    # until the table is replaced
+    os.rename(path, path + '.old')
+    _write_dbf(path)
+    table = DBFTable(path)
+    assert_raises(TypeError, table.index, 'bill', None)
+    table.close()
+
+
+class _FakeDBFScraper(DBFMixin):
+    def __init__(self, release=None):
+        self.release = release
+        self.started = threading.Event()
+
+    def _ftp_entry(self, url):
+        return None
+
+    def urlretrieve(self, url, filename=None):
+        self.started.set()
+        if self.release:
+            self.release.wait(5)
+        _write_dbf(filename)
+        return filename, None
+
+    def debug(self, msg):
+        pass
+
+    warning = debug
+
+
+def setup_mixin():
+    setup_func()
+    DBFMixin._dbf_dir = os.path.join(_dir, 'nj_dbf')
+
+
+def teardown_mixin():
+    DBFMixin._dbf_dir = None
+    DBFMixin.dbfcache.clear()
+    DBFMixin._dbf_locks.clear()
+    teardown_func()
+
+
+@with_setup(setup_mixin, teardown_mixin)
+def test_get_dbf():
+    # a slow download only holds up the table being downloaded
+    release = threading.Event()
+    slow_scraper = _FakeDBFScraper(release)
+    slow = threading.Thread(target=slow_scraper.get_bill_dbf,
+                            args=(2012, 'BILLHIST'))
+    slow.start()
+    slow_scraper.started.wait()
+
+    scraper = _FakeDBFScraper()
+    url, table = scraper.get_bill_dbf(2012, 'BILLSPON')
+    assert slow.is_alive()
+    release.set()
+    slow.join()
+
+    assert url.endswith('/2012data/BILLSPON.DBF')
+    assert [r['action'] for r in table.lookup('bill', 'A12')] == ['INT 1RA',
+                                                                 'PA']
+    assert scraper.get_dbf(2012, 'BILLSPON')[1] is table
+    assert sorted(os.listdir(os.path.join(_dir, 'nj_dbf', '2012data'))) == [
+        'BILLHIST.DBF', 'BILLHIST.DBF.bill.idx',
+        'BILLSPON.DBF', 'BILLSPON.DBF.bill.idx']
@@ -1,6 +1,13 @@
 import os
 import re
-from dbfpy import dbf
+import json
+import tempfile
+import threading
+from collections import OrderedDict
+
+from billy.conf import settings
+
+from openstates.nj.dbfreader import DBFTable
 
 def clean_committee_name(comm_name):
     comm_name = comm_name.strip()
@@ -24,18 +31,112 @@ def chamber_name(chamber):
     else:
         return 'assembly'
 
+
+def bill_id(rec):
+    """ id (e.g. A123) of the bill a BILL* table record is about """
+    return rec['billtype'] + str(int(rec['billnumber']))
+
+
 class DBFMixin(object):
+    """
+    Downloads NJ's DBF tables and opens them as memory-mapped
+    :class:`~openstates.nj.dbfreader.DBFTable` objects.
+
+    Downloaded tables are kept in ``<BILLY_CACHE_DIR>/nj_dbf`` and reused
+    by later runs as long as the FTP listing shows the same size and mtime.
+    Up to ``dbfcache_size`` open tables are shared by all NJ scrapers in
+    the process, each table is downloaded and indexed by one scraper at a
+    time.
+    """
+
+    dbfcache = OrderedDict()
+    dbfcache_size = 8
+    _dbfcache_lock = threading.Lock()
+    _dbf_locks = {}
+    _dbf_dir = None
+
+    def _dbf_path(self, year, name):
+        if DBFMixin._dbf_dir is None:
+            if settings.BILLY_CACHE_DIR:
+                DBFMixin._dbf_dir = os.path.join(settings.BILLY_CACHE_DIR,
+                                                 'nj_dbf')
+            else:
+                DBFMixin._dbf_dir = tempfile.mkdtemp(prefix='nj_dbf')
+        dirname = os.path.join(DBFMixin._dbf_dir, '%sdata' % year)
+        if not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                # another thread got there first
+                if not os.path.isdir(dirname):
+                    raise
+        return os.path.join(dirname, '%s.DBF' % name)
 
-    dbfcache = {}
+    def _dbf_stamp(self, url):
+        # size and mtime of url per the FTP listing, None if unknown
+        try:
+            entry = self._ftp_entry(url)
+        except Exception as e:
+            self.warning('could not list %s: %s' % (url, e))
+            return None
+        if entry is not None:
+            return [entry.size, entry.mtime.isoformat()]
+
+    def _fetch_dbf(self, url, path):
+        stamp = self._dbf_stamp(url)
+        stamp_path = path + '.json'
+        if stamp and os.path.exists(path) and os.path.exists(stamp_path):
+            with open(stamp_path) as f:
+                if json.load(f) == stamp:
+                    self.debug('%s unchanged, reusing %s' % (url, path))
+                    return
+
+        # renaming into place leaves tables other scrapers have open intact
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                        prefix=os.path.basename(path) + '.')
+        os.close(fd)
+        tmp_path, resp = self.urlretrieve(url, tmp_path)
+        os.rename(tmp_path, path)
+        if stamp:
+            with open(stamp_path, 'w') as f:
+                json.dump(stamp, f)
+        elif os.path.exists(stamp_path):
+            os.remove(stamp_path)
+
+    def _dbf_lock(self, url):
+        with self._dbfcache_lock:
+            return self._dbf_locks.setdefault(url, threading.Lock())
 
     def get_dbf(self, year, name):
         url = 'ftp://www.njleg.state.nj.us/ag/%sdata/%s.DBF' % (year, name)
 
-        if url in self.dbfcache:
-            return url, self.dbfcache[url]
+        # only the table being downloaded is held up, not the others
+        with self._dbf_lock(url):
+            with self._dbfcache_lock:
+                db = self.dbfcache.get(url)
+            if db is None:
+                path = self._dbf_path(year, name)
+                self._fetch_dbf(url, path)
+                db = DBFTable(path)
+
+        with self._dbfcache_lock:
+            self.dbfcache.pop(url, None)
+            self.dbfcache[url] = db
+
+            # least recently used tables are dropped, not closed, anyone
+            # still reading one keeps its mapping
+            while len(self.dbfcache) > self.dbfcache_size:
+                self.dbfcache.popitem(False)
+
+        return url, db
 
-        dbf_file, resp = self.urlretrieve(url)
-        db = dbf.Dbf(dbf_file)
-        self.dbfcache[url] = db
-        os.remove(dbf_file)
+    def get_bill_dbf(self, year, name):
+        """
+        like :meth:`get_dbf`, for tables with billtype and billnumber
+        fields: the table is indexed by bill id (e.g. A123) for
+        ``db.lookup('bill', bill_id)``
+        """
+        url, db = self.get_dbf(year, name)
+        with self._dbf_lock(url):
+            db.index('bill', bill_id)
         return url, db
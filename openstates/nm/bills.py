@@ -1,14 +1,16 @@
 import os
 import re
-import csv
 import zipfile
-import subprocess
+import tempfile
 from datetime import datetime
 
+from billy.conf import settings
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
 from billy.scrape.utils import convert_pdf
 
+from openstates.nm.mdb import open_mdb
+
 import lxml.html
 
 # {spaces}{vote indicator (Y/N/E/ )}{name}{lookahead:2 spaces, space-indicator}
@@ -93,6 +95,14 @@ class NMBillScraper(BillScraper):
     # update as sessions update
     session_paths = {'2011': '11%20Regular', '2011S': '11%20Special'}
 
+    # the tables of the Access DB that are used, and the columns bills are
+    # looked up by (BillID without its space padding)
+    mdb_tables = ('tblSponsors', 'TblSubjects', 'Legislation',
+                  'TblLocations', 'Actions')
+    mdb_derived = {'Actions': {
+        'bill_key': lambda row: (row['BillID'] or '').replace(' ', '')}}
+    mdb_indexes = {'Actions': ['bill_key']}
+
 
     def _init_mdb(self, session):
         if session == '2011S':
@@ -110,19 +120,18 @@ class NMBillScraper(BillScraper):
             remote_file = 'ftp://www.nmlegis.gov/other/%s.zip' % fname
             fname, resp = self.urlretrieve(remote_file)
             zf = zipfile.ZipFile(fname)
-            zf.extract(self.mdbfile)
+            # tables are exported to SQLite once per version of the DB
+            if settings.BILLY_CACHE_DIR:
+                store_dir = os.path.join(settings.BILLY_CACHE_DIR, 'nm_mdb')
+            else:
+                store_dir = os.path.join(tempfile.gettempdir(), 'nm_mdb')
+            self.mdb = open_mdb(zf, self.mdbfile, store_dir,
+                                self.mdb_tables, self.mdb_indexes,
+                                self.mdb_derived)
+            zf.close()
             os.remove(fname)
 
 
-    def access_to_csv(self, table):
-        """ using mdbtools, read access tables as CSV """
-        commands = ['mdb-export', self.mdbfile, table]
-        pipe = subprocess.Popen(commands, stdout=subprocess.PIPE,
-                                close_fds=True).stdout
-        csvfile = csv.DictReader(pipe)
-        return csvfile
-
-
     def scrape(self, chamber, session):
         chamber_letter = 'S' if chamber == 'upper' else 'H'
         bill_type_map = {'B': 'bill',
@@ -140,16 +149,16 @@ class NMBillScraper(BillScraper):
 
         # read in sponsor & subject mappings
         sponsor_map = {}
-        for sponsor in self.access_to_csv('tblSponsors'):
+        for sponsor in self.mdb.rows('tblSponsors'):
             sponsor_map[sponsor['SponsorCode']] = sponsor['FullName']
 
         subject_map = {}
-        for subject in self.access_to_csv('TblSubjects'):
+        for subject in self.mdb.rows('TblSubjects'):
             subject_map[subject['SubjectCode']] = subject['Subject']
 
         # get all bills into this dict, fill in action/docs before saving
         self.bills = {}
-        for data in self.access_to_csv('Legislation'):
+        for data in self.mdb.rows('Legislation'):
             # use their BillID for the key but build our own for storage
             bill_key = data['BillID'].replace(' ', '')
 
@@ -233,7 +242,7 @@ class NMBillScraper(BillScraper):
         location_map = {'H': 'lower', 'S': 'upper', 'P': 'executive'}
 
         com_location_map = {}
-        for loc in self.access_to_csv('TblLocations'):
+        for loc in self.mdb.rows('TblLocations'):
             com_location_map[loc['LocationCode']] = loc['LocationDesc']
 
         # combination of tblActions and http://www.nmlegis.gov/lcs/abbrev.aspx
@@ -303,42 +312,44 @@ class NMBillScraper(BillScraper):
         # these actions need a committee name spliced in
         actions_with_committee = ('SENT', '7650', '7654')
 
-        for action in self.access_to_csv('Actions'):
-            bill_key = action['BillID'].replace(' ', '')
-
+        for row in self.mdb.query('SELECT DISTINCT bill_key FROM Actions'):
+            bill_key = row['bill_key']
             # if this is from the wrong chamber or an unknown bill skip it
-            if not bill_key.startswith(chamber_letter):
-                continue
-            if bill_key not in self.bills:
+            if (bill_key.startswith(chamber_letter) and
+                bill_key not in self.bills):
                 self.warning('action for unknown bill %s' % bill_key)
-                continue
 
-            # ok the whole Day situation is madness, N:M mapping to real days
-            # see http://www.nmlegis.gov/lcs/lcsdocs/legis_day_chart_11.pdf
-            # first idea was to look at all Days and use the first occurance's
-            # timestamp, but this is sometimes off by quite a bit
-            # instead lets just use EntryDate and take radical the position
-            # something hasn't happened until it is observed
-            action_day = action['Day']
-            action_date = datetime.strptime(action['EntryDate'].split()[0],
-                                            "%m/%d/%y")
-            if action['LocationCode']:
-                actor = location_map.get(action['LocationCode'][0], 'other')
-            else:
-                actor = 'other'
-            action_code = action['ActionCode']
-            action_name, action_type = action_map[action_code]
-
-            # if there's room in this action for a location name, map locations
-            # to their names from the Location table
-            if action_code in actions_with_committee:
-                # turn A/B/C into Full Name & Full Name 2 & Full Name 3
-                locs = [com_location_map[l]
-                        for l in action['Referral'].split('/') if l]
-                action_name = action_name % (' & '.join(locs))
-
-            self.bills[bill_key].add_action(actor, action_name, action_date,
-                                            type=action_type, day=action_day)
+        for bill_key in self.bills:
+            for action in self.mdb.rows('Actions', bill_key=bill_key):
+                # ok the whole Day situation is madness, N:M mapping to real
+                # days, see
+                # http://www.nmlegis.gov/lcs/lcsdocs/legis_day_chart_11.pdf
+                # first idea was to look at all Days and use the first
+                # occurance's timestamp, but this is sometimes off by quite a
+                # bit instead lets just use EntryDate and take radical the
+                # position something hasn't happened until it is observed
+                action_day = action['Day']
+                action_date = datetime.strptime(
+                    action['EntryDate'].split()[0], "%m/%d/%y")
+                if action['LocationCode']:
+                    actor = location_map.get(action['LocationCode'][0],
+                                             'other')
+                else:
+                    actor = 'other'
+                action_code = action['ActionCode']
+                action_name, action_type = action_map[action_code]
+
+                # if there's room in this action for a location name, map
+                # locations to their names from the Location table
+                if action_code in actions_with_committee:
+                    # turn A/B/C into Full Name & Full Name 2 & Full Name 3
+                    locs = [com_location_map[l]
+                            for l in action['Referral'].split('/') if l]
+                    action_name = action_name % (' & '.join(locs))
+
+                self.bills[bill_key].add_action(actor, action_name,
+                                                action_date, type=action_type,
+                                                day=action_day)
 
 
     def scrape_documents(self, session, doctype, chamber):
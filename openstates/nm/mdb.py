@@ -0,0 +1,165 @@
+"""
+NM publishes its bill data as an Access database inside a zip file.
+
+Rather than running ``mdb-export`` (from mdbtools) for every table each
+time a table is needed, :func:`open_mdb` exports the tables once per
+version of the database (by hash) into a SQLite file with indexes, which
+later runs and the other chamber's scraper reuse.
+"""
+import os
+import csv
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import subprocess
+
+
+class _Export(object):
+    """
+    the rows of an Access table as read by mdb-export, as dicts, with the
+    table's columns as fieldnames once iteration has started
+    """
+
+    def __init__(self, mdb_path, table):
+        self.cmd = ['mdb-export', mdb_path, table]
+        self.fieldnames = None
+
+    def __iter__(self):
+        proc = subprocess.Popen(self.cmd, stdout=subprocess.PIPE,
+                                close_fds=True)
+        reader = csv.DictReader(proc.stdout)
+        self.fieldnames = reader.fieldnames
+        for row in reader:
+            yield row
+        proc.stdout.close()
+        # a failed export would otherwise look like an empty table
+        returncode = proc.wait()
+        if returncode:
+            raise subprocess.CalledProcessError(returncode,
+                                                ' '.join(self.cmd))
+
+
+def export_table(mdb_path, table):
+    """
+    the rows of an Access table as read by mdb-export, as dicts; raises
+    CalledProcessError after the last row if mdb-export failed
+    """
+    return _Export(mdb_path, table)
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def build_store(path, tables, indexes=None, derived=None):
+    """
+    Write a SQLite file at path with a table (of TEXT columns) for each
+    name: rows (iterable of dicts) in tables.
+
+    derived maps table names to {column: function of a row} for columns
+    to add, e.g. a normalized key to look rows up by, and indexes maps
+    table names to the columns to index.  A table without
+    rows is still created if rows has fieldnames (as a csv.DictReader
+    does).  The file is written under a temporary name and renamed into
+    place, so a store is never seen half built.
+    """
+    indexes = indexes or {}
+    derived = derived or {}
+    fd, tmp_path = tempfile.mkstemp('.sqlite', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        db = sqlite3.connect(tmp_path)
+        db.text_factory = str
+        for name, table in tables.iteritems():
+            rows = iter(table)
+            first = next(rows, None)
+            columns = getattr(table, 'fieldnames', None) or first
+            if not columns:
+                raise ValueError('no columns for table %s' % name)
+            extra = sorted(derived.get(name, {}).iteritems())
+            columns = list(columns)
+            db.execute('CREATE TABLE %s (%s)' % (
+                _quote(name), ', '.join('%s TEXT' % _quote(c) for c in
+                                        columns + [e[0] for e in extra])))
+            insert = 'INSERT INTO %s VALUES (%s)' % (
+                _quote(name), ', '.join('?' * (len(columns) + len(extra))))
+
+            def values(row):
+                return ([row.get(c) for c in columns] +
+                        [func(row) for column, func in extra])
+
+            if first is not None:
+                db.execute(insert, values(first))
+            db.executemany(insert, (values(row) for row in rows))
+            for column in indexes.get(name, ()):
+                db.execute('CREATE INDEX %s ON %s (%s)' % (
+                    _quote('%s_%s' % (name, column)), _quote(name),
+                    _quote(column)))
+        db.commit()
+        db.close()
+        os.rename(tmp_path, path)
+    except:
+        os.remove(tmp_path)
+        raise
+
+
+class MDBStore(object):
+    """ read access to a store written by :func:`build_store` """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.text_factory = str
+        self.db.row_factory = sqlite3.Row
+
+    def query(self, sql, params=()):
+        """ rows of an SQL query as dicts """
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    def rows(self, table, **where):
+        """
+        rows of table (in their original order) whose columns equal the
+        given values
+        """
+        sql = 'SELECT * FROM %s' % _quote(table)
+        if where:
+            sql += ' WHERE ' + ' AND '.join('%s = ?' % _quote(c)
+                                            for c in where)
+        return self.query(sql + ' ORDER BY rowid', where.values())
+
+
+def open_mdb(zip_file, mdb_name, store_dir, tables, indexes=None,
+             derived=None):
+    """
+    Get an :class:`MDBStore` of the given tables of the database mdb_name
+    in a zipfile.ZipFile, see :func:`build_store` for indexes and derived.
+
+    Stores are kept in store_dir named by the SHA-1 of the database and
+    of the tables, indexes and derived columns asked for, so an unchanged
+    database is only exported once.
+    """
+    sha1 = hashlib.sha1()
+    member = zip_file.open(mdb_name)
+    for chunk in iter(lambda: member.read(1024 * 1024), ''):
+        sha1.update(chunk)
+    member.close()
+    sha1.update(repr((sorted(tables), sorted((indexes or {}).items()),
+                      sorted((table, sorted(columns)) for table, columns
+                             in (derived or {}).iteritems()))))
+
+    if not os.path.isdir(store_dir):
+        os.makedirs(store_dir)
+    path = os.path.join(store_dir, '%s-%s.sqlite' % (
+        os.path.splitext(mdb_name)[0], sha1.hexdigest()))
+
+    if not os.path.exists(path):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            mdb_path = zip_file.extract(mdb_name, tmp_dir)
+            build_store(path, dict((table, export_table(mdb_path, table))
+                                   for table in tables), indexes, derived)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    return MDBStore(path)
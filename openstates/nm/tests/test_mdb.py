@@ -0,0 +1,63 @@
+import os
+import csv
+import shutil
+import tempfile
+import StringIO
+import subprocess
+
+from nose.tools import with_setup, assert_raises
+
+from openstates.nm.mdb import build_store, export_table, MDBStore
+
+_dir = None
+
+
+def setup_func():
+    global _dir
+    _dir = tempfile.mkdtemp()
+
+
+def teardown_func():
+    shutil.rmtree(_dir)
+
+
+@with_setup(setup_func, teardown_func)
+def test_store():
+    path = os.path.join(_dir, 'LegInfo.sqlite')
+    build_store(path, {
+        'Actions': [{'BillID': 'HB 1', 'ActionCode': '7601'},
+                    {'BillID': 'SB 2', 'ActionCode': '7654'},
+                    {'BillID': 'HB 1', 'ActionCode': '7660'}],
+        'Empty': csv.DictReader(StringIO.StringIO('BillID,Subject\r\n'))},
+        {'Actions': ['BillID']},
+        {'Actions': {'bill_key': lambda row: row['BillID'].replace(' ', '')},
+         'Empty': {'bill_key': lambda row: row['BillID']}})
+    assert os.listdir(_dir) == ['LegInfo.sqlite']
+
+    store = MDBStore(path)
+    assert [a['ActionCode'] for a in store.rows('Actions')] == [
+        '7601', '7654', '7660']
+    assert store.rows('Actions', BillID='HB 1') == [
+        {'BillID': 'HB 1', 'ActionCode': '7601', 'bill_key': 'HB1'},
+        {'BillID': 'HB 1', 'ActionCode': '7660', 'bill_key': 'HB1'}]
+    assert [a['ActionCode'] for a in store.rows('Actions',
+                                                bill_key='HB1')] == [
+        '7601', '7660']
+    assert store.rows('Actions', BillID='HB 3') == []
+    assert store.query('SELECT name FROM sqlite_master WHERE '
+                       "type='index'") == [{'name': 'Actions_BillID'}]
+
+    # a table without rows is still there, derived columns and all
+    assert store.rows('Empty', bill_key='HB1') == []
+
+
+@with_setup(setup_func, teardown_func)
+def test_failed_export():
+    path = os.path.join(_dir, 'LegInfo.sqlite')
+    export = export_table('LegInfo.mdb', 'Actions')
+    export.cmd = ['sh', '-c', 'echo BillID,ActionCode; exit 1']
+
+    assert_raises(subprocess.CalledProcessError, build_store, path,
+                  {'Actions': export})
+    assert_raises(ValueError, build_store, path, {'Actions': []})
+    assert os.listdir(_dir) == []
@@ -1,8 +1,6 @@
 import datetime
-import os
 import re
 import sys
-import tempfile
 import traceback
 
 from .utils import action_type, bill_type, sponsorsToList
@@ -10,7 +8,7 @@ from .utils import action_type, bill_type, sponsorsToList
 from billy.scrape import ScrapeError
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
-from billy.scrape.utils import convert_pdf
+from billy.scrape.utils import convert_pdf_async
 
 
 import lxml.html
@@ -191,37 +189,28 @@ class SCBillScraper(BillScraper):
         return (valid_data, expected, areas, yays, nays, other)
 
 
-    def extract_rollcall_from_pdf(self,chamber,vote, bill, url,bill_id):
+    def fetch_rollcall_pdf(self, bill, url, bill_id):
+        """
+        Download a roll call pdf and start converting it in the background,
+        returns the pending conversion for extract_rollcall_from_pdf.
+        """
         billnum = re.search("(\d+)", bill_id).group(1)
         self.debug("Scraping rollcall %s|%s|" % (billnum, url))
 
-        bill_prefix = "vote_%s_%s_"  % (chamber, re.sub(r'\s+', '_', bill_id ))
-
         bill.add_source(url)
-        #billnum = re.search("(\d+)", bill_id).group(1)
 
-        # Save roll call pdf to a local file
-        temp_file = tempfile.NamedTemporaryFile(delete=False,suffix='.pdf',
-                                                prefix=bill_prefix )
-        pdf_temp_name = temp_file.name
-
-        self.debug("Parsing pdf votes, saving to tempfile [%s]" %
-                   temp_file.name)
         with self.urlopen(url) as pdata:
-            pdf_file = file(pdf_temp_name, 'w')
-            pdf_file.write(pdata)
-            pdf_file.close()
+            return convert_pdf_async(pdata, type='text')
 
-        # Pdf is in pdf_temp_name
-        rollcall_data  = convert_pdf(pdf_temp_name, type='text')
+    def extract_rollcall_from_pdf(self, chamber, vote, url, bill_id,
+                                  conversion):
+        rollcall_data = conversion.get()
         (valid_data, expected, areas, yays, nays, other) = self.count_votes(url,chamber,bill_id,rollcall_data)
 
-        os.unlink(pdf_temp_name)
-
         if valid_data:
             self.debug("VOTE %s %s yays %d nays %d other %d pdf=%s" %
                        (bill_id, chamber, len(yays), len(nays), len(other),
-                        pdf_temp_name ))
+                        url))
             [vote.yes(legislator) for legislator in yays]
             [vote.no(legislator) for legislator in nays]
             [vote.other(legislator) for legislator in other]
@@ -309,6 +298,11 @@ class SCBillScraper(BillScraper):
 
             vote_details = self.extract_vote_rows(bill_id,fb_vote_row[2])
 
+        # roll call pdfs are converted in the background while the rest of
+        # the vote rows are fetched, then parsed once all are submitted;
+        # votes are only added once their roll call has been read
+        votes = []
+
         #now everyting ins in vote_details
         for d in vote_details:
             try:
@@ -341,12 +335,24 @@ class SCBillScraper(BillScraper):
                 vote = Vote(chamber, vvote_date, motion, passed, y, no,
                             other_count)
 
+                conversion = None
                 if link_to_votes_href:
                     bill.add_source(link_to_votes_href)
                     vote['pdf-source'] = link_to_votes_href
                     vote['source'] = link_to_votes_href
-                    self.extract_rollcall_from_pdf(chamber, vote, bill,
-                                                   link_to_votes_href, bill_id)
+                    conversion = self.fetch_rollcall_pdf(bill,
+                                                         link_to_votes_href,
+                                                         bill_id)
+                votes.append((vote, link_to_votes_href, d, conversion))
+            except Exception as error:
+                self.warning("scrape_vote_history: Failed bill=%s %s %s" %
+                             (bill_id, d, traceback.format_exc()))
+
+        for vote, url, d, conversion in votes:
+            try:
+                if url:
+                    self.extract_rollcall_from_pdf(chamber, vote, url,
+                                                   bill_id, conversion)
                 bill.add_vote(vote)
             except Exception as error:
                 self.warning("scrape_vote_history: Failed bill=%s %s %s" %
@@ -418,7 +424,9 @@ class SCBillScraper(BillScraper):
         passed = True
         vote = Vote(chamber, vvote_date, motion, passed, yes_count, no_count,
                     other_count)
-        self.extract_rollcall_from_pdf(chamber,vote, bill,vurl,bill_id)
+        conversion = self.fetch_rollcall_pdf(bill, vurl, bill_id)
+        self.extract_rollcall_from_pdf(chamber, vote, vurl, bill_id,
+                                       conversion)
         self.debug("2 ADD VOTE %s" % bill_id)
         bill.add_vote(vote)
 
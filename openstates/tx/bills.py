@@ -28,16 +28,18 @@ class TXBillScraper(BillScraper):
                 session, chamber_name(chamber), btype)
             billdirs_url = urlparse.urljoin(self._ftp_root, billdirs_path)
 
-            with self.urlopen(billdirs_url) as bill_dirs:
-                for dir in parse_ftp_listing(bill_dirs):
-                    bill_url = urlparse.urljoin(billdirs_url, dir) + '/'
-                    with self.urlopen(bill_url) as bills:
-                        for history in parse_ftp_listing(bills):
-                            self.scrape_bill(chamber, session,
-                                             urlparse.urljoin(bill_url,
-                                                              history))
+            for dir in self.ftp_listing(billdirs_url):
+                bill_url = urlparse.urljoin(billdirs_url, dir.filename) + '/'
+                for history in self.ftp_listing(bill_url):
+                    self.scrape_bill(chamber, session,
+                                     urlparse.urljoin(bill_url,
+                                                      history.filename))
 
     def scrape_bill(self, chamber, session, url):
+        if self.ftp_unchanged(url):
+            self.log("skipping unchanged %s" % url)
+            return
+
         with self.urlopen(url) as data:
             if "Bill does not exist." in data:
                 return
@@ -70,6 +72,7 @@ class TXBillScraper(BillScraper):
                 pass
 
             self.save_bill(bill)
+            self.ftp_mark_seen(url)
 
     def parse_bill_xml(self, chamber, session, txt):
         root = lxml.etree.fromstring(txt)